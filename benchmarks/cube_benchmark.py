@@ -0,0 +1,92 @@
+"""
+Builds a SalesCube (utils/cube.py) over a synthetic file, reports its
+build time and memory, and compares answering a set of filter
+combinations from the cube with re-filtering and re-aggregating the
+rows for each one.
+
+Usage: python -m benchmarks.cube_benchmark [--rows N]
+"""
+import argparse
+import os
+import tempfile
+import time
+import tracemalloc
+
+from benchmarks.generate import generate_sales_file
+from utils.file_handler import read_sales_data
+from utils.data_processor import (
+    iter_clean_transactions,
+    iter_validated,
+    region_wise_sales,
+    top_selling_products,
+    low_performing_products,
+    find_peak_sales_day
+)
+from utils.cube import SalesCube
+
+
+FILTERS = [
+    (None, None, None),
+    ("North", None, None),
+    ("South", None, None),
+    ("East", None, None),
+    ("West", None, None),
+    (None, 5000, None),
+    (None, None, 50000),
+    ("North", 10000, 100000)
+]
+
+METRICS = [region_wise_sales, top_selling_products, low_performing_products, find_peak_sales_day]
+
+
+def _answer_all(source_for):
+    for filters in FILTERS:
+        source = source_for(filters)
+        for metric in METRICS:
+            metric(source)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--rows", type=int, default=200000)
+    args = parser.parse_args()
+
+    fd, filename = tempfile.mkstemp(suffix=".txt")
+    os.close(fd)
+
+    try:
+        generate_sales_file(filename, args.rows)
+        transactions = list(iter_clean_transactions(read_sales_data(filename)))
+
+        tracemalloc.start()
+        cube = SalesCube.build(transactions)
+        held, _ = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+
+        # Timed again without tracemalloc overhead
+        cube = SalesCube.build(transactions)
+        info = cube.describe()
+
+        print(f"Rows: {info['rows']:,}")
+        print(f"Build: {info['build_seconds']:.3f}s")
+        print(f"Memory: {held / 1024:,.0f} KiB allocated, {info['memory_bytes'] / 1024:,.0f} KiB in cells")
+        print("Cells: " + ", ".join(f"{name} {count:,}" for name, count in info["cells"].items()))
+
+        start = time.perf_counter()
+        _answer_all(lambda f: list(iter_validated(transactions, None, *f)))
+        rescan = time.perf_counter() - start
+
+        start = time.perf_counter()
+        _answer_all(lambda f: cube.filtered(*f))
+        lookup = time.perf_counter() - start
+
+        print(f"\n{len(FILTERS)} filter combinations x {len(METRICS)} metrics")
+        print(f"{'rescan':<10}{rescan:>10.3f}s")
+        print(f"{'cube':<10}{lookup:>10.3f}s  ({rescan / lookup:,.0f}x faster, build included: "
+              f"{rescan / (lookup + info['build_seconds']):.1f}x)")
+    finally:
+        os.remove(filename)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,97 @@
+"""
+Seeded generator for synthetic files in the data/sales_data.txt format,
+with configurable amounts of the dirt seen in real exports.
+"""
+import random
+
+
+HEADER = "TransactionID|Date|ProductID|ProductName|Quantity|UnitPrice|CustomerID|Region"
+
+PRODUCTS = [
+    ("P101", "Laptop", 45000), ("P102", "Mouse", 500), ("P103", "Keyboard", 1500),
+    ("P104", "Monitor", 12000), ("P105", "Webcam", 3000), ("P106", "Headphones", 2500),
+    ("P107", "USB Cable", 200), ("P108", "External Hard Drive", 5000),
+    ("P109", "Wireless Mouse", 800), ("P110", "Laptop Charger", 1800)
+]
+UNMATCHED_PRODUCTS = [
+    ("P901", "Gadget,Special", 999), ("P902", "Mystery Box", 4999), ("P903", "Desk Lamp", 1200)
+]
+REGIONS = ["North", "South", "East", "West"]
+
+# Share of rows affected by each kind of dirt
+DEFAULT_DIRTINESS = {
+    "comma_numbers": 0.2,
+    "bad_rows": 0.01,
+    "zero_quantity": 0.02,
+    "wrong_prefix": 0.02,
+    "unmatched_products": 0.05
+}
+
+
+def generate_sales_file(filename, rows, seed=42, customers=1000, days=31, dirtiness=None):
+    """
+    Writes a sales file with the given number of data rows.
+    dirtiness overrides DEFAULT_DIRTINESS rates; {} of zeros gives a
+    clean file. The same arguments always produce the same file.
+    """
+    rates = dict(DEFAULT_DIRTINESS)
+    if dirtiness is not None:
+        rates.update(dirtiness)
+
+    rng = random.Random(seed)
+
+    with open(filename, "w", encoding="utf-8") as f:
+        f.write(HEADER + "\n")
+
+        for i in range(rows):
+            if rng.random() < rates["bad_rows"]:
+                # Wrong field count or non-numeric quantity
+                if rng.random() < 0.5:
+                    f.write(f"T{i:07d}|2024-12-01|P101|Laptop|2\n")
+                else:
+                    f.write(f"T{i:07d}|2024-12-01|P101|Laptop|two|45000|C00001|North\n")
+                continue
+
+            if rng.random() < rates["unmatched_products"]:
+                product_id, name, base_price = rng.choice(UNMATCHED_PRODUCTS)
+            else:
+                product_id, name, base_price = rng.choice(PRODUCTS)
+
+            price = int(base_price * rng.uniform(0.8, 1.2))
+            quantity = 0 if rng.random() < rates["zero_quantity"] else rng.randint(1, 10)
+            price_text = f"{price:,}" if rng.random() < rates["comma_numbers"] else str(price)
+
+            tx_prefix, cust_prefix = "T", "C"
+            if rng.random() < rates["wrong_prefix"]:
+                if rng.random() < 0.5:
+                    tx_prefix = "X"
+                else:
+                    cust_prefix = "K"
+
+            f.write(
+                f"{tx_prefix}{i:07d}|2024-12-{rng.randint(1, days):02d}|{product_id}|{name}|"
+                f"{quantity}|{price_text}|{cust_prefix}{rng.randint(1, customers):05d}|"
+                f"{rng.choice(REGIONS)}\n"
+            )
+
+    return filename
+
+
+def generate_catalog(seed=42):
+    """
+    Returns product dictionaries shaped like the DummyJSON API response,
+    covering PRODUCTS by numeric ID (UNMATCHED_PRODUCTS are left out).
+    """
+    rng = random.Random(seed)
+    catalog = []
+
+    for product_id, name, _ in PRODUCTS:
+        catalog.append({
+            "id": int(product_id[1:]),
+            "title": name,
+            "category": "electronics",
+            "brand": rng.choice(["Acme", "Globex", "Initech"]),
+            "rating": round(rng.uniform(3.0, 5.0), 2)
+        })
+
+    return catalog
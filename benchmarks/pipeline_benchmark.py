@@ -0,0 +1,219 @@
+"""
+Per-stage benchmark of the sales pipeline on a seeded synthetic file.
+
+Each stage is timed on its own and then re-run under tracemalloc for
+its peak allocation. Results go to a JSON file that can be diffed
+between commits; --compare flags stages that got slower.
+
+Usage:
+    python -m benchmarks.pipeline_benchmark --rows 100000 --output bench.json
+    python -m benchmarks.pipeline_benchmark --rows 100000 --compare bench.json
+"""
+import argparse
+import contextlib
+import json
+import os
+import platform
+import subprocess
+import tempfile
+import time
+import tracemalloc
+
+from benchmarks.generate import DEFAULT_DIRTINESS, generate_sales_file, generate_catalog
+from utils.file_handler import read_sales_data
+from utils.data_processor import (
+    parse_transactions,
+    validate_and_filter,
+    iter_clean_transactions,
+    clean_columns,
+    calculate_total_revenue,
+    region_wise_sales,
+    top_selling_products,
+    customer_analysis,
+    daily_sales_trend,
+    find_peak_sales_day,
+    low_performing_products
+)
+from utils.records import TRANSACTION_FIELDS
+from utils.api_handler import create_product_mapping, enrich_sales_data, save_enriched_data
+from utils.report_generator import generate_sales_report
+
+
+REGRESSION_THRESHOLD = 0.10
+REPEAT = 3
+
+
+def measure(fn, rows=None, repeat=REPEAT):
+    """
+    Runs fn repeat times for timing (best run is kept, which filters
+    out scheduler noise) and once more under tracemalloc.
+    rows defaults to len() of the result.
+    Returns (result, stats dict).
+    """
+    seconds = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        elapsed = time.perf_counter() - start
+        if seconds is None or elapsed < seconds:
+            seconds = elapsed
+
+    if rows is None:
+        rows = len(result)
+
+    tracemalloc.start()
+    fn()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    return result, {
+        "seconds": round(seconds, 4),
+        "rows": rows,
+        "rows_per_sec": round(rows / seconds) if seconds else 0,
+        "peak_kib": round(peak / 1024, 1)
+    }
+
+
+def run_pipeline(filename, workdir, seed):
+    """
+    Runs every stage in pipeline order and returns per-stage stats.
+    """
+    stages = {}
+    devnull = open(os.devnull, "w")
+
+    raw_lines, stages["read_sales_data"] = measure(lambda: read_sales_data(filename))
+
+    transactions, stages["parse_transactions"] = measure(
+        lambda: parse_transactions(raw_lines), len(raw_lines)
+    )
+
+    (valid, _, summary), stages["validate_and_filter"] = measure(
+        lambda: validate_and_filter(transactions), len(transactions)
+    )
+
+    # The fused parse + validate pass, and the vectorized check of cached columns
+    _, stages["iter_clean_transactions"] = measure(
+        lambda: list(iter_clean_transactions(raw_lines)), len(raw_lines)
+    )
+    columns = {name: [tx[name] for tx in transactions] for name in TRANSACTION_FIELDS}
+    _, stages["clean_columns"] = measure(lambda: clean_columns(columns), len(transactions))
+
+    n = len(valid)
+    for name, fn in [
+        ("calculate_total_revenue", calculate_total_revenue),
+        ("region_wise_sales", region_wise_sales),
+        ("top_selling_products", top_selling_products),
+        ("customer_analysis", customer_analysis),
+        ("daily_sales_trend", daily_sales_trend),
+        ("find_peak_sales_day", find_peak_sales_day),
+        ("low_performing_products", low_performing_products)
+    ]:
+        _, stages[name] = measure(lambda: fn(valid), n)
+
+    mapping = create_product_mapping(generate_catalog(seed))
+    enriched, stages["enrich_sales_data"] = measure(
+        lambda: enrich_sales_data(valid, mapping), n
+    )
+
+    enriched_file = os.path.join(workdir, "enriched.txt")
+    report_file = os.path.join(workdir, "report.txt")
+
+    # Silence the "saved to" print without touching the writer
+    def save():
+        with contextlib.redirect_stdout(devnull):
+            save_enriched_data(enriched, enriched_file)
+
+    _, stages["save_enriched_data"] = measure(save, n)
+    _, stages["generate_sales_report"] = measure(
+        lambda: generate_sales_report(valid, enriched, report_file), n
+    )
+
+    devnull.close()
+    return stages, summary
+
+
+def _git_commit():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(results, baseline, threshold=REGRESSION_THRESHOLD):
+    """
+    Prints per-stage time deltas against a previous results file.
+    Returns the names of stages slower than threshold.
+    """
+    regressions = []
+    print(f"\n{'Stage':<26}{'Before':>10}{'After':>10}{'Change':>10}")
+
+    for name, stats in results["stages"].items():
+        before = baseline.get("stages", {}).get(name)
+        if not before or not before["seconds"]:
+            continue
+
+        change = (stats["seconds"] - before["seconds"]) / before["seconds"]
+        flag = ""
+        if change > threshold:
+            flag = "  REGRESSION"
+            regressions.append(name)
+
+        print(f"{name:<26}{before['seconds']:>10.3f}{stats['seconds']:>10.3f}{change:>+10.1%}{flag}")
+
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Per-stage sales pipeline benchmark")
+    parser.add_argument("--rows", type=int, default=100000)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--customers", type=int, default=1000)
+    parser.add_argument("--clean", action="store_true", help="generate a file with no dirty rows")
+    parser.add_argument("--output", default="bench_results.json")
+    parser.add_argument("--compare", help="previous results file to diff against")
+    parser.add_argument("--threshold", type=float, default=REGRESSION_THRESHOLD,
+                        help="relative slowdown reported as a regression (default 0.10)")
+    args = parser.parse_args()
+
+    dirtiness = {key: 0.0 for key in DEFAULT_DIRTINESS} if args.clean else dict(DEFAULT_DIRTINESS)
+
+    with tempfile.TemporaryDirectory() as workdir:
+        filename = os.path.join(workdir, "sales_data.txt")
+        generate_sales_file(filename, args.rows, args.seed, args.customers, dirtiness=dirtiness)
+
+        stages, summary = run_pipeline(filename, workdir, args.seed)
+
+    results = {
+        "meta": {
+            "rows": args.rows,
+            "seed": args.seed,
+            "customers": args.customers,
+            "dirtiness": dirtiness,
+            "validation": summary,
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "commit": _git_commit()
+        },
+        "stages": stages
+    }
+
+    print(f"{'Stage':<26}{'Seconds':>10}{'Rows/sec':>14}{'Peak KiB':>14}")
+    for name, stats in stages.items():
+        print(f"{name:<26}{stats['seconds']:>10.3f}{stats['rows_per_sec']:>14,}{stats['peak_kib']:>14,.1f}")
+
+    with open(args.output, "w") as f:
+        json.dump(results, f, indent=2, sort_keys=True)
+    print(f"\nResults saved to {args.output}")
+
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        if compare(results, baseline, args.threshold):
+            raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
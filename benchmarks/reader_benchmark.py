@@ -0,0 +1,94 @@
+"""
+Compares the text reader (read_sales_data + parse_transactions, and the
+streaming iter_sales_records) with the memory-mapped iter_mmap_records.
+
+Usage: python -m benchmarks.reader_benchmark [--rows N] [--file PATH]
+"""
+import argparse
+import os
+import tempfile
+import time
+import tracemalloc
+
+from benchmarks.generate import generate_sales_file
+from utils.file_handler import read_sales_data, iter_sales_records, iter_mmap_records
+from utils.data_processor import parse_transactions
+
+
+def _list_path(filename):
+    return iter(parse_transactions(read_sales_data(filename)))
+
+
+READERS = {
+    "text (list)": _list_path,
+    "text (stream)": iter_sales_records,
+    "mmap (stream)": iter_mmap_records
+}
+
+
+def _consume(records):
+    rows = 0
+    for _ in records:
+        rows += 1
+    return rows
+
+
+def measure(reader, filename):
+    """
+    Returns rows, seconds, rows/sec and peak traced allocation size.
+    Timing and allocation tracing are separate runs so tracing overhead
+    does not skew throughput.
+    """
+    start = time.perf_counter()
+    rows = _consume(reader(filename))
+    seconds = time.perf_counter() - start
+
+    tracemalloc.start()
+    _consume(reader(filename))
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    # Memory held when every record is kept (shared strings pay off here)
+    tracemalloc.start()
+    records = list(reader(filename))
+    held, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del records
+
+    return {
+        "rows": rows,
+        "seconds": round(seconds, 4),
+        "rows_per_sec": round(rows / seconds) if seconds else 0,
+        "peak_alloc_kib": round(peak / 1024, 1),
+        "held_kib": round(held / 1024, 1)
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--rows", type=int, default=200000)
+    parser.add_argument("--file", help="existing sales file (default: generate one)")
+    args = parser.parse_args()
+
+    filename = args.file
+    tmp = None
+    if filename is None:
+        fd, tmp = tempfile.mkstemp(suffix=".txt")
+        os.close(fd)
+        filename = generate_sales_file(tmp, args.rows)
+
+    try:
+        print(f"{'Reader':<16}{'Rows':>10}{'Seconds':>10}{'Rows/sec':>12}{'Peak KiB':>12}{'Held KiB':>12}")
+        for name, reader in READERS.items():
+            r = measure(reader, filename)
+            print(
+                f"{name:<16}{r['rows']:>10}{r['seconds']:>10.3f}"
+                f"{r['rows_per_sec']:>12,}{r['peak_alloc_kib']:>12,.1f}{r['held_kib']:>12,.1f}"
+            )
+    finally:
+        if tmp:
+            os.remove(tmp)
+
+
+if __name__ == "__main__":
+    main()
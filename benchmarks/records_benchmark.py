@@ -0,0 +1,229 @@
+"""
+Compares per-row dicts (the previous row format) with the slotted
+Transaction / EnrichedTransaction records: memory held per row for the
+parsed and enriched datasets, and the time to compute the report
+metrics, with the previous dict-keyed functions on the dicts and the
+current metric functions on the records.
+
+Usage: python -m benchmarks.records_benchmark [--rows N]
+"""
+import argparse
+import os
+import tempfile
+import time
+import tracemalloc
+
+from benchmarks.generate import generate_sales_file, generate_catalog
+from utils.file_handler import read_sales_data
+from utils.data_processor import (
+    parse_transactions,
+    region_wise_sales,
+    top_selling_products,
+    customer_analysis,
+    daily_sales_trend,
+    find_peak_sales_day,
+    low_performing_products
+)
+from utils.api_handler import create_product_mapping, enrich_sales_data
+from utils.records import Transaction
+
+
+def _held(build):
+    """
+    Returns (result, bytes still allocated by build() once it returns).
+    """
+    tracemalloc.start()
+    result = build()
+    held, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return result, held
+
+
+def _dict_enrich(rows, enriched):
+    # The old enrichment: a copy of every row plus four API keys
+    result = []
+    for tx, e in zip(rows, enriched):
+        row = dict(tx)
+        row.update({
+            "API_Category": e["API_Category"],
+            "API_Brand": e["API_Brand"],
+            "API_Rating": e["API_Rating"],
+            "API_Match": e["API_Match"]
+        })
+        result.append(row)
+    return result
+
+
+# =========================
+# PREVIOUS DICT-KEYED METRICS
+# =========================
+
+def _dict_region_wise_sales(rows):
+    total_revenue = sum(tx["Quantity"] * tx["UnitPrice"] for tx in rows)
+    regions = {}
+    for tx in rows:
+        region = tx["Region"].strip()
+        if not region:
+            continue
+        if region not in regions:
+            regions[region] = {"total_sales": 0.0, "transaction_count": 0}
+        regions[region]["total_sales"] += tx["Quantity"] * tx["UnitPrice"]
+        regions[region]["transaction_count"] += 1
+
+    for data in regions.values():
+        data["percentage"] = round((data["total_sales"] / total_revenue) * 100, 2)
+    return dict(sorted(regions.items(), key=lambda x: x[1]["total_sales"], reverse=True))
+
+
+def _dict_products(rows):
+    products = {}
+    for tx in rows:
+        name = tx["ProductName"]
+        if name not in products:
+            products[name] = {"qty": 0, "revenue": 0.0}
+        products[name]["qty"] += tx["Quantity"]
+        products[name]["revenue"] += tx["Quantity"] * tx["UnitPrice"]
+    return [(name, data["qty"], round(data["revenue"], 2)) for name, data in products.items()]
+
+
+def _dict_top_selling_products(rows, n=5):
+    products = _dict_products(rows)
+    products.sort(key=lambda x: x[1], reverse=True)
+    return products[:n]
+
+
+def _dict_low_performing_products(rows, threshold=10):
+    products = [p for p in _dict_products(rows) if p[1] < threshold]
+    products.sort(key=lambda x: x[1])
+    return products
+
+
+def _dict_customer_analysis(rows):
+    customers = {}
+    for tx in rows:
+        customer_id = tx["CustomerID"].strip()
+        if not customer_id:
+            continue
+        if customer_id not in customers:
+            customers[customer_id] = {"total_spent": 0.0, "purchase_count": 0, "products": set()}
+        customers[customer_id]["total_spent"] += tx["Quantity"] * tx["UnitPrice"]
+        customers[customer_id]["purchase_count"] += 1
+        customers[customer_id]["products"].add(tx["ProductName"])
+
+    result = {
+        cid: {
+            "total_spent": round(data["total_spent"], 2),
+            "purchase_count": data["purchase_count"],
+            "avg_order_value": round(data["total_spent"] / data["purchase_count"], 2),
+            "products_bought": sorted(data["products"])
+        }
+        for cid, data in customers.items()
+    }
+    return dict(sorted(result.items(), key=lambda x: x[1]["total_spent"], reverse=True))
+
+
+def _dict_daily_sales_trend(rows):
+    days = {}
+    for tx in rows:
+        date = tx["Date"]
+        if not date:
+            continue
+        if date not in days:
+            days[date] = {"revenue": 0.0, "transaction_count": 0, "customers": set()}
+        days[date]["revenue"] += tx["Quantity"] * tx["UnitPrice"]
+        days[date]["transaction_count"] += 1
+        customer = tx["CustomerID"].strip()
+        if customer:
+            days[date]["customers"].add(customer)
+
+    return {
+        date: {
+            "revenue": round(days[date]["revenue"], 2),
+            "transaction_count": days[date]["transaction_count"],
+            "unique_customers": len(days[date]["customers"])
+        }
+        for date in sorted(days)
+    }
+
+
+def _dict_find_peak_sales_day(rows):
+    days = {}
+    for tx in rows:
+        date = tx["Date"]
+        if date not in days:
+            days[date] = {"revenue": 0.0, "count": 0}
+        days[date]["revenue"] += tx["Quantity"] * tx["UnitPrice"]
+        days[date]["count"] += 1
+
+    peak = max(days, key=lambda d: days[d]["revenue"])
+    return peak, round(days[peak]["revenue"], 2), days[peak]["count"]
+
+
+DICT_METRICS = [
+    _dict_region_wise_sales, _dict_top_selling_products, _dict_customer_analysis,
+    _dict_daily_sales_trend, _dict_find_peak_sales_day, _dict_low_performing_products
+]
+
+RECORD_METRICS = [
+    region_wise_sales, top_selling_products, customer_analysis,
+    daily_sales_trend, find_peak_sales_day, low_performing_products
+]
+
+
+def _run_metrics(metrics, rows):
+    return [metric(rows) for metric in metrics]
+
+
+def _best_time(fn, repeat=3):
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        elapsed = time.perf_counter() - start
+        if best is None or elapsed < best:
+            best = elapsed
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--rows", type=int, default=200000)
+    args = parser.parse_args()
+
+    fd, filename = tempfile.mkstemp(suffix=".txt")
+    os.close(fd)
+
+    try:
+        generate_sales_file(filename, args.rows)
+        raw_lines = read_sales_data(filename)
+        mapping = create_product_mapping(generate_catalog())
+
+        # Both layouts are built over the same field objects, so only the
+        # per-row containers are measured
+        parsed = parse_transactions(raw_lines)
+        dicts, dicts_held = _held(lambda: [tx.to_dict() for tx in parsed])
+        records, records_held = _held(lambda: [Transaction.from_dict(tx) for tx in dicts])
+        del parsed
+
+        enriched, enriched_held = _held(lambda: enrich_sales_data(records, mapping))
+        enriched_dicts, enriched_dicts_held = _held(lambda: _dict_enrich(dicts, enriched))
+
+        rows = len(records)
+        print(f"{'Layout':<24}{'Parsed B/row':>14}{'Enriched B/row':>16}{'Metrics s':>13}")
+
+        dict_seconds = _best_time(lambda: _run_metrics(DICT_METRICS, dicts))
+        record_seconds = _best_time(lambda: _run_metrics(RECORD_METRICS, records))
+
+        print(f"{'dict':<24}{dicts_held / rows:>14.1f}{enriched_dicts_held / rows:>16.1f}{dict_seconds:>13.3f}")
+        print(f"{'Transaction records':<24}{records_held / rows:>14.1f}{enriched_held / rows:>16.1f}{record_seconds:>13.3f}")
+        print(
+            f"\nPer-row containers: parsed {dicts_held / records_held:.1f}x smaller, "
+            f"enriched {enriched_dicts_held / enriched_held:.1f}x smaller, "
+            f"both together {(dicts_held + enriched_dicts_held) / (records_held + enriched_held):.1f}x smaller"
+        )
+    finally:
+        os.remove(filename)
+
+
+if __name__ == "__main__":
+    main()
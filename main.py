@@ -3,113 +3,454 @@ Sales Analytics System
 Main application entry point
 Executes end-to-end analytics workflow
 """
-from utils.file_handler import read_sales_data
+import argparse
+import asyncio
+import sys
+import traceback
+from functools import partial
+
+from utils.file_handler import read_sales_data, read_sales_columns, iter_sales_data, iter_mmap_records
 from utils.data_processor import (
-    parse_transactions,
-    validate_and_filter,
+    iter_transactions,
+    iter_validated,
+    iter_clean_transactions,
+    clean_columns,
     region_wise_sales,
+    TransactionStream,
+    RANKINGS,
+    AggregateCache,
+    cached_accumulators,
 )
 from utils.api_handler import (
     fetch_all_products,
+    fetch_product_ratings,
     create_product_mapping,
+    iter_enriched,
     enrich_sales_data,
-    save_enriched_data
+    save_enriched_data,
+    FETCH_STATS
 )
-from utils.report_generator import generate_sales_report
+from utils.report_generator import generate_sales_report, ENGINES
+from utils.report_builder import SECTIONS
+from utils.parallel import parallel_aggregate
+from utils.incremental import incremental_aggregate
+from utils.sqlite_store import SalesDatabase, DB_PATH
+from utils.metrics import PipelineMetrics
+from utils.parse_cache import PARSE_CACHE_STATS
+from utils.records import TRANSACTION_FIELDS, Transaction, paused_gc
+from utils.sketches import DISTINCT_MODES
+from utils.validation import PARSE_RULES, QuarantineWriter
 
 
 FILE_PATH = "data/sales_data.txt"
+ENRICHED_PATH = "data/enriched_sales_data.txt"
+REPORT_PATH = "output/sales_report.txt"
 
 
-def main():
-    print("=" * 45)
-    print("SALES ANALYTICS SYSTEM")
-    print("=" * 45)
+def positive_amount(text):
+    """
+    argparse type for the amount filters. A 0 bound would silently mean
+    no bound (filters that are falsy are off), so bounds must be > 0.
+    """
+    try:
+        value = float(text)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"invalid amount: {text!r}")
+    if not value > 0:
+        raise argparse.ArgumentTypeError(f"amount bounds must be positive, got {text}")
+    return value
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(
+        description="Sales analytics pipeline: read, clean, analyze, enrich and report."
+    )
+
+    io_group = parser.add_argument_group("input / output")
+    io_group.add_argument("--input", default=FILE_PATH, help="pipe-delimited sales file")
+    io_group.add_argument("--enriched-output", default=ENRICHED_PATH, help="enriched data file; .csv, .jsonl, .json and .gz/.zst extensions select the format")
+    io_group.add_argument("--report-output", default=REPORT_PATH,
+                          help="report file; .json, .csv and .html extensions select the format, else text")
+    io_group.add_argument("--report-sections", type=lambda value: value.split(","),
+                          help=f"comma-separated report sections to include ({', '.join(SECTIONS)})")
+    io_group.add_argument("--quarantine", metavar="PATH",
+                          help="write rejected raw lines to PATH as '<rule><TAB><line>' (reads the input "
+                               "without the parse cache)")
+
+    filters = parser.add_argument_group("filters (applied during parsing)")
+    filters.add_argument("--region", help="keep only this region")
+    filters.add_argument("--min-amount", type=positive_amount, help="minimum transaction amount (> 0)")
+    filters.add_argument("--max-amount", type=positive_amount, help="maximum transaction amount (> 0)")
+    filters.add_argument("--interactive", action="store_true",
+                         help="show filter options and prompt for filters")
+
+    engine = parser.add_argument_group("execution")
+    engine.add_argument("--engine", choices=ENGINES, default="python",
+                        help="report engine: dict accumulators, numpy columnar table, SQL over --db, "
+                             "or a sales cube for the non-customer metrics")
+    engine.add_argument("--rankings", choices=RANKINGS, default="exact",
+                        help="exact customer ranking, or bounded-memory approximate heavy hitters")
+    engine.add_argument("--distinct", choices=DISTINCT_MODES, default="exact",
+                        help="unique-customer counts: exact sets or HyperLogLog sketches")
+    engine.add_argument("--workers", type=int, default=1,
+                        help="worker processes for parsing/validation/aggregation")
+    engine.add_argument("--streaming", action="store_true",
+                        help="re-read the file lazily per stage instead of holding rows in memory")
+    engine.add_argument("--reader", choices=["text", "mmap"], default="text",
+                        help="record reader used in streaming mode")
+    engine.add_argument("--incremental", action="store_true",
+                        help="persist aggregates and only process appended lines")
+    engine.add_argument("--db", default=DB_PATH,
+                        help="SQLite database the sqlite engine loads the input into (incrementally)")
+    engine.add_argument("--aggregate-cache", metavar="DIR",
+                        help="reuse report aggregates cached in DIR for the same input and filters")
+    engine.add_argument("--no-parse-cache", dest="parse_cache", action="store_false",
+                        help="always re-parse the input instead of loading the binary parse cache")
+
+    api = parser.add_argument_group("product API")
+    api.add_argument("--offline", action="store_true", help="use the cached catalog only")
+    api.add_argument("--ratings", action="store_true",
+                     help="fill missing ratings from the rating service")
+    api.add_argument("--rating-seed", type=int, help="seed for reproducible simulated ratings")
+    api.add_argument("--no-prefetch", dest="prefetch", action="store_false",
+                     help="fetch the catalog and ratings at their step instead of overlapping them with ingestion")
+
+    instrumentation = parser.add_argument_group("instrumentation")
+    instrumentation.add_argument("--metrics-file",
+                                 help="export stage metrics (.prom for Prometheus text, else JSON)")
+    instrumentation.add_argument("--profile", action="store_true",
+                                 help="capture cProfile output per stage")
+    instrumentation.add_argument("--trace-memory", action="store_true",
+                                 help="record tracemalloc peak per stage")
+
+    return parser
 
+
+def prompt_filters(args, transactions):
+    """
+    Shows the available regions and amount range, then asks for filters.
+    """
+    regions = set()
+    min_amount = max_amount = None
+    for tx in transactions:
+        regions.add(tx["Region"])
+        amount = tx["Quantity"] * tx["UnitPrice"]
+        if min_amount is None or amount < min_amount:
+            min_amount = amount
+        if max_amount is None or amount > max_amount:
+            max_amount = amount
+
+    print(f"Regions: {', '.join(sorted(regions))}")
+    if min_amount is not None:
+        print(f"Amount Range: ₹{int(min_amount):,} - ₹{int(max_amount):,}")
+
+    apply_filter = input("\nDo you want to filter data? (y/n): ").lower().strip()
+
+    if apply_filter == "y":
+        region = input("Enter region (or press Enter to skip): ").strip()
+        min_amt = input("Enter minimum amount (or press Enter to skip): ").strip()
+        max_amt = input("Enter maximum amount (or press Enter to skip): ").strip()
+
+        args.region = region or None
+        args.min_amount = _prompt_amount(min_amt)
+        args.max_amount = _prompt_amount(max_amt)
+
+
+def _prompt_amount(text):
+    if not text:
+        return None
     try:
-        # [1/10] Read sales data
-        print("\n[1/10] Reading sales data...")
-        raw_lines = read_sales_data(FILE_PATH)
-        print(f"✓ Successfully read {len(raw_lines)} records")
-
-        # [2/10] Parse transactions
-        print("\n[2/10] Parsing and cleaning data...")
-        transactions = parse_transactions(raw_lines)
-        print(f"✓ Parsed {len(transactions)} records")
-
-        # [3/10] Show filter options
-        print("\n[3/10] Filter Options Available:")
-        regions = sorted({tx["Region"] for tx in transactions})
-        amounts = [tx["Quantity"] * tx["UnitPrice"] for tx in transactions]
-
-        print(f"Regions: {', '.join(regions)}")
-        print(f"Amount Range: ₹{int(min(amounts)):,} - ₹{int(max(amounts)):,}")
-
-        apply_filter = input("\nDo you want to filter data? (y/n): ").lower().strip()
-
-        filtered_transactions = transactions
-        if apply_filter == "y":
-            region = input("Enter region (or press Enter to skip): ").strip()
-            min_amt = input("Enter minimum amount (or press Enter to skip): ").strip()
-            max_amt = input("Enter maximum amount (or press Enter to skip): ").strip()
-
-            filtered_transactions = []
-            for tx in transactions:
-                amount = tx["Quantity"] * tx["UnitPrice"]
-
-                if region and tx["Region"] != region:
-                    continue
-                if min_amt and amount < float(min_amt):
-                    continue
-                if max_amt and amount > float(max_amt):
-                    continue
-
-                filtered_transactions.append(tx)
-
-            print(f"✓ Records after filtering: {len(filtered_transactions)}")
-
-        # [4/10] Validate transactions
-        print("\n[4/10] Validating transactions...")
-        valid_transactions, invalid_count, summary = validate_and_filter(filtered_transactions)
-        print(f"✓ Valid: {summary['final_count']} | Invalid: {invalid_count}")
-
-        # [5/10] Perform analysis
-        print("\n[5/10] Analyzing sales data...")
-        region_wise_sales(valid_transactions)
-        print("✓ Analysis complete")
-
-        # [6/10] Fetch API data
-        print("\n[6/10] Fetching product data from API...")
-        api_products = fetch_all_products()
+        return positive_amount(text)
+    except argparse.ArgumentTypeError as e:
+        print(f"Ignoring {e}")
+        return None
+
+
+async def run_pipeline(args, metrics):
+    """
+    Runs the nine pipeline steps. The product catalog fetch starts
+    before the input is read and the rating lookups as soon as the
+    valid rows are known; both run in worker threads while the local
+    steps proceed, and enrichment awaits them only when it needs them.
+    """
+    # run_in_executor submits at once, so the fetch is already running
+    # while the synchronous local steps below hold the event loop
+    loop = asyncio.get_running_loop()
+    catalog = ratings = None
+    if args.prefetch:
+        catalog = loop.run_in_executor(None, partial(fetch_all_products, offline=args.offline))
+
+    # [1/9] Read sales data
+    print("\n[1/9] Reading sales data...")
+    with metrics.stage("read"):
+        columns = None
+        if args.streaming:
+            raw_lines = TransactionStream(
+                lambda: metrics.counted(iter_sales_data(args.input), "rows_read")
+            )
+            print(f"✓ Streaming records from {args.input}")
+        elif args.incremental:
+            # Analysis parses only the appended lines; the full file is
+            # streamed once, for enrichment
+            raw_lines = TransactionStream(lambda: iter_sales_data(args.input))
+            print(f"✓ Reading {args.input} incrementally")
+        elif args.workers > 1:
+            # The workers parse the file for analysis; it is streamed
+            # once more, for enrichment
+            raw_lines = TransactionStream(lambda: iter_sales_data(args.input))
+            print(f"✓ Reading {args.input} in {args.workers} workers")
+        elif args.parse_cache and not args.quarantine:
+            # Parsed columns come from the binary cache when the input is unchanged
+            columns = read_sales_columns(args.input)
+            metrics.set("rows_read", PARSE_CACHE_STATS["lines"])
+            metrics.set("parse_cache_hit", int(PARSE_CACHE_STATS["hit"]))
+            source = " (parse cache)" if PARSE_CACHE_STATS["hit"] else ""
+            print(f"✓ Successfully read {PARSE_CACHE_STATS['lines']} records{source}")
+        else:
+            raw_lines = read_sales_data(args.input)
+            metrics.set("rows_read", len(raw_lines))
+            print(f"✓ Successfully read {len(raw_lines)} records")
+
+    # [2/9] Filters
+    print("\n[2/9] Filter Options:")
+    if args.interactive:
+        with metrics.stage("filter_options"):
+            if columns is not None:
+                prompt_filters(args, map(Transaction, *(columns[name] for name in TRANSACTION_FIELDS)))
+            else:
+                prompt_filters(args, iter_transactions(raw_lines))
+
+    print(
+        f"Region: {args.region or 'all'} | "
+        f"Min amount: {args.min_amount if args.min_amount is not None else '-'} | "
+        f"Max amount: {args.max_amount if args.max_amount is not None else '-'}"
+    )
+
+    # [3/9] Parse, validate and filter in one pass
+    print("\n[3/9] Parsing, validating and filtering...")
+    with metrics.stage("clean"):
+        accumulators = None
+        summary = {}
+        filters = (summary, args.region, args.min_amount, args.max_amount)
+        quarantine = QuarantineWriter(args.quarantine) if args.quarantine else None
+
+        try:
+            if args.incremental:
+                # Counters and aggregates come from the persisted state
+                # plus the lines appended since the last run
+                accumulators, summary, info = incremental_aggregate(
+                    args.input,
+                    region=args.region,
+                    min_amount=args.min_amount,
+                    max_amount=args.max_amount,
+                    distinct=args.distinct,
+                    rankings=args.rankings,
+                    quarantine=quarantine
+                )
+                valid_transactions = TransactionStream(lambda: iter_clean_transactions(
+                    raw_lines, None, args.region, args.min_amount, args.max_amount
+                ))
+            elif args.workers > 1:
+                # Counters and aggregates come from the worker pass
+                accumulators, summary = parallel_aggregate(
+                    args.input, args.workers,
+                    region=args.region,
+                    min_amount=args.min_amount,
+                    max_amount=args.max_amount,
+                    rankings=args.rankings,
+                    distinct=args.distinct,
+                    quarantine=quarantine
+                )
+                valid_transactions = TransactionStream(lambda: iter_clean_transactions(
+                    raw_lines, None, args.region, args.min_amount, args.max_amount
+                ))
+            elif args.streaming:
+                if args.reader == "mmap":
+                    def clean(quarantine=None):
+                        return iter_validated(iter_mmap_records(args.input), *filters, quarantine)
+                else:
+                    def clean(quarantine=None):
+                        return iter_clean_transactions(raw_lines, *filters, quarantine)
+
+                valid_transactions = TransactionStream(clean)
+                # Counting pass; later passes re-validate without quarantining
+                for _ in clean(quarantine):
+                    pass
+            elif columns is not None:
+                valid_transactions = clean_columns(columns, *filters, quarantine)
+            else:
+                with paused_gc():
+                    valid_transactions = list(iter_clean_transactions(raw_lines, *filters, quarantine))
+        finally:
+            if quarantine is not None:
+                quarantine.close()
+
+        # Lines dropped while building the parse cache were counted then
+        rejections = summary["rejections"]
+        if columns is not None:
+            rejections.update(PARSE_CACHE_STATS["rejections"])
+
+        metrics.set("rows_parsed", summary["total_input"])
+        if "rows_read" in metrics.counters:
+            metrics.set("rows_dropped_by_parse", metrics.counters["rows_read"] - summary["total_input"])
+        metrics.set("rows_invalid", summary["invalid"])
+        metrics.set("rows_filtered_by_region", summary["filtered_by_region"])
+        metrics.set("rows_filtered_by_amount", summary["filtered_by_amount"])
+        metrics.set("rows_valid", summary["final_count"])
+        for rule, count in rejections.items():
+            # The mmap reader drops malformed lines without classifying them
+            if not (args.streaming and args.reader == "mmap" and rule in PARSE_RULES):
+                metrics.set(f"rows_rejected_{rule}", count)
+
+        print(f"✓ Parsed {summary['total_input']} records")
+        print(
+            f"✓ Valid: {summary['final_count']} | Invalid: {summary['invalid']} | "
+            f"Filtered out: {summary['filtered_by_region'] + summary['filtered_by_amount']}"
+        )
+        rejected = [f"{rule} {count}" for rule, count in rejections.items() if count]
+        if rejected:
+            print(f"✓ Rejected by rule: {', '.join(rejected)}")
+        if quarantine is not None:
+            print(f"✓ Quarantined {quarantine.rows} rows to {args.quarantine}")
+
+    if args.ratings and args.prefetch:
+        ratings = loop.run_in_executor(None, partial(
+            fetch_product_ratings, (tx["ProductID"] for tx in valid_transactions), seed=args.rating_seed
+        ))
+
+    # [4/9] Perform analysis
+    print("\n[4/9] Analyzing sales data...")
+    with metrics.stage("analyze"):
+        database = None
+        if args.incremental:
+            metrics.set("incremental_new_bytes", info["new_bytes"])
+            print(f"✓ Analysis complete ({info['mode']}, {info['new_bytes']:,} new bytes)")
+        elif args.workers > 1:
+            print(f"✓ Analysis complete ({args.workers} workers)")
+        elif args.engine == "sqlite":
+            database = SalesDatabase(
+                args.db, args.region, args.min_amount, args.max_amount, source=args.input
+            )
+            info = database.load_file(args.input)
+            metrics.set("sqlite_new_rows", info["new_rows"])
+            print(f"✓ Analysis complete ({info['mode']}, {info['new_rows']:,} new rows in {args.db})")
+        elif args.aggregate_cache:
+            cache = AggregateCache(directory=args.aggregate_cache)
+            accumulators, origin = cached_accumulators(
+                cache, args.input, valid_transactions,
+                args.region, args.min_amount, args.max_amount,
+                distinct=args.distinct, rankings=args.rankings
+            )
+            metrics.set("aggregate_cache_hit", int(origin in ("memory", "disk")))
+            print(f"✓ Analysis complete (aggregates: {origin})")
+        else:
+            region_wise_sales(valid_transactions)
+            print("✓ Analysis complete")
+
+    # [5/9] Fetch API data
+    print("\n[5/9] Fetching product data from API...")
+    with metrics.stage("fetch_api"):
+        if catalog is not None:
+            api_products = await catalog
+        else:
+            api_products = fetch_all_products(offline=args.offline)
+
+        metrics.set("api_products", len(api_products))
+        metrics.set("api_from_network", int(FETCH_STATS["source"] == "network"))
+        if FETCH_STATS["source"] == "network":
+            metrics.set("api_latency_seconds", FETCH_STATS["seconds"])
+            metrics.set("api_pages", len(FETCH_STATS["pages"]))
         print(f"✓ Fetched {len(api_products)} products")
 
-        # [7/10] Enrich sales data
-        print("\n[7/10] Enriching sales data...")
+    # [6/9] Enrich sales data
+    print("\n[6/9] Enriching sales data...")
+    with metrics.stage("enrich"):
         product_mapping = create_product_mapping(api_products)
-        enriched_transactions = enrich_sales_data(valid_transactions, product_mapping)
 
-        enriched_count = sum(1 for tx in enriched_transactions if tx["API_Match"])
-        success_rate = (enriched_count / len(enriched_transactions)) * 100
-        print(f"✓ Enriched {enriched_count}/{len(enriched_transactions)} transactions ({success_rate:.1f}%)")
+        if ratings is not None:
+            ratings = await ratings
+        elif args.ratings:
+            ratings = fetch_product_ratings(
+                (tx["ProductID"] for tx in valid_transactions), seed=args.rating_seed
+            )
+        if ratings is not None:
+            print(f"✓ Rated {len(ratings)} distinct products")
+
+        product_mapping.reset_stats()
+        if args.streaming:
+            enriched_transactions = TransactionStream(
+                lambda: iter_enriched(valid_transactions, product_mapping, ratings)
+            )
+        else:
+            enriched_transactions = enrich_sales_data(valid_transactions, product_mapping, ratings)
 
-        # [8/10] Save enriched data
-        print("\n[8/10] Saving enriched data...")
-        save_enriched_data(enriched_transactions)
-        print("✓ Saved to data/enriched_sales_data.txt")
+        enriched_total = 0
+        enriched_count = 0
+        for tx in enriched_transactions:
+            enriched_total += 1
+            if tx["API_Match"]:
+                enriched_count += 1
 
-        # [9/10] Generate report
-        print("\n[9/10] Generating report...")
-        generate_sales_report(valid_transactions, enriched_transactions)
-        print("✓ Report saved to output/sales_report.txt")
+        # Captured now: streaming re-runs enrichment on later passes
+        metrics.set("enrich_hits_by_id", product_mapping.stats["id"])
+        metrics.set("enrich_hits_by_title", product_mapping.stats["title"])
+        metrics.set("enrich_misses", product_mapping.stats["miss"])
 
-        # [10/10] Done
-        print("\n[10/10] Process Complete!")
-        print("=" * 45)
+        success_rate = (enriched_count / enriched_total) * 100 if enriched_total else 0
+        print(f"✓ Enriched {enriched_count}/{enriched_total} transactions ({success_rate:.1f}%)")
+
+    # [7/9] Save enriched data
+    print("\n[7/9] Saving enriched data...")
+    with metrics.stage("save"):
+        save_enriched_data(enriched_transactions, args.enriched_output)
+        print(f"✓ Saved to {args.enriched_output}")
+
+    # [8/9] Generate report
+    print("\n[8/9] Generating report...")
+    with metrics.stage("report"):
+        generate_sales_report(
+            database if database is not None else valid_transactions,
+            enriched_transactions, args.report_output,
+            engine=args.engine, accumulators=accumulators,
+            rankings=args.rankings, distinct=args.distinct,
+            sections=args.report_sections
+        )
+        if database is not None:
+            database.close()
+        print(f"✓ Report saved to {args.report_output}")
+
+    # [9/9] Done
+    print("\n[9/9] Process Complete!")
+    print("=" * 45)
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+
+    print("=" * 45)
+    print("SALES ANALYTICS SYSTEM")
+    print("=" * 45)
+
+    metrics = PipelineMetrics(profile=args.profile, trace_memory=args.trace_memory)
+
+    try:
+        asyncio.run(run_pipeline(args, metrics))
 
     except Exception as e:
         print("\nAn error occurred:")
         print(str(e))
+        if metrics.error is None:
+            metrics.error = {"stage": None, "type": type(e).__name__, "message": str(e)}
+        if args.profile:
+            traceback.print_exc()
+
+    finally:
+        if args.metrics_file:
+            metrics.export(args.metrics_file)
+            print(f"Metrics saved to {args.metrics_file}")
+
+    return 1 if metrics.error else 0
 
 
 if __name__ == "__main__":
-    main()
+    sys.exit(main())
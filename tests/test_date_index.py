@@ -0,0 +1,98 @@
+"""
+DateIndex range queries and rollups agree with a scan of the rows, and
+the date metric functions answer from an index exactly as from rows.
+"""
+import os
+import unittest
+from datetime import date, timedelta
+
+from utils.file_handler import read_sales_data
+from utils.data_processor import (
+    aggregate_transactions,
+    date_range,
+    daily_sales_trend,
+    find_peak_sales_day,
+    iter_clean_transactions
+)
+from utils.date_index import DateIndex, build_date_index
+from utils.records import Transaction
+
+SAMPLE = os.path.join(os.path.dirname(__file__), "..", "data", "sales_data.txt")
+
+
+def scan(transactions, include):
+    """
+    Revenue and count of the rows whose date passes include(date).
+    """
+    revenue = 0.0
+    count = 0
+    for tx in transactions:
+        if include(date.fromisoformat(tx.Date)):
+            revenue += tx.Quantity * tx.UnitPrice
+            count += 1
+    return round(revenue, 2), count
+
+
+class DateIndexTest(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.transactions = list(iter_clean_transactions(read_sales_data(SAMPLE)))
+        cls.index = build_date_index(cls.transactions, keep_rows=True)
+
+    def assertMatches(self, summary, expected):
+        self.assertAlmostEqual(summary["revenue"], expected[0], places=2)
+        self.assertEqual(summary["transaction_count"], expected[1])
+
+    def test_range(self):
+        start, end = date(2024, 12, 3), date(2024, 12, 9)
+        self.assertMatches(
+            self.index.range_summary(start, end),
+            scan(self.transactions, lambda d: start <= d <= end)
+        )
+        self.assertMatches(
+            self.index.month_to_date("2024-12-15"),
+            scan(self.transactions, lambda d: date(2024, 12, 1) <= d <= date(2024, 12, 15))
+        )
+        rows = list(self.index.transactions(start, end))
+        self.assertEqual(len(rows), self.index.range_summary(start, end)["transaction_count"])
+
+    def test_rolling(self):
+        for window in (7, 30):
+            rolling = self.index.rolling(window)
+            for text, summary in rolling.items():
+                day = date.fromisoformat(text)
+                first = day - timedelta(days=window - 1)
+                self.assertMatches(summary, scan(self.transactions, lambda d: first <= d <= day))
+
+    def test_weekly_and_monthly(self):
+        for text, summary in self.index.weekly().items():
+            year, week = text.split("-W")
+            self.assertMatches(summary, scan(
+                self.transactions, lambda d: d.isocalendar()[:2] == (int(year), int(week))
+            ))
+        for text, summary in self.index.monthly().items():
+            self.assertMatches(summary, scan(self.transactions, lambda d: f"{d.year}-{d.month:02d}" == text))
+
+    def test_metric_functions(self):
+        self.assertEqual(daily_sales_trend(self.index), daily_sales_trend(self.transactions))
+        self.assertEqual(find_peak_sales_day(self.index), find_peak_sales_day(self.transactions))
+        self.assertEqual(date_range(self.index), date_range(self.transactions))
+
+    def test_merge(self):
+        half = len(self.transactions) // 2
+        first = aggregate_transactions(self.transactions[:half], {"dates": DateIndex()})["dates"]
+        second = aggregate_transactions(self.transactions[half:], {"dates": DateIndex()})["dates"]
+        first.merge(second)
+        self.assertEqual(first.daily_sales_trend(), daily_sales_trend(self.transactions))
+        self.assertEqual(first.daily(), self.index.daily())
+
+    def test_unparsed_dates(self):
+        index = build_date_index(self.transactions[:3])
+        index.add(Transaction.from_dict({**dict(self.transactions[3]), "Date": "not-a-date"}), 10.0)
+        self.assertEqual(index.unparsed, 1)
+        self.assertEqual(sum(s["transaction_count"] for s in index.daily().values()), 3)
+
+
+if __name__ == "__main__":
+    unittest.main()
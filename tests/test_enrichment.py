@@ -0,0 +1,83 @@
+"""
+The precompiled title matcher and the product index pick the same
+product as the linear scan they replace.
+"""
+import random
+import unittest
+
+from utils.api_handler import _TitleMatcher, create_product_mapping, enrich_sales_data
+from utils.records import Transaction
+
+
+def scan(titles, name):
+    """
+    The original fallback: the first title that is a substring of the
+    name or contains it.
+    """
+    for index, title in enumerate(titles):
+        if title is None:
+            continue
+        if title.lower() in name.lower() or name.lower() in title.lower():
+            return index
+    return None
+
+
+def random_text(rng, alphabet="abAB \0", longest=6):
+    return "".join(rng.choice(alphabet) for _ in range(rng.randint(0, longest)))
+
+
+class TitleMatcherTest(unittest.TestCase):
+
+    def test_random_titles(self):
+        # A tiny alphabet makes overlapping and nested matches common
+        rng = random.Random(3)
+        for _ in range(300):
+            titles = [random_text(rng) if rng.random() > 0.1 else None for _ in range(rng.randint(0, 8))]
+            matcher = _TitleMatcher(titles)
+            for _ in range(20):
+                name = random_text(rng, longest=10)
+                self.assertEqual(matcher.match(name), scan(titles, name), (titles, name))
+
+    def test_catalog_titles(self):
+        titles = ["Essence Mascara Lash Princess", "iPhone 9", "Laptop", "Apple AirPods", "Mouse"]
+        matcher = _TitleMatcher(titles)
+        for name in ["Laptop", "Gaming Laptop Pro", "wireless mouse", "iphone", "AirPods", "USB Cable", ""]:
+            with self.subTest(name=name):
+                self.assertEqual(matcher.match(name), scan(titles, name))
+
+
+class ProductIndexTest(unittest.TestCase):
+
+    def test_enrichment_matches_scan(self):
+        products = [
+            {"id": 1, "title": "Laptop", "category": "laptops", "brand": "A", "rating": 4.5},
+            {"id": 2, "title": "Wireless Mouse", "category": "accessories", "brand": "B", "rating": 4.0},
+            {"id": 3, "title": "Monitor", "category": "monitors", "brand": "C", "rating": 3.5}
+        ]
+        mapping = create_product_mapping(products)
+        rows = [
+            Transaction("T1", "2024-12-01", "P2", "Anything", 1, 10.0, "C1", "North"),
+            Transaction("T2", "2024-12-01", "P99", "Gaming Laptop", 1, 10.0, "C1", "North"),
+            Transaction("T3", "2024-12-01", "P0", "mouse", 1, 10.0, "C1", "North"),
+            Transaction("T4", "2024-12-01", "P0", "Keyboard", 1, 10.0, "C1", "North"),
+            Transaction("T5", "2024-12-01", "P99", "Gaming Laptop", 1, 10.0, "C1", "North")
+        ]
+        titles = [p["title"] for p in mapping.values()]
+        products_by_index = list(mapping.values())
+
+        enriched = enrich_sales_data(rows, mapping)
+        for tx, row in zip(rows, enriched):
+            numeric = "".join(filter(str.isdigit, tx.ProductID))
+            expected = mapping.get(int(numeric)) if numeric and int(numeric) else None
+            if expected is None:
+                index = scan(titles, tx.ProductName)
+                expected = products_by_index[index] if index is not None else None
+
+            self.assertEqual(row["API_Match"], expected is not None)
+            self.assertEqual(row["API_Category"], expected["category"] if expected else None)
+
+        self.assertEqual(mapping.stats, {"id": 1, "title": 3, "miss": 1})
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,143 @@
+"""
+The metric functions in utils.data_processor give the same answers for
+plain transactions and for each pre-aggregated engine.
+"""
+import os
+import unittest
+
+from utils.file_handler import read_sales_data
+from utils.data_processor import (
+    calculate_total_revenue,
+    region_wise_sales,
+    top_selling_products,
+    low_performing_products,
+    customer_analysis,
+    top_customers,
+    region_unique_customers,
+    daily_sales_trend,
+    date_range,
+    find_peak_sales_day,
+    aggregate_transactions,
+    default_accumulators,
+    CustomerAccumulator,
+    iter_clean_transactions
+)
+from utils.columnar import TransactionTable
+from utils.cube import SalesCube
+from utils.records import Transaction
+from utils.sqlite_store import SalesDatabase
+
+SAMPLE = os.path.join(os.path.dirname(__file__), "..", "data", "sales_data.txt")
+
+
+class InputTypesTest(unittest.TestCase):
+    """
+    The single-metric functions give the accumulator results for
+    records, dicts and one-shot iterators alike.
+    """
+
+    def test_records_dicts_and_iterators(self):
+        transactions = list(iter_clean_transactions(read_sales_data(SAMPLE)))
+        dicts = [tx.to_dict() for tx in transactions]
+        accumulators = aggregate_transactions(
+            transactions, dict(default_accumulators(), customers=CustomerAccumulator())
+        )
+        expected = {
+            calculate_total_revenue: accumulators["revenue"].result(),
+            region_wise_sales: accumulators["regions"].result(),
+            top_selling_products: accumulators["products"].top(5),
+            low_performing_products: accumulators["products"].low(),
+            customer_analysis: accumulators["customers"].result(),
+            daily_sales_trend: accumulators["daily"].result(),
+            find_peak_sales_day: accumulators["daily"].peak()
+        }
+
+        for metric, value in expected.items():
+            for source in (transactions, dicts, iter(transactions)):
+                self.assertEqual(metric(source), value, metric.__name__)
+
+    def test_empty(self):
+        self.assertEqual(calculate_total_revenue([]), 0.0)
+        self.assertEqual(region_wise_sales(iter(())), {})
+
+
+class EngineMetricsTest(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.transactions = list(iter_clean_transactions(read_sales_data(SAMPLE)))
+
+    def test_table(self):
+        table = TransactionTable.from_transactions(self.transactions)
+        self.assertEqual(customer_analysis(table), customer_analysis(self.transactions))
+        self.assertEqual(daily_sales_trend(table), daily_sales_trend(self.transactions))
+
+    def test_table_ranks_rounded_spend(self):
+        # Totals equal to the cent keep first-seen order, as in the dict path
+        rows = [
+            Transaction("T1", "2024-01-01", "P1", "A", 1, price, customer, "North")
+            for customer, price in (("C1", 100.004), ("C2", 100.001), ("C3", 100.003))
+        ]
+        table = TransactionTable.from_transactions(rows)
+        self.assertEqual(list(customer_analysis(table)), ["C1", "C2", "C3"])
+        self.assertEqual(top_customers(table, 3), top_customers(rows, 3))
+
+    def test_database(self):
+        with SalesDatabase(":memory:") as db:
+            db.insert(self.transactions)
+            self.assertEqual(customer_analysis(db), customer_analysis(self.transactions))
+            self.assertEqual(daily_sales_trend(db), daily_sales_trend(self.transactions))
+            self.assertEqual(top_customers(db, 3), top_customers(self.transactions, 3))
+            self.assertEqual(region_unique_customers(db), region_unique_customers(self.transactions))
+
+    def test_cube_has_no_customers(self):
+        cube = SalesCube.build(self.transactions)
+        with self.assertRaisesRegex(ValueError, "CustomerID"):
+            customer_analysis(cube)
+        with self.assertRaisesRegex(ValueError, "CustomerID"):
+            daily_sales_trend(cube.filtered(region="North"))
+        with self.assertRaisesRegex(ValueError, "CustomerID"):
+            top_customers(cube)
+        with self.assertRaisesRegex(ValueError, "CustomerID"):
+            region_unique_customers(cube.filtered(min_amount=5000))
+
+    def test_cube_filters(self):
+        cube = SalesCube.build(self.transactions)
+        lines = read_sales_data(SAMPLE)
+        # Edge bounds, bounds inside a bin and both bounds in one bin
+        for region, min_amount, max_amount in [
+            (None, None, None), ("North", None, None), (None, 5000, None),
+            (None, 3000, None), (None, None, 47000.5), ("East", 3000, 120000),
+            (None, 3000, 4000), (None, 1000, 2500)
+        ]:
+            with self.subTest(region=region, min_amount=min_amount, max_amount=max_amount):
+                rows = list(iter_clean_transactions(lines, None, region, min_amount, max_amount))
+                view = cube.filtered(region, min_amount, max_amount)
+
+                self.assertEqual(len(view), len(rows))
+                self.assertEqual(calculate_total_revenue(view), calculate_total_revenue(rows))
+                self.assertEqual(top_selling_products(view), top_selling_products(rows))
+                self.assertEqual(low_performing_products(view), low_performing_products(rows))
+                self.assertEqual(date_range(view), date_range(rows))
+                if rows:
+                    self.assertEqual(find_peak_sales_day(view), find_peak_sales_day(rows))
+
+                expected = region_wise_sales(rows)
+                regions = region_wise_sales(view)
+                self.assertEqual(list(regions), list(expected))
+                for name, stats in regions.items():
+                    self.assertEqual(stats["transaction_count"], expected[name]["transaction_count"])
+                    self.assertAlmostEqual(stats["total_sales"], expected[name]["total_sales"], places=6)
+
+    def test_hll_needs_transactions(self):
+        table = TransactionTable.from_transactions(self.transactions)
+        with self.assertRaises(ValueError):
+            daily_sales_trend(table, distinct="hll")
+        with self.assertRaises(ValueError):
+            region_unique_customers(table, distinct="hll")
+        with self.assertRaises(ValueError):
+            top_customers(table, mode="approx")
+
+
+if __name__ == "__main__":
+    unittest.main()
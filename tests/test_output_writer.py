@@ -0,0 +1,141 @@
+"""
+write_rows formats read back to the rows written, and atomic_write
+keeps permissions and leaves the target alone on errors.
+"""
+import csv
+import gzip
+import json
+import os
+import shutil
+import stat
+import tempfile
+import unittest
+
+from utils.output_writer import atomic_write, detect_format, write_rows, zstandard
+
+HEADERS = ["TransactionID", "ProductName", "Quantity", "API_Rating"]
+ROWS = [
+    {"TransactionID": "T001", "ProductName": "Mouse|Pad, \"wireless\"", "Quantity": 2, "API_Rating": 4.5},
+    {"TransactionID": "T002", "ProductName": "Café", "Quantity": 10, "API_Rating": None},
+    {"TransactionID": "T003", "ProductName": "Laptop", "Quantity": 1}
+]
+
+
+def _values(row):
+    return [row.get(header) for header in HEADERS]
+
+
+class WriteRowsTest(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def path(self, name):
+        return os.path.join(self.directory, name)
+
+    def test_detect_format(self):
+        self.assertEqual(detect_format("out.csv.gz"), ("csv", "gzip"))
+        self.assertEqual(detect_format("out.json"), ("json", None))
+        self.assertEqual(detect_format("out.jsonl.zst"), ("jsonl", "zstd"))
+        self.assertEqual(detect_format("out.txt"), ("pipe", None))
+
+    def test_pipe(self):
+        write_rows(ROWS, HEADERS, self.path("out.txt"))
+        with open(self.path("out.txt"), encoding="utf-8") as f:
+            lines = f.read().splitlines()
+        self.assertEqual(lines[0], "|".join(HEADERS))
+        self.assertEqual(lines[2], "T002|Café|10|")
+        self.assertEqual(len(lines), len(ROWS) + 1)
+
+    def test_csv(self):
+        write_rows(ROWS, HEADERS, self.path("out.csv"))
+        with open(self.path("out.csv"), encoding="utf-8", newline="") as f:
+            records = list(csv.reader(f))
+        self.assertEqual(records[0], HEADERS)
+        self.assertEqual(records[1], ["T001", "Mouse|Pad, \"wireless\"", "2", "4.5"])
+        self.assertEqual(records[3], ["T003", "Laptop", "1", ""])
+
+    def test_jsonl(self):
+        write_rows(ROWS, HEADERS, self.path("out.jsonl"))
+        with open(self.path("out.jsonl"), encoding="utf-8") as f:
+            records = [json.loads(line) for line in f]
+        self.assertEqual([list(r.values()) for r in records], [_values(row) for row in ROWS])
+
+    def test_json_array(self):
+        # Batches smaller than the row count exercise the separators
+        for rows in (ROWS, []):
+            with self.subTest(rows=len(rows)):
+                self.assertEqual(write_rows(rows, HEADERS, self.path("out.json"), batch_size=2), len(rows))
+                with open(self.path("out.json"), encoding="utf-8") as f:
+                    records = json.load(f)
+                self.assertEqual([list(r.values()) for r in records], [_values(row) for row in rows])
+
+    def test_compressed(self):
+        cases = [("out.csv.gz", gzip.decompress)]
+        if zstandard is not None:
+            cases.append(("out.csv.zst", lambda data: zstandard.ZstdDecompressor().decompressobj().decompress(data)))
+
+        write_rows(ROWS, HEADERS, self.path("plain.csv"))
+        with open(self.path("plain.csv"), "rb") as f:
+            expected = f.read()
+        for name, decompress in cases:
+            with self.subTest(name=name):
+                write_rows(iter(ROWS), HEADERS, self.path(name))
+                with open(self.path(name), "rb") as f:
+                    self.assertEqual(decompress(f.read()), expected)
+
+    def test_unknown_format(self):
+        with self.assertRaises(ValueError):
+            write_rows(ROWS, HEADERS, self.path("out.txt"), fmt="xml")
+        self.assertEqual(os.listdir(self.directory), [])
+
+
+class AtomicWriteTest(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.target = os.path.join(self.directory, "out.txt")
+        self.umask = os.umask(0o027)
+
+    def tearDown(self):
+        os.umask(self.umask)
+        shutil.rmtree(self.directory)
+
+    def mode(self):
+        return stat.S_IMODE(os.stat(self.target).st_mode)
+
+    def test_new_file_gets_umask_default(self):
+        with atomic_write(self.target) as f:
+            f.write(b"data")
+        self.assertEqual(self.mode(), 0o640)
+        self.assertEqual(os.listdir(self.directory), ["out.txt"])
+
+    def test_existing_file_keeps_mode(self):
+        with open(self.target, "w") as f:
+            f.write("old")
+        os.chmod(self.target, 0o604)
+
+        with atomic_write(self.target, "w", encoding="utf-8") as f:
+            f.write("new")
+        self.assertEqual(self.mode(), 0o604)
+        with open(self.target) as f:
+            self.assertEqual(f.read(), "new")
+
+    def test_error_leaves_target(self):
+        with open(self.target, "w") as f:
+            f.write("old")
+
+        with self.assertRaises(RuntimeError):
+            with atomic_write(self.target, "w", encoding="utf-8") as f:
+                f.write("partial")
+                raise RuntimeError("interrupted")
+        with open(self.target) as f:
+            self.assertEqual(f.read(), "old")
+        self.assertEqual(os.listdir(self.directory), ["out.txt"])
+
+
+if __name__ == "__main__":
+    unittest.main()
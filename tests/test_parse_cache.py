@@ -0,0 +1,78 @@
+"""
+The native and Arrow parse caches load back exactly what was parsed,
+and stale or unwritable caches fall back to parsing.
+"""
+import os
+import shutil
+import tempfile
+import unittest
+
+from utils.file_handler import read_sales_data, parse_transactions, read_sales_records
+from utils.parse_cache import PARSE_CACHE_STATS, cache_path, load_parsed, save_parsed, pa
+from utils.records import Transaction
+from utils.validation import PARSE_RULES
+
+SAMPLE = os.path.join(os.path.dirname(__file__), "..", "data", "sales_data.txt")
+
+BACKENDS = ["native"] + (["arrow"] if pa is not None else [])
+
+
+class ParseCacheTest(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.input = os.path.join(self.directory, "sales.txt")
+        shutil.copyfile(SAMPLE, self.input)
+        # One line for each parse rule
+        with open(self.input, "a") as f:
+            f.write("\nT99998|2024-12-31|P101\nT99999|2024-12-31|P101|Laptop|two|100|C001|North\n")
+        raw_lines = read_sales_data(self.input)
+        self.lines = len(raw_lines)
+        self.rejections = {}
+        self.transactions = parse_transactions(raw_lines, self.rejections)
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def test_round_trip(self):
+        for backend in BACKENDS:
+            with self.subTest(backend=backend):
+                save_parsed(self.input, self.transactions, self.lines, backend=backend,
+                            rejections=self.rejections)
+                self.assertEqual(
+                    load_parsed(self.input),
+                    (self.transactions, self.lines, {rule: 1 for rule in PARSE_RULES})
+                )
+
+    def test_separator_characters(self):
+        # Categories are length-prefixed, so NUL and pipes survive
+        transactions = list(self.transactions)
+        transactions[0] = Transaction.from_dict({**dict(transactions[0]), "ProductName": "Mouse\0Pad"})
+        transactions[1] = Transaction.from_dict({**dict(transactions[1]), "Region": ""})
+        transactions[2] = Transaction.from_dict({**dict(transactions[2]), "CustomerID": "C|\0é"})
+        for backend in BACKENDS:
+            with self.subTest(backend=backend):
+                save_parsed(self.input, transactions, self.lines, backend=backend)
+                self.assertEqual(load_parsed(self.input)[0], transactions)
+
+    def test_stale_cache(self):
+        for backend in BACKENDS:
+            with self.subTest(backend=backend):
+                save_parsed(self.input, self.transactions, self.lines, backend=backend)
+                with open(self.input, "a") as f:
+                    f.write("\n")
+                self.assertIsNone(load_parsed(self.input))
+
+    def test_quantity_overflow_skips_cache(self):
+        with open(self.input, "a") as f:
+            f.write("T99997|2024-12-31|P101|Laptop|" + "9" * 30 + "|100|C001|North\n")
+
+        transactions = read_sales_records(self.input)
+        self.assertEqual(transactions, parse_transactions(read_sales_data(self.input)))
+        self.assertFalse(PARSE_CACHE_STATS["hit"])
+        self.assertFalse(os.path.exists(cache_path(self.input)))
+        self.assertEqual(os.listdir(self.directory), ["sales.txt"])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,154 @@
+"""
+The approximate sketches stay within their documented error bounds.
+"""
+import random
+import unittest
+from collections import Counter
+
+from utils.data_processor import top_customers, region_unique_customers, daily_sales_trend
+from utils.records import Transaction
+from utils.report_builder import ReportBuilder
+from utils.sketches import HyperLogLog, SpaceSaving
+
+
+def skewed_stream(seed, n=20000, keys=2000):
+    """
+    (key, weight) pairs where a few keys carry most of the weight.
+    """
+    rng = random.Random(seed)
+    return [(f"K{int(rng.paretovariate(1.2)) % keys}", rng.randint(1, 100)) for _ in range(n)]
+
+
+class SpaceSavingTest(unittest.TestCase):
+
+    def assertWithinBounds(self, summary, stream):
+        true = Counter()
+        for key, weight in stream:
+            true[key] += weight
+
+        self.assertEqual(summary.total, sum(true.values()))
+        for key, count in summary.counts.items():
+            self.assertLessEqual(count - summary.errors[key], true[key])
+            self.assertGreaterEqual(count, true[key])
+        for key, weight in true.items():
+            if weight > summary.total / summary.capacity:
+                self.assertIn(key, summary.counts)
+            if key not in summary.counts:
+                self.assertLessEqual(weight, summary.min_count())
+
+    def test_exact_below_capacity(self):
+        stream = skewed_stream(1, keys=50)
+        summary = SpaceSaving(capacity=50)
+        for key, weight in stream:
+            summary.add(key, weight)
+
+        true = Counter()
+        for key, weight in stream:
+            true[key] += weight
+        self.assertEqual(summary.counts, dict(true))
+        self.assertEqual(set(summary.errors.values()), {0})
+
+    def test_error_bounds(self):
+        for seed in range(3):
+            with self.subTest(seed=seed):
+                stream = skewed_stream(seed)
+                summary = SpaceSaving(capacity=100)
+                for key, weight in stream:
+                    summary.add(key, weight)
+                self.assertEqual(len(summary.counts), 100)
+                self.assertWithinBounds(summary, stream)
+
+    def test_merge_keeps_bounds(self):
+        stream = skewed_stream(7)
+        left, right = SpaceSaving(capacity=100), SpaceSaving(capacity=100)
+        for key, weight in stream[:len(stream) // 2]:
+            left.add(key, weight)
+        for key, weight in stream[len(stream) // 2:]:
+            right.add(key, weight)
+
+        self.assertWithinBounds(left.merge(right), stream)
+        self.assertLessEqual(len(left.counts), 100)
+
+    def test_top_order(self):
+        summary = SpaceSaving(capacity=10)
+        for key, weight in skewed_stream(3):
+            summary.add(key, weight)
+        counts = [count for _, count, _ in summary.top(10)]
+        self.assertEqual(counts, sorted(counts, reverse=True))
+
+    def test_approx_top_customers(self):
+        rows = [
+            Transaction(f"T{i}", "2024-12-01", "P101", "Laptop", 1, float(weight), key, "North")
+            for i, (key, weight) in enumerate(skewed_stream(5))
+        ]
+        exact = dict(top_customers(rows, 5))
+        approx = top_customers(rows, 5, mode="approx", capacity=200)
+
+        self.assertEqual([cid for cid, _ in approx], list(exact))
+        for cid, data in approx:
+            self.assertGreaterEqual(data["total_spent"], exact[cid]["total_spent"])
+            self.assertLessEqual(data["total_spent"] - data["max_error"], exact[cid]["total_spent"])
+
+
+class HyperLogLogTest(unittest.TestCase):
+
+    def sketch(self, values, precision=12):
+        hll = HyperLogLog(precision)
+        for value in values:
+            hll.add(value)
+        return hll
+
+    def test_estimate_within_error(self):
+        # Hashes are deterministic, so so are the estimates; 4 standard
+        # errors leaves room for the sketch's own variance
+        for precision in (8, 12):
+            for n in (10, 1000, 50000):
+                with self.subTest(precision=precision, n=n):
+                    hll = self.sketch((f"C{i}" for i in range(n)), precision)
+                    self.assertLessEqual(abs(hll.count() - n) / n, 4 * hll.relative_error())
+
+    def test_duplicates_do_not_count(self):
+        hll = self.sketch(f"C{i % 100}" for i in range(10000))
+        self.assertEqual(len(hll), len(self.sketch(f"C{i}" for i in range(100))))
+
+    def test_merge_is_union(self):
+        left = self.sketch(f"C{i}" for i in range(0, 6000))
+        right = self.sketch(f"C{i}" for i in range(4000, 10000))
+        union = self.sketch(f"C{i}" for i in range(10000))
+        left |= right
+        self.assertEqual(left.registers, union.registers)
+        with self.assertRaises(ValueError):
+            left.merge(HyperLogLog(10))
+
+    def test_bytes_round_trip(self):
+        hll = self.sketch(f"C{i}" for i in range(500))
+        self.assertEqual(HyperLogLog.from_bytes(hll.to_bytes()).registers, hll.registers)
+        with self.assertRaises(ValueError):
+            HyperLogLog.from_bytes(hll.to_bytes()[:-1])
+
+    def test_distinct_metrics(self):
+        rng = random.Random(11)
+        rows = [
+            Transaction(f"T{i}", f"2024-12-0{1 + i % 3}", "P101", "Laptop", 1, 100.0,
+                        f"C{rng.randrange(5000)}", rng.choice(["North", "South"]))
+            for i in range(20000)
+        ]
+        error = HyperLogLog().relative_error()
+
+        exact = region_unique_customers(rows)
+        for region, count in region_unique_customers(rows, distinct="hll").items():
+            self.assertLessEqual(abs(count - exact[region]) / exact[region], 4 * error)
+
+        exact = daily_sales_trend(rows)
+        for date, day in daily_sales_trend(rows, distinct="hll").items():
+            expected = exact[date]["unique_customers"]
+            self.assertLessEqual(abs(day["unique_customers"] - expected) / expected, 4 * error)
+            self.assertEqual(day["revenue"], exact[date]["revenue"])
+
+        # Both customer columns of the report carry the estimate note
+        report = ReportBuilder(rows, distinct="hll").render("text", ["regions", "daily"])
+        self.assertEqual(report.count("HyperLogLog estimates"), 2)
+
+
+if __name__ == "__main__":
+    unittest.main()
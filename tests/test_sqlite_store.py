@@ -0,0 +1,84 @@
+"""
+SalesDatabase.load_file keeps the database in step with a growing file
+(appends, partial last lines, in-place edits) and its queries match the
+in-memory metric functions.
+"""
+import os
+import shutil
+import tempfile
+import unittest
+
+from utils.file_handler import read_sales_data
+from utils.data_processor import (
+    iter_clean_transactions,
+    region_wise_sales,
+    top_selling_products,
+    customer_analysis,
+    daily_sales_trend,
+    region_unique_customers
+)
+from utils.sqlite_store import SalesDatabase
+
+SAMPLE = os.path.join(os.path.dirname(__file__), "..", "data", "sales_data.txt")
+
+
+class LoadFileTest(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.input = os.path.join(self.directory, "sales.txt")
+        self.db_path = os.path.join(self.directory, "sales.db")
+        with open(SAMPLE) as f:
+            header, *rows = f.read().splitlines()
+        with open(self.input, "w") as f:
+            f.write(header + "\n" + "\n".join(rows * 50) + "\n")
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def load_and_compare(self, expected_mode):
+        transactions = list(iter_clean_transactions(read_sales_data(self.input)))
+        with SalesDatabase(self.db_path) as db:
+            info = db.load_file(self.input)
+            self.assertEqual(info["mode"], expected_mode)
+            self.assertEqual(info["summary"]["final_count"], len(transactions))
+            self.assertEqual(len(db), len(transactions))
+            self.assertEqual(db.region_wise_sales(), region_wise_sales(transactions))
+            self.assertEqual(db.top_selling_products(5), top_selling_products(transactions))
+            self.assertEqual(db.customer_analysis(), customer_analysis(transactions))
+            self.assertEqual(db.daily_sales_trend(), daily_sales_trend(transactions))
+            self.assertEqual(db.region_unique_customers(), region_unique_customers(transactions))
+        return info
+
+    def append(self, text):
+        with open(self.input, "a") as f:
+            f.write(text)
+
+    def test_append(self):
+        self.load_and_compare("full")
+        self.load_and_compare("unchanged")
+        self.append("T9001|2024-12-05|P101|Laptop|1|45,000|C001|North\n")
+        info = self.load_and_compare("incremental")
+        self.assertEqual(info["new_rows"], 1)
+
+    def test_partial_line(self):
+        self.load_and_compare("full")
+        self.append("T9001|2024-12-05|P101|Laptop|1|45,")
+        self.load_and_compare("incremental")
+        self.append("000|C001|North\nT9002|2024-12-06|P102|Mouse|2|500|C002|East\n")
+        self.load_and_compare("incremental")
+        self.load_and_compare("unchanged")
+
+    def test_in_place_edit(self):
+        self.load_and_compare("full")
+        with open(self.input) as f:
+            text = f.read()
+        middle = text.index("North", len(text) // 2)
+        with open(self.input, "w") as f:
+            f.write(text[:middle] + "South" + text[middle + len("North"):])
+
+        self.load_and_compare("full")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,122 @@
+"""
+The streaming readers and the single-pass clean stage give the same
+rows and counters as reading, parsing and validating whole lists.
+"""
+import os
+import shutil
+import tempfile
+import unittest
+
+from utils.file_handler import iter_sales_data, iter_sales_records, iter_mmap_records, read_sales_data
+from utils.data_processor import (
+    iter_transactions,
+    parse_transactions,
+    iter_clean_transactions,
+    validate_and_filter,
+    TransactionStream
+)
+
+SAMPLE = os.path.join(os.path.dirname(__file__), "..", "data", "sales_data.txt")
+
+FILTERS = [(None, None, None), ("North", None, None), (None, 5000, 50000)]
+
+
+def read_lines(filename, encoding):
+    """
+    The whole-file reading the streaming reader replaces.
+    """
+    with open(filename, encoding=encoding) as f:
+        lines = f.read().splitlines()[1:]
+    return [line.strip() for line in lines if line.strip()]
+
+
+class StreamingReaderTest(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def write(self, text, encoding="utf-8", newline=None):
+        path = os.path.join(self.directory, "sales.txt")
+        with open(path, "w", encoding=encoding, newline=newline) as f:
+            f.write(text)
+        return path
+
+    def test_sample_in_small_chunks(self):
+        expected = read_lines(SAMPLE, "utf-8")
+        for chunk_size in (1, 7, 64, 1024 * 1024):
+            with self.subTest(chunk_size=chunk_size):
+                self.assertEqual(list(iter_sales_data(SAMPLE, chunk_size)), expected)
+
+    def test_line_endings_and_encodings(self):
+        text = (
+            "TransactionID|Date|ProductID|ProductName|Quantity|UnitPrice|CustomerID|Region\n"
+            "T001|2024-12-01|P101|Café Crème|2|45,000|C001|North\n"
+            "\n   \n"
+            "T002|2024-12-02|P102|Naïve Mouse|1|499|C002|South"
+        )
+        for encoding, newline in (("utf-8", None), ("utf-8", "\r\n"), ("latin-1", None)):
+            with self.subTest(encoding=encoding, newline=newline):
+                path = self.write(text, encoding, newline)
+                expected = read_lines(path, encoding)
+                # Chunks of 5 bytes split the two-byte UTF-8 characters
+                self.assertEqual(list(iter_sales_data(path, 5)), expected)
+                self.assertEqual(len(expected), 2)
+
+    def test_missing_and_empty_files(self):
+        self.assertEqual(list(iter_sales_data(os.path.join(self.directory, "missing.txt"))), [])
+        self.assertEqual(list(iter_sales_data(self.write(""))), [])
+        self.assertEqual(list(iter_sales_data(self.write("header only"))), [])
+
+    def test_mmap_reader(self):
+        with open(SAMPLE, encoding="utf-8") as f:
+            text = f.read() + "\nT901|2024-12-01|P101\nT902|2024-12-01|P101|Café|2|x|C001|North\n"
+        for newline in (None, "\r\n"):
+            path = self.write(text, newline=newline)
+            for block_size in (16, 1024 * 1024):
+                with self.subTest(newline=newline, block_size=block_size):
+                    self.assertEqual(list(iter_mmap_records(path, block_size)), list(iter_sales_records(path)))
+        self.assertEqual(list(iter_mmap_records(self.write(""))), [])
+        self.assertEqual(list(iter_mmap_records(self.write("header only"))), [])
+
+
+class StreamingPipelineTest(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.lines = read_sales_data(SAMPLE) + [
+            "T901|2024-12-01|P101",
+            "T902|2024-12-01|P101|Laptop|two|100|C001|North"
+        ]
+
+    def test_records(self):
+        rejections = {}
+        streamed = list(iter_transactions(iter(self.lines), rejections))
+        self.assertEqual(streamed, parse_transactions(self.lines))
+        self.assertEqual(rejections, {"field_count": 1, "numeric_parse": 1})
+        self.assertEqual(list(iter_sales_records(SAMPLE)), parse_transactions(read_sales_data(SAMPLE)))
+
+    def test_clean_matches_validate_and_filter(self):
+        for region, min_amount, max_amount in FILTERS:
+            with self.subTest(region=region, min_amount=min_amount, max_amount=max_amount):
+                valid, invalid, expected = validate_and_filter(
+                    parse_transactions(self.lines), region, min_amount, max_amount
+                )
+                summary = {}
+                streamed = list(iter_clean_transactions(iter(self.lines), summary, region, min_amount, max_amount))
+
+                self.assertEqual(streamed, valid)
+                self.assertEqual(summary["invalid"], invalid)
+                for key in ("total_input", "invalid", "filtered_by_region", "filtered_by_amount", "final_count"):
+                    self.assertEqual(summary[key], expected[key])
+
+    def test_stream_is_reiterable(self):
+        stream = TransactionStream(lambda: iter_clean_transactions(iter(self.lines)))
+        self.assertEqual(list(stream), list(stream))
+        self.assertTrue(list(stream))
+
+
+if __name__ == "__main__":
+    unittest.main()
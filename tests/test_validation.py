@@ -0,0 +1,56 @@
+"""
+The vectorized column checks reject exactly the rows the row path
+rejects, charged to the same rules, including non-finite prices.
+"""
+import os
+import unittest
+
+from utils.file_handler import read_sales_data
+from utils.data_processor import parse_transactions
+from utils.records import TRANSACTION_FIELDS
+from utils.validation import RuleSet
+
+SAMPLE = os.path.join(os.path.dirname(__file__), "..", "data", "sales_data.txt")
+
+NON_FINITE = [
+    "T901|2024-12-01|P101|Laptop|2|nan|C001|North",
+    "T902|2024-12-01|P101|Laptop|2|inf|C001|North",
+    "T903|2024-12-02|P102|Mouse|1|-inf|C002|South",
+    "T904|2024-12-02|P102|Mouse|3|NaN|C002|East"
+]
+
+FILTERS = [
+    (None, None, None),
+    ("North", None, None),
+    (None, 5000, None),
+    (None, None, 20000),
+    ("North", 1000, 50000)
+]
+
+
+class ColumnRowEquivalenceTest(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.lines = read_sales_data(SAMPLE) + NON_FINITE
+        records = parse_transactions(cls.lines)
+        cls.columns = {field: [getattr(tx, field) for tx in records] for field in TRANSACTION_FIELDS}
+
+    def test_same_rows_and_counts(self):
+        for filters in FILTERS:
+            with self.subTest(filters=filters):
+                rows = RuleSet(*filters)
+                kept = [tx.TransactionID for tx in rows.iter_lines(self.lines)]
+
+                cols = RuleSet(*filters)
+                selected = cols.select_columns(self.columns)
+
+                self.assertEqual([tx.TransactionID for tx in selected], kept)
+                self.assertEqual(cols.passed, rows.passed)
+                self.assertEqual(cols.checked, rows.checked)
+                for rule, count in cols.counts.items():
+                    self.assertEqual(count, rows.counts[rule], rule)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,112 +1,513 @@
 import random
+import threading
+import time
+from bisect import bisect_right
+from concurrent.futures import ThreadPoolExecutor
 
-def fetch_product_rating(product_id):
+import requests
+from requests.adapters import HTTPAdapter
+
+from utils.lru_cache import LRUCache
+from utils.output_writer import write_rows
+from utils.records import EnrichedTransaction, Transaction, paused_gc
+from utils.catalog_cache import (
+    CATALOG_CACHE_FILE,
+    CATALOG_TTL,
+    CATALOG_STALE_TTL,
+    load_catalog,
+    save_catalog,
+    touch_catalog,
+    catalog_age
+)
+
+
+RATING_WORKERS = 8
+RATING_CACHE_SIZE = 10000
+RATING_TTL = 60 * 60
+
+BASE_URL = "https://dummyjson.com/products"
+PAGE_SIZE = 100
+MAX_WORKERS = 8
+MAX_RETRIES = 3
+BACKOFF_SECONDS = 0.5
+RETRY_STATUSES = (429, 500, 502, 503, 504)
+
+# Timing of the most recent catalog fetch (total and per page)
+FETCH_STATS = {"seconds": None, "pages": [], "not_modified": False, "source": None}
+
+_session = None
+_rating_cache = LRUCache(RATING_CACHE_SIZE, RATING_TTL)
+
+
+def fetch_product_rating(product_id, seed=None):
     """
     Simulates fetching product rating from an external API.
+    With a seed the rating is derived from (seed, product_id) only, so
+    results are reproducible regardless of call order or threading.
     """
+    rng = random.Random(f"{seed}:{product_id}") if seed is not None else random
     return {
         "product_id": product_id,
-        "rating": round(random.uniform(3.0, 5.0), 1)
+        "rating": round(rng.uniform(3.0, 5.0), 1)
     }
-import requests
 
-BASE_URL = "https://dummyjson.com/products"
-def fetch_all_products():
+
+def fetch_product_ratings(product_ids, seed=None, max_workers=RATING_WORKERS, cache=None):
+    """
+    Fetches ratings for many products at once.
+    IDs are deduplicated, cached ones are served from the LRU/TTL cache
+    and the rest fan out over a bounded thread pool.
+    Returns: dict of product_id -> rating dictionary
+    """
+    if cache is None:
+        cache = _rating_cache
+
+    ratings = {}
+    missing = []
+    for product_id in dict.fromkeys(product_ids):
+        cached = cache.get((seed, product_id))
+        if cached is not None:
+            ratings[product_id] = cached
+        else:
+            missing.append(product_id)
+
+    if missing:
+        with ThreadPoolExecutor(max_workers=max_workers) as pool:
+            fetched = pool.map(lambda pid: fetch_product_rating(pid, seed), missing)
+            for product_id, rating in zip(missing, fetched):
+                cache.set((seed, product_id), rating)
+                ratings[product_id] = rating
+
+    return ratings
+
+
+def get_session():
+    """
+    Returns the shared keep-alive HTTP session, sized for concurrent
+    page fetches.
+    """
+    global _session
+    if _session is None:
+        _session = requests.Session()
+        adapter = HTTPAdapter(
+            pool_connections=MAX_WORKERS, pool_maxsize=MAX_WORKERS
+        )
+        _session.mount("http://", adapter)
+        _session.mount("https://", adapter)
+    return _session
+
+
+def _get_page(base_url, skip, limit, headers=None, timeout=10):
+    """
+    Fetches one catalog page, retrying transient errors with exponential
+    backoff. Returns (response, seconds spent including retries).
+    """
+    session = get_session()
+    start = time.perf_counter()
+
+    for attempt in range(MAX_RETRIES + 1):
+        try:
+            response = session.get(
+                base_url,
+                params={"limit": limit, "skip": skip},
+                headers=headers,
+                timeout=timeout
+            )
+            if response.status_code not in RETRY_STATUSES:
+                return response, time.perf_counter() - start
+            error = requests.HTTPError(f"{response.status_code} for skip={skip}", response=response)
+        except (requests.ConnectionError, requests.Timeout) as e:
+            error = e
+
+        if attempt < MAX_RETRIES:
+            time.sleep(BACKOFF_SECONDS * (2 ** attempt))
+
+    raise error
+
+
+def _request_catalog(base_url, snapshot=None, timeout=10):
+    """
+    Requests every catalog page, sending the cached validators with the
+    first one. The first page reports total/limit; the remaining pages
+    are fetched concurrently over the pooled session.
+    Returns None when the server answers 304 Not Modified, otherwise a
+    dict with products, validators and per-page timings.
+    """
+    headers = {}
+    if snapshot:
+        if snapshot.get("etag"):
+            headers["If-None-Match"] = snapshot["etag"]
+        if snapshot.get("last_modified"):
+            headers["If-Modified-Since"] = snapshot["last_modified"]
+
+    response, seconds = _get_page(base_url, 0, PAGE_SIZE, headers, timeout)
+    if response.status_code == 304:
+        return None
+
+    response.raise_for_status()
+    data = response.json()
+    products = list(data.get("products", []))
+    timings = [{"skip": 0, "seconds": round(seconds, 4)}]
+
+    total = data.get("total", len(products))
+    step = data.get("limit") or len(products)
+    skips = list(range(step, total, step)) if step else []
+
+    def fetch(skip):
+        page, page_seconds = _get_page(base_url, skip, step, timeout=timeout)
+        page.raise_for_status()
+        return skip, page.json().get("products", []), page_seconds
+
+    if skips:
+        with ThreadPoolExecutor(max_workers=MAX_WORKERS) as pool:
+            # map() keeps page order, so the catalog order is stable
+            for skip, page_products, page_seconds in pool.map(fetch, skips):
+                products.extend(page_products)
+                timings.append({"skip": skip, "seconds": round(page_seconds, 4)})
+
+    return {
+        "products": products,
+        "etag": response.headers.get("ETag"),
+        "last_modified": response.headers.get("Last-Modified"),
+        "pages": timings
+    }
+
+
+def _revalidate_catalog(base_url, snapshot, cache_file):
+    start = time.perf_counter()
+    result = _request_catalog(base_url, snapshot)
+
+    FETCH_STATS["seconds"] = round(time.perf_counter() - start, 4)
+    FETCH_STATS["pages"] = result["pages"] if result else []
+    FETCH_STATS["not_modified"] = result is None
+
+    if result is None:
+        try:
+            touch_catalog(snapshot, cache_file)
+        except OSError as e:
+            print("Catalog cache write failed:", e)
+        return snapshot["products"]
+
+    products = result["products"]
+
+    if cache_file:
+        try:
+            save_catalog(products, result["etag"], result["last_modified"], cache_file)
+        except OSError as e:
+            print("Catalog cache write failed:", e)
+
+    return products
+
+
+def _background_revalidate(base_url, snapshot, cache_file):
+    try:
+        _revalidate_catalog(base_url, snapshot, cache_file)
+    except Exception as e:
+        print("Background catalog refresh failed:", e)
+
+
+def fetch_all_products(base_url=BASE_URL, cache_file=CATALOG_CACHE_FILE, ttl=CATALOG_TTL,
+                       stale_ttl=CATALOG_STALE_TTL, offline=False):
     """
     Fetches all products from DummyJSON API
     Returns: list of product dictionaries
+
+    The last good catalog is cached in cache_file (None disables it):
+    - younger than ttl: served without any network call
+    - within stale_ttl after that: served immediately, refreshed in background
+    - older: revalidated with If-None-Match / If-Modified-Since
+    - offline=True or network failure: the last snapshot is served
     """
-    try:
-        response = requests.get(f"{BASE_URL}?limit=100", timeout=10)
-        response.raise_for_status()
+    snapshot = load_catalog(cache_file) if cache_file else None
+
+    if offline:
+        if snapshot:
+            FETCH_STATS["source"] = "offline-cache"
+            print("Offline mode: using cached product catalog")
+            return snapshot["products"]
+        FETCH_STATS["source"] = "offline-empty"
+        print("Offline mode: no cached product catalog available")
+        return []
+
+    if snapshot:
+        age = catalog_age(snapshot)
+
+        if age < ttl:
+            FETCH_STATS["source"] = "cache"
+            print("Using cached product catalog")
+            return snapshot["products"]
 
-        data = response.json()
-        products = data.get("products", [])
+        if age < ttl + stale_ttl:
+            # Daemon: a slow refresh must not hold up interpreter exit;
+            # the cache file is replaced atomically, so an abandoned
+            # refresh leaves the old snapshot in place
+            threading.Thread(
+                target=_background_revalidate,
+                args=(base_url, snapshot, cache_file),
+                daemon=True
+            ).start()
+            FETCH_STATS["source"] = "stale-cache"
+            print("Using cached product catalog (refreshing in background)")
+            return snapshot["products"]
 
-        print("API fetch successful")
+    try:
+        products = _revalidate_catalog(base_url, snapshot, cache_file)
+
+        FETCH_STATS["source"] = "network"
+        pages = len(FETCH_STATS["pages"])
+        print(f"API fetch successful ({pages} pages in {FETCH_STATS['seconds']:.2f}s)")
         return products
 
     except Exception as e:
         print("API fetch failed:", e)
+        if snapshot:
+            FETCH_STATS["source"] = "fallback-cache"
+            print("Serving last cached product catalog")
+            return snapshot["products"]
+        FETCH_STATS["source"] = "failed"
         return []
 
+class _TitleMatcher:
+    """
+    Precompiled matcher for the product-name fallback.
+    Finds the first title (in mapping order) that is a substring of the
+    name, or that contains the name, using an Aho-Corasick automaton over
+    the lowercased titles and a single find() over all titles joined.
+    """
+
+    def __init__(self, titles):
+        # Titles are normalized once; None titles never match
+        self.titles = [t.lower() if isinstance(t, str) else None for t in titles]
+        self.size = len(self.titles)
+
+        self._build_automaton()
+
+        self._joined = "\0".join(t if t is not None else "\0" for t in self.titles)
+        self._starts = []
+        offset = 0
+        for t in self.titles:
+            self._starts.append(offset)
+            offset += (len(t) if t is not None else 1) + 1
+
+    def _build_automaton(self):
+        goto = [{}]
+        best = [self.size]
+
+        for index, title in enumerate(self.titles):
+            if title is None:
+                continue
+            node = 0
+            for ch in title:
+                nxt = goto[node].get(ch)
+                if nxt is None:
+                    nxt = len(goto)
+                    goto[node][ch] = nxt
+                    goto.append({})
+                    best.append(self.size)
+                node = nxt
+            best[node] = min(best[node], index)
+
+        fail = [0] * len(goto)
+        queue = list(goto[0].values())
+        for node in queue:
+            best[node] = min(best[node], best[0])
+
+        head = 0
+        while head < len(queue):
+            node = queue[head]
+            head += 1
+            for ch, child in goto[node].items():
+                state = fail[node]
+                while state and ch not in goto[state]:
+                    state = fail[state]
+                fail[child] = goto[state].get(ch, 0) if node else 0
+                best[child] = min(best[child], best[fail[child]])
+                queue.append(child)
+
+        self._goto = goto
+        self._fail = fail
+        self._best = best
+
+    def _title_in_name(self, name):
+        goto, fail, best = self._goto, self._fail, self._best
+        found = best[0]
+        state = 0
+
+        for ch in name:
+            if found == 0:
+                break
+            while state and ch not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(ch, 0)
+            if best[state] < found:
+                found = best[state]
+
+        return found
+
+    def _name_in_title(self, name):
+        if "\0" in name:
+            for index, title in enumerate(self.titles):
+                if title is not None and name in title:
+                    return index
+            return self.size
+
+        if not name:
+            for index, title in enumerate(self.titles):
+                if title is not None:
+                    return index
+            return self.size
+
+        offset = self._joined.find(name)
+        if offset < 0:
+            return self.size
+        return bisect_right(self._starts, offset) - 1
+
+    def match(self, name):
+        """
+        Returns the index of the first matching title, or None.
+        """
+        name = name.lower()
+        index = min(self._title_in_name(name), self._name_in_title(name))
+        return index if index < self.size else None
+
+
+class ProductIndex(dict):
+    """
+    Product ID -> product info mapping with the lookup structures used
+    by enrichment: the numeric-ID index is the dict itself, titles are
+    normalized once into a precompiled matcher, and results are memoized
+    per distinct (ProductID, ProductName) pair.
+    stats counts lookups by how they were resolved: "id", "title" or
+    "miss".
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._reset()
+        self.reset_stats()
+
+    def reset_stats(self):
+        self.stats = {"id": 0, "title": 0, "miss": 0}
+
+    def _reset(self):
+        self._matcher = None
+        self._products = None
+        self._cache = {}
+
+    def __setitem__(self, key, value):
+        super().__setitem__(key, value)
+        self._reset()
+
+    def __delitem__(self, key):
+        super().__delitem__(key)
+        self._reset()
+
+    def match_title(self, product_name):
+        if self._matcher is None:
+            self._products = list(self.values())
+            self._matcher = _TitleMatcher(p["title"] for p in self._products)
+
+        index = self._matcher.match(product_name)
+        return self._products[index] if index is not None else None
+
+    def lookup(self, product_id, product_name):
+        """
+        Returns the API product for a transaction, or None.
+        Same first-match semantics as a linear scan over the mapping.
+        """
+        key = (product_id, product_name)
+        cached = self._cache.get(key)
+        if cached is None:
+            numeric_id = int("".join(filter(str.isdigit, product_id))) if product_id else None
+
+            api_product = None
+            source = "id"
+            if numeric_id:
+                api_product = self.get(numeric_id)
+
+            # OPTIONAL fallback by product name
+            if not api_product:
+                api_product = self.match_title(product_name)
+                source = "title" if api_product else "miss"
+
+            cached = self._cache[key] = (api_product, source)
+
+        self.stats[cached[1]] += 1
+        return cached[0]
+
+
 def create_product_mapping(api_products):
     """
     Creates a mapping of product IDs to product info
     """
-    mapping = {}
+    mapping = ProductIndex()
 
     for product in api_products:
         pid = product.get("id")
         if pid is None:
             continue
 
-        mapping[pid] = {
+        dict.__setitem__(mapping, pid, {
             "title": product.get("title"),
             "category": product.get("category"),
             "brand": product.get("brand"),
             "rating": product.get("rating")
-        }
+        })
 
     return mapping
 
-def enrich_sales_data(transactions, product_mapping):
-    enriched = []
+def iter_enriched(transactions, product_mapping, ratings=None):
+    """
+    Lazily enriches transactions, yielding one EnrichedTransaction at a
+    time. Each one references its Transaction and the matched catalog
+    product rather than copying fields.
+    ratings (from fetch_product_ratings) fills API_Rating by ProductID
+    when the catalog has no rating for the transaction.
+    """
+    if not isinstance(product_mapping, ProductIndex):
+        product_mapping = ProductIndex(product_mapping)
 
     for tx in transactions:
-        enriched_tx = tx.copy()
-
-        product_id = tx.get("ProductID", "")
-        numeric_id = int("".join(filter(str.isdigit, product_id))) if product_id else None
-
-        api_product = None
-        if numeric_id:
-            api_product = product_mapping.get(numeric_id)
-
-        # OPTIONAL fallback by product name
-        if not api_product:
-            for p in product_mapping.values():
-                if p["title"].lower() in tx["ProductName"].lower() or \
-                   tx["ProductName"].lower() in p["title"].lower():
-                    api_product = p
-                    break
-
-        if api_product:
-            enriched_tx["API_Category"] = api_product.get("category")
-            enriched_tx["API_Brand"] = api_product.get("brand")
-            enriched_tx["API_Rating"] = api_product.get("rating")
-            enriched_tx["API_Match"] = True
-        else:
-            enriched_tx["API_Category"] = None
-            enriched_tx["API_Brand"] = None
-            enriched_tx["API_Rating"] = None
-            enriched_tx["API_Match"] = False
+        if isinstance(tx, dict):
+            tx = Transaction.from_dict(tx)
 
-        enriched.append(enriched_tx)
+        api_product = product_mapping.lookup(tx.ProductID, tx.ProductName)
+        rating = api_product.get("rating") if api_product else None
 
-    return enriched
+        if ratings and rating is None:
+            fallback = ratings.get(tx.ProductID)
+            if fallback:
+                rating = fallback["rating"]
 
+        yield EnrichedTransaction(tx, api_product, rating)
+
+
+def enrich_sales_data(transactions, product_mapping, ratings=None):
+    with paused_gc():
+        return list(iter_enriched(transactions, product_mapping, ratings))
 
-def save_enriched_data(enriched_transactions, filename="data/enriched_sales_data.txt"):
-    """
-    Saves enriched transactions to file
-    """
-    headers = [
-        "TransactionID", "Date", "ProductID", "ProductName",
-        "Quantity", "UnitPrice", "CustomerID", "Region",
-        "API_Category", "API_Brand", "API_Rating", "API_Match"
-    ]
 
-    with open(filename, "w") as f:
-        f.write("|".join(headers) + "\n")
+ENRICHED_HEADERS = [
+    "TransactionID", "Date", "ProductID", "ProductName",
+    "Quantity", "UnitPrice", "CustomerID", "Region",
+    "API_Category", "API_Brand", "API_Rating", "API_Match"
+]
 
-        for tx in enriched_transactions:
-            row = []
-            for h in headers:
-                value = tx.get(h)
-                if value is None:
-                    value = ""
-                row.append(str(value))
-            f.write("|".join(row) + "\n")
+
+def save_enriched_data(enriched_transactions, filename="data/enriched_sales_data.txt",
+                       fmt=None, compression=None, atomic=True):
+    """
+    Saves enriched transactions to file.
+    Rows are streamed from any iterable (e.g. iter_enriched) and written
+    in buffered batches. fmt is "pipe" (default), "csv", "jsonl" or "json" and
+    compression "gzip" or "zstd"; both are inferred from the extension
+    when not given (e.g. enriched.jsonl.gz). atomic writes to a temp
+    file first so a crash never leaves a half-written file.
+    """
+    count = write_rows(
+        enriched_transactions, ENRICHED_HEADERS, filename,
+        fmt=fmt, compression=compression, atomic=atomic
+    )
 
     print(f"Enriched data saved to {filename}")
+    return count
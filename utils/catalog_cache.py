@@ -0,0 +1,69 @@
+"""
+On-disk snapshot of the product catalog.
+Stores the products together with the fetch time and the HTTP
+validators (ETag / Last-Modified) needed for conditional revalidation.
+"""
+import json
+import os
+import time
+
+from utils.output_writer import atomic_write
+
+
+CATALOG_CACHE_FILE = "data/product_catalog.json"
+CATALOG_TTL = 24 * 60 * 60
+CATALOG_STALE_TTL = 7 * 24 * 60 * 60
+
+
+def load_catalog(cache_file=CATALOG_CACHE_FILE):
+    """
+    Loads the cached catalog snapshot.
+    Returns the snapshot dict, or None if missing or unreadable.
+    """
+    try:
+        with open(cache_file, "r", encoding="utf-8") as f:
+            snapshot = json.load(f)
+    except (FileNotFoundError, ValueError):
+        return None
+
+    if not isinstance(snapshot, dict) or not isinstance(snapshot.get("products"), list):
+        return None
+
+    return snapshot
+
+
+def save_catalog(products, etag=None, last_modified=None, cache_file=CATALOG_CACHE_FILE):
+    """
+    Atomically writes a catalog snapshot (temp file + rename) so readers
+    never see a half-written cache.
+    """
+    snapshot = {
+        "fetched_at": time.time(),
+        "etag": etag,
+        "last_modified": last_modified,
+        "products": products
+    }
+
+    directory = os.path.dirname(cache_file) or "."
+    os.makedirs(directory, exist_ok=True)
+
+    with atomic_write(cache_file, "w", encoding="utf-8") as f:
+        json.dump(snapshot, f)
+
+    return snapshot
+
+
+def touch_catalog(snapshot, cache_file=CATALOG_CACHE_FILE):
+    """
+    Marks a snapshot as freshly validated (after a 304 Not Modified).
+    """
+    return save_catalog(
+        snapshot["products"],
+        snapshot.get("etag"),
+        snapshot.get("last_modified"),
+        cache_file
+    )
+
+
+def catalog_age(snapshot):
+    return time.time() - snapshot.get("fetched_at", 0)
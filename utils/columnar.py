@@ -0,0 +1,290 @@
+"""
+Columnar, NumPy-backed transaction store.
+
+Categorical fields are dictionary-encoded into integer code arrays and
+the aggregates are computed with bincount/argsort grouping instead of
+per-row Python loops. Results match the dict-based functions in
+utils.data_processor exactly.
+"""
+from array import array
+
+from utils.records import as_transaction
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+
+CATEGORICAL_FIELDS = ["Date", "ProductID", "ProductName", "CustomerID", "Region"]
+
+
+def _require_numpy():
+    if np is None:
+        raise ImportError("The columnar engine requires numpy (pip install numpy)")
+
+
+class TransactionTable:
+    """
+    Column-oriented view of parsed transactions.
+    codes[field] holds int64 codes into categories[field]; codes are
+    assigned in first-appearance order so ties resolve like the
+    dict-based functions.
+    """
+
+    def __init__(self, codes, categories, quantity, unit_price):
+        _require_numpy()
+        self.codes = codes
+        self.categories = categories
+        self.quantity = quantity
+        self.unit_price = unit_price
+        self.amount = quantity * unit_price
+
+    @classmethod
+    def from_transactions(cls, transactions):
+        """
+        Builds a table from any iterable of transactions (records or
+        dicts; a list or a lazy generator from iter_sales_records).
+        """
+        _require_numpy()
+
+        lookups = {field: {} for field in CATEGORICAL_FIELDS}
+        codes = {field: array("q") for field in CATEGORICAL_FIELDS}
+        quantity = array("q")
+        unit_price = array("d")
+
+        for tx in transactions:
+            tx = as_transaction(tx)
+            for field in CATEGORICAL_FIELDS:
+                lookup = lookups[field]
+                value = getattr(tx, field)
+                code = lookup.get(value)
+                if code is None:
+                    code = lookup[value] = len(lookup)
+                codes[field].append(code)
+
+            quantity.append(tx.Quantity)
+            unit_price.append(tx.UnitPrice)
+
+        return cls(
+            {field: np.frombuffer(codes[field], dtype=np.int64) for field in CATEGORICAL_FIELDS},
+            {field: list(lookups[field]) for field in CATEGORICAL_FIELDS},
+            np.frombuffer(quantity, dtype=np.int64),
+            np.frombuffer(unit_price, dtype=np.float64)
+        )
+
+    def __len__(self):
+        return len(self.quantity)
+
+    # =========================
+    # GROUPING HELPERS
+    # =========================
+
+    def _stripped_groups(self, field):
+        """
+        Merges categories that are equal after strip() and drops blank
+        ones. Returns (group id per row, group names); blank rows get -1.
+        """
+        group_of = {}
+        names = []
+        mapping = np.empty(len(self.categories[field]), dtype=np.int64)
+
+        for code, value in enumerate(self.categories[field]):
+            key = value.strip()
+            if not key:
+                mapping[code] = -1
+                continue
+            if key not in group_of:
+                group_of[key] = len(names)
+                names.append(key)
+            mapping[code] = group_of[key]
+
+        return mapping[self.codes[field]], names
+
+    @staticmethod
+    def _sum(groups, weights, size):
+        # bincount accumulates each bin in row order, so float sums are
+        # bit-identical to the sequential Python loops
+        return np.bincount(groups, weights=weights, minlength=size)
+
+    @staticmethod
+    def _count(groups, size):
+        return np.bincount(groups, minlength=size)
+
+    def _product_totals(self):
+        codes = self.codes["ProductName"]
+        size = len(self.categories["ProductName"])
+        qty = self._sum(codes, self.quantity, size).astype(np.int64)
+        revenue = self._sum(codes, self.amount, size)
+        return qty, revenue
+
+    def _daily_totals(self):
+        codes = self.codes["Date"]
+        size = len(self.categories["Date"])
+        return self._sum(codes, self.amount, size), self._count(codes, size)
+
+    # =========================
+    # AGGREGATES
+    # =========================
+
+    def total_revenue(self):
+        if not len(self):
+            return 0.0
+        total = self._sum(np.zeros(len(self), dtype=np.int64), self.amount, 1)[0]
+        return round(float(total), 2)
+
+    def date_range(self):
+        dates = self.categories["Date"]
+        if not dates:
+            return None, None
+        return min(dates), max(dates)
+
+    def region_wise_sales(self):
+        groups, names = self._stripped_groups("Region")
+        mask = groups >= 0
+
+        sales = self._sum(groups[mask], self.amount[mask], len(names)).tolist()
+        counts = self._count(groups[mask], len(names)).tolist()
+        total_revenue = float(self._sum(np.zeros(len(self), dtype=np.int64), self.amount, 1)[0])
+
+        region_data = {}
+        for i, region in enumerate(names):
+            region_data[region] = {
+                "total_sales": sales[i],
+                "transaction_count": counts[i],
+                "percentage": round((sales[i] / total_revenue) * 100, 2)
+            }
+
+        return dict(
+            sorted(
+                region_data.items(),
+                key=lambda x: x[1]["total_sales"],
+                reverse=True
+            )
+        )
+
+    def top_selling_products(self, n=5):
+        qty, revenue = self._product_totals()
+        order = np.argsort(-qty, kind="stable")[:n]
+        names = self.categories["ProductName"]
+
+        return [
+            (names[i], int(qty[i]), round(float(revenue[i]), 2))
+            for i in order.tolist()
+        ]
+
+    def low_performing_products(self, threshold=10):
+        qty, revenue = self._product_totals()
+        low = np.nonzero(qty < threshold)[0]
+        order = low[np.argsort(qty[low], kind="stable")]
+        names = self.categories["ProductName"]
+
+        return [
+            (names[i], int(qty[i]), round(float(revenue[i]), 2))
+            for i in order.tolist()
+        ]
+
+    def customer_analysis(self):
+        groups, names = self._stripped_groups("CustomerID")
+        mask = groups >= 0
+        groups = groups[mask]
+
+        spent = self._sum(groups, self.amount[mask], len(names))
+        counts = self._count(groups, len(names))
+
+        # Distinct (customer, product) pairs, grouped by customer
+        product_names = self.categories["ProductName"]
+        n_products = max(len(product_names), 1)
+        pairs = np.unique(groups * n_products + self.codes["ProductName"][mask])
+        bought = [[] for _ in names]
+        for customer, product in zip((pairs // n_products).tolist(), (pairs % n_products).tolist()):
+            bought[customer].append(product_names[product])
+
+        spent_list = spent.tolist()
+        count_list = counts.tolist()
+        # Ranked on the rounded totals, ties in first-seen order, like
+        # the sort over the rounded dict values in CustomerAccumulator
+        result = {}
+        for i in np.argsort(-np.round(spent, 2), kind="stable").tolist():
+            result[names[i]] = {
+                "total_spent": round(spent_list[i], 2),
+                "purchase_count": count_list[i],
+                "avg_order_value": round(spent_list[i] / count_list[i], 2),
+                "products_bought": sorted(bought[i])
+            }
+
+        return result
+
+    def top_customers(self, n=5):
+        """
+        First n entries of customer_analysis() without building the
+        per-customer product lists.
+        """
+        groups, names = self._stripped_groups("CustomerID")
+        mask = groups >= 0
+        groups = groups[mask]
+
+        spent = self._sum(groups, self.amount[mask], len(names))
+        counts = self._count(groups, len(names))
+
+        result = []
+        for i in np.argsort(-np.round(spent, 2), kind="stable")[:n].tolist():
+            total, orders = float(spent[i]), int(counts[i])
+            result.append((names[i], {
+                "total_spent": round(total, 2),
+                "purchase_count": orders,
+                "avg_order_value": round(total / orders, 2)
+            }))
+
+        return result
+
+    def region_unique_customers(self):
+        regions, region_names = self._stripped_groups("Region")
+        customers, customer_names = self._stripped_groups("CustomerID")
+        mask = (regions >= 0) & (customers >= 0)
+
+        n_customers = max(len(customer_names), 1)
+        pairs = np.unique(regions[mask] * n_customers + customers[mask])
+        counts = self._count(pairs // n_customers, len(region_names)).tolist()
+
+        # Regions with no named customer are left out, like the dict path
+        result = {region_names[i]: counts[i] for i in range(len(region_names)) if counts[i]}
+        return dict(sorted(result.items(), key=lambda x: x[1], reverse=True))
+
+    def daily_sales_trend(self):
+        revenue, counts = self._daily_totals()
+        dates = self.categories["Date"]
+
+        # Distinct (date, customer) pairs counted per date
+        customers, customer_names = self._stripped_groups("CustomerID")
+        mask = customers >= 0
+        n_customers = max(len(customer_names), 1)
+        pairs = np.unique(self.codes["Date"][mask] * n_customers + customers[mask])
+        unique_customers = self._count(pairs // n_customers, len(dates)).tolist()
+
+        revenue = revenue.tolist()
+        counts = counts.tolist()
+        result = {}
+        for i in sorted(range(len(dates)), key=lambda i: dates[i]):
+            if not dates[i]:
+                continue
+
+            result[dates[i]] = {
+                "revenue": round(revenue[i], 2),
+                "transaction_count": counts[i],
+                "unique_customers": unique_customers[i]
+            }
+
+        return result
+
+    def find_peak_sales_day(self):
+        revenue, counts = self._daily_totals()
+        if not len(revenue):
+            raise ValueError("max() arg is an empty sequence")
+
+        peak = int(np.argmax(revenue))
+        return (
+            self.categories["Date"][peak],
+            round(float(revenue[peak]), 2),
+            int(counts[peak])
+        )
@@ -0,0 +1,425 @@
+"""
+Pre-aggregated sales cube over Region x ProductName x Date.
+
+One pass materializes revenue, quantity and transaction count for every
+grouping of the three dimensions (the base cells plus all roll-ups), so
+slices such as "North revenue by day" or "top products in East" are
+lookups instead of rescans. Base cells also keep an amount histogram
+for min/max amount filters: bins wholly inside the bounds are summed,
+and the amounts of the bins between edges are kept so a bound that is
+not an edge only rescans the rows of the bin it falls in.
+"""
+import sys
+import time
+from array import array
+from bisect import bisect_left
+
+from utils.data_processor import Accumulator
+from utils.records import as_transaction
+
+
+DIMENSIONS = ("Region", "ProductName", "Date")
+
+# Every subset of DIMENSIONS, in the order SalesCube.add builds the keys
+GROUPINGS = (
+    (),
+    ("Region",),
+    ("ProductName",),
+    ("Date",),
+    ("Region", "ProductName"),
+    ("Region", "Date"),
+    ("ProductName", "Date"),
+    ("Region", "ProductName", "Date")
+)
+BASE = GROUPINGS[-1]
+
+DEFAULT_AMOUNT_EDGES = (1000, 2500, 5000, 10000, 25000, 50000, 100000, 250000, 500000)
+
+
+def _add(cells, key, amount, quantity):
+    cell = cells.get(key)
+    if cell is None:
+        cells[key] = [amount, quantity, 1]
+    else:
+        cell[0] += amount
+        cell[1] += quantity
+        cell[2] += 1
+
+
+class SalesCube(Accumulator):
+    """
+    Revenue / quantity / count per grouping of DIMENSIONS, fed like an
+    accumulator (add, merge) or built with SalesCube.build().
+
+    Each grouping's cells are summed in row order and kept in first-seen
+    order, so unfiltered and region-filtered answers equal a pass over
+    the matching rows. Region is the raw field value, as the region
+    filter compares it. Amount-filtered answers are summed from the
+    histogram bins and may differ from a row pass in the last
+    floating-point bits.
+
+    Histogram bins alternate between the open interval below each edge
+    and the edge value itself, so both amount >= edge and amount <= edge
+    select whole bins. Other bounds also scan the (amount, quantity)
+    pairs of the one open bin they fall in, from bin_rows.
+    """
+
+    def __init__(self, amount_edges=DEFAULT_AMOUNT_EDGES):
+        self.amount_edges = tuple(sorted(amount_edges))
+        self.groupings = {grouping: {} for grouping in GROUPINGS}
+        self.histograms = {}
+        self.bin_rows = {}
+        self.rows = 0
+        self.build_seconds = None
+
+        # Query filters; set on views returned by filtered()
+        self.region = None
+        self.min_amount = None
+        self.max_amount = None
+
+    @classmethod
+    def build(cls, transactions, amount_edges=DEFAULT_AMOUNT_EDGES):
+        """
+        Builds a cube in one pass over validated transactions and
+        records the time taken in build_seconds.
+        """
+        cube = cls(amount_edges)
+        start = time.perf_counter()
+        for tx in transactions:
+            tx = as_transaction(tx)
+            cube.add(tx, tx.Quantity * tx.UnitPrice)
+        cube.build_seconds = time.perf_counter() - start
+        return cube
+
+    # =========================
+    # BUILDING
+    # =========================
+
+    def _bin(self, amount):
+        edges = self.amount_edges
+        i = bisect_left(edges, amount)
+        if i < len(edges) and edges[i] == amount:
+            return 2 * i + 1
+        return 2 * i
+
+    def add(self, tx, amount):
+        region, product, date = tx.Region, tx.ProductName, tx.Date
+        quantity = tx.Quantity
+        groupings = self.groupings
+
+        for grouping, key in zip(GROUPINGS, (
+            (), (region,), (product,), (date,),
+            (region, product), (region, date), (product, date),
+            (region, product, date)
+        )):
+            _add(groupings[grouping], key, amount, quantity)
+
+        base = (region, product, date)
+        bins = self.histograms.get(base)
+        if bins is None:
+            bins = self.histograms[base] = {}
+        index = self._bin(amount)
+        _add(bins, index, amount, quantity)
+        if not index & 1:
+            amounts, quantities = self._bin_rows(base, index)
+            amounts.append(amount)
+            quantities.append(quantity)
+
+        self.rows += 1
+
+    def _bin_rows(self, base, index):
+        """
+        (amounts, quantities) of the rows in one open histogram bin.
+        """
+        bins = self.bin_rows.get(base)
+        if bins is None:
+            bins = self.bin_rows[base] = {}
+        rows = bins.get(index)
+        if rows is None:
+            rows = bins[index] = (array("d"), array("q"))
+        return rows
+
+    def merge(self, other):
+        if other.amount_edges != self.amount_edges:
+            raise ValueError("Cannot merge cubes built with different amount edges")
+
+        for grouping, cells in other.groupings.items():
+            mine = self.groupings[grouping]
+            for key, (revenue, quantity, count) in cells.items():
+                cell = mine.setdefault(key, [0.0, 0, 0])
+                cell[0] += revenue
+                cell[1] += quantity
+                cell[2] += count
+
+        for base, bins in other.histograms.items():
+            mine = self.histograms.setdefault(base, {})
+            for index, (revenue, quantity, count) in bins.items():
+                cell = mine.setdefault(index, [0.0, 0, 0])
+                cell[0] += revenue
+                cell[1] += quantity
+                cell[2] += count
+
+        for base, bins in other.bin_rows.items():
+            for index, (amounts, quantities) in bins.items():
+                rows = self._bin_rows(base, index)
+                rows[0].extend(amounts)
+                rows[1].extend(quantities)
+
+        self.rows += other.rows
+
+    def result(self):
+        return self.describe()
+
+    # =========================
+    # SLICING
+    # =========================
+
+    def filtered(self, region=None, min_amount=None, max_amount=None):
+        """
+        A view of the cube whose queries (and the data_processor metric
+        functions given the view) only see matching transactions, with
+        the same semantics as validate_and_filter. Shares the cells.
+        """
+        view = object.__new__(type(self))
+        view.__dict__.update(self.__dict__)
+        view.region = region
+        view.min_amount = min_amount
+        view.max_amount = max_amount
+        return view
+
+    def _bin_range(self):
+        """
+        (lowest, highest) histogram bin wholly inside the amount filters,
+        and the open bins a bound falls inside (scanned row by row).
+        """
+        edges = self.amount_edges
+        lo, hi = 0, 2 * len(edges)
+        partial = set()
+
+        if self.min_amount:
+            i = bisect_left(edges, self.min_amount)
+            lo = 2 * i + 1
+            if i == len(edges) or edges[i] != self.min_amount:
+                partial.add(2 * i)
+        if self.max_amount:
+            i = bisect_left(edges, self.max_amount)
+            if i < len(edges) and edges[i] == self.max_amount:
+                hi = min(hi, 2 * i + 1)
+            else:
+                hi = min(hi, 2 * i - 1)
+                partial.add(2 * i)
+        return lo, hi, partial
+
+    def _scan_bin(self, base, index):
+        """
+        [revenue, quantity, count] of the rows in one open bin that pass
+        the amount filters.
+        """
+        min_amount, max_amount = self.min_amount, self.max_amount
+        amounts, quantities = self.bin_rows[base][index]
+        revenue = 0.0
+        total = 0
+        count = 0
+        for amount, quantity in zip(amounts, quantities):
+            if min_amount and amount < min_amount:
+                continue
+            if max_amount and amount > max_amount:
+                continue
+            revenue += amount
+            total += quantity
+            count += 1
+        return [revenue, total, count]
+
+    def _cells(self, dims):
+        """
+        {key: [revenue, quantity, count]} for the grouping dims under
+        the current filters, keys ordered like dims.
+        """
+        dims = tuple(dims)
+        for dim in dims:
+            if dim not in DIMENSIONS:
+                raise ValueError(f"Unknown cube dimension: {dim}")
+
+        if self.min_amount or self.max_amount:
+            return self._histogram_cells(dims)
+
+        if not self.region:
+            return self._grouping(dims)
+
+        # Region-filtered: read the grouping that includes Region and
+        # keep that region's cells (one per key, so no re-summing)
+        with_region = tuple(d for d in DIMENSIONS if d in dims or d == "Region")
+        cells = self.groupings[with_region]
+        position = with_region.index("Region")
+        order = [with_region.index(d) for d in dims]
+
+        return {
+            tuple(key[i] for i in order): cell
+            for key, cell in cells.items()
+            if key[position] == self.region
+        }
+
+    def _grouping(self, dims):
+        canonical = tuple(d for d in DIMENSIONS if d in dims)
+        cells = self.groupings[canonical]
+        if canonical == dims:
+            return cells
+        order = [canonical.index(d) for d in dims]
+        return {tuple(key[i] for i in order): cell for key, cell in cells.items()}
+
+    def _histogram_cells(self, dims):
+        lo, hi, partial = self._bin_range()
+        positions = [DIMENSIONS.index(d) for d in dims]
+        result = {}
+
+        for base, bins in self.histograms.items():
+            if self.region and base[0] != self.region:
+                continue
+            key = tuple(base[i] for i in positions)
+            for index, measures in bins.items():
+                if index in partial:
+                    measures = self._scan_bin(base, index)
+                    if not measures[2]:
+                        continue
+                elif not lo <= index <= hi:
+                    continue
+                revenue, quantity, count = measures
+                cell = result.get(key)
+                if cell is None:
+                    result[key] = [revenue, quantity, count]
+                else:
+                    cell[0] += revenue
+                    cell[1] += quantity
+                    cell[2] += count
+        return result
+
+    def rollup(self, dims=()):
+        """
+        Measures per combination of the given dimensions, e.g.
+        cube.filtered(region="North").rollup(["Date"]) for North revenue
+        by day: {key tuple: {"revenue", "quantity", "transaction_count"}}.
+        """
+        return {
+            key: {"revenue": round(revenue, 2), "quantity": quantity, "transaction_count": count}
+            for key, (revenue, quantity, count) in self._cells(dims).items()
+        }
+
+    # =========================
+    # METRICS (data_processor answers from these)
+    # =========================
+
+    def __len__(self):
+        cell = self._cells(()).get(())
+        return cell[2] if cell else 0
+
+    def total_revenue(self):
+        cell = self._cells(()).get(())
+        return round(cell[0], 2) if cell else 0.0
+
+    def region_wise_sales(self):
+        total_revenue = sum(cell[0] for cell in self._cells(()).values())
+
+        regions = {}
+        for (region,), (revenue, _, count) in self._cells(("Region",)).items():
+            region = region.strip()
+            if not region:
+                continue
+            if region in regions:
+                regions[region][0] += revenue
+                regions[region][1] += count
+            else:
+                regions[region] = [revenue, count]
+
+        region_data = {
+            region: {
+                "total_sales": sales,
+                "transaction_count": count,
+                "percentage": round((sales / total_revenue) * 100, 2)
+            }
+            for region, (sales, count) in regions.items()
+        }
+        return dict(sorted(region_data.items(), key=lambda x: x[1]["total_sales"], reverse=True))
+
+    def _products(self):
+        return [
+            (name, quantity, round(revenue, 2))
+            for (name,), (revenue, quantity, _) in self._cells(("ProductName",)).items()
+        ]
+
+    def top_selling_products(self, n=5):
+        products = self._products()
+        products.sort(key=lambda x: x[1], reverse=True)
+        return products[:n]
+
+    def low_performing_products(self, threshold=10):
+        low_products = [p for p in self._products() if p[1] < threshold]
+        low_products.sort(key=lambda x: x[1])
+        return low_products
+
+    def date_range(self):
+        dates = [date for (date,) in self._cells(("Date",))]
+        if not dates:
+            return None, None
+        return min(dates), max(dates)
+
+    def find_peak_sales_day(self):
+        days = self._cells(("Date",))
+        (date,), (revenue, _, count) = max(days.items(), key=lambda item: item[1][0])
+        return date, round(revenue, 2), count
+
+    # No CustomerID dimension: fail loudly instead of answering from rows
+    # the cube does not keep
+
+    def customer_analysis(self):
+        raise ValueError("SalesCube has no CustomerID dimension; run customer_analysis on the transactions")
+
+    def top_customers(self, n=5):
+        raise ValueError("SalesCube has no CustomerID dimension; run top_customers on the transactions")
+
+    def region_unique_customers(self):
+        raise ValueError(
+            "SalesCube has no CustomerID dimension; run region_unique_customers on the transactions"
+        )
+
+    def daily_sales_trend(self):
+        raise ValueError(
+            "SalesCube has no CustomerID dimension for unique customers per day; "
+            "run daily_sales_trend on the transactions"
+        )
+
+    # =========================
+    # REPORTING
+    # =========================
+
+    def memory_bytes(self):
+        """
+        Approximate bytes held by the cells, histograms and bin rows
+        (containers and numbers; dimension strings are shared with the
+        rows and counted once).
+        """
+        seen = set()
+        total = 0
+        stack = [self.groupings, self.histograms, self.bin_rows]
+
+        while stack:
+            obj = stack.pop()
+            if id(obj) in seen:
+                continue
+            seen.add(id(obj))
+            total += sys.getsizeof(obj)
+
+            if isinstance(obj, dict):
+                stack.extend(obj.keys())
+                stack.extend(obj.values())
+            elif isinstance(obj, (list, tuple)):
+                stack.extend(obj)
+
+        return total
+
+    def describe(self):
+        return {
+            "rows": self.rows,
+            "cells": {"x".join(g) or "total": len(cells) for g, cells in self.groupings.items()},
+            "build_seconds": self.build_seconds,
+            "memory_bytes": self.memory_bytes()
+        }
@@ -1,275 +1,1106 @@
-def parse_transactions(raw_lines):
+import hashlib
+import heapq
+import os
+import pickle
+from itertools import chain
+from operator import attrgetter, itemgetter
+
+from utils.lru_cache import LRUCache
+from utils.output_writer import atomic_write
+from utils.parse_cache import file_digest
+from utils.records import Transaction, paused_gc
+from utils.sketches import DEFAULT_CAPACITY, DEFAULT_PRECISION, SpaceSaving, distinct_error, new_distinct_counter
+from utils.validation import RuleSet
+
+
+def parse_transaction(line):
     """
-    Parses raw lines into clean list of dictionaries.
+    Parses a single raw line into a Transaction record.
+    Returns None for malformed rows.
     """
+    parts = line.split("|")
+
+    # Skip incorrect rows
+    if len(parts) != 8:
+        return None
+
+    transaction_id, date, product_id, product_name, quantity, unit_price, customer_id, region = parts
+
+    # Clean commas
+    product_name = product_name.replace(",", "")
+    quantity = quantity.replace(",", "")
+    unit_price = unit_price.replace(",", "")
+
+    try:
+        quantity = int(quantity)
+        unit_price = float(unit_price)
+    except ValueError:
+        return None
+
+    return Transaction(transaction_id, date, product_id, product_name, quantity, unit_price, customer_id, region)
 
-    transactions = []
 
+def iter_transactions(raw_lines, rejections=None):
+    """
+    Lazily parses raw lines, yielding one Transaction record at a time.
+    If a rejections dict is given, dropped lines are counted in it under
+    the parse rules ("field_count", "numeric_parse").
+    """
     for line in raw_lines:
-        parts = line.split("|")
+        transaction = parse_transaction(line)
+        if transaction is not None:
+            yield transaction
+        elif rejections is not None:
+            rule = "field_count" if line.count("|") != 7 else "numeric_parse"
+            rejections[rule] = rejections.get(rule, 0) + 1
 
-        # Skip incorrect rows
-        if len(parts) != 8:
-            continue
 
-        transaction_id, date, product_id, product_name, quantity, unit_price, customer_id, region = parts
+def parse_transactions(raw_lines, rejections=None):
+    """
+    Parses raw lines into clean list of Transaction records.
+    """
+    with paused_gc():
+        return list(iter_transactions(raw_lines, rejections))
 
-        # Clean commas
-        product_name = product_name.replace(",", "")
-        quantity = quantity.replace(",", "")
-        unit_price = unit_price.replace(",", "")
 
-        try:
-            quantity = int(quantity)
-            unit_price = float(unit_price)
-        except ValueError:
-            continue
-
-        transaction = {
-            "TransactionID": transaction_id,
-            "Date": date,
-            "ProductID": product_id,
-            "ProductName": product_name,
-            "Quantity": quantity,
-            "UnitPrice": unit_price,
-            "CustomerID": customer_id,
-            "Region": region
-        }
+class TransactionStream:
+    """
+    Re-iterable view over a lazy transaction pipeline.
+    Each iteration calls the factory again, so every consumer gets a
+    fresh generator and no stage has to hold the full dataset in memory.
+    """
+
+    def __init__(self, factory):
+        self._factory = factory
+
+    def __iter__(self):
+        return iter(self._factory())
+
+
+def iter_validated(transactions, summary=None, region=None, min_amount=None, max_amount=None,
+                   quarantine=None):
+    """
+    Lazily validates and filters transactions, yielding valid ones.
+    Transaction dicts are converted to Transaction records (a dict
+    missing a field counts as invalid).
+    If a summary dict is given it is reset and filled with the same
+    counters returned by validate_and_filter, plus per-rule
+    "rejections" (see utils.validation). Rejected rows are written to
+    quarantine (a QuarantineWriter) if given.
+    """
+    if summary is None:
+        summary = {}
+
+    rules = RuleSet(region, min_amount, max_amount)
+    rules.summary(summary)
+    try:
+        yield from rules.iter_records(transactions, quarantine)
+    finally:
+        rules.summary(summary)
+
+
+def iter_clean_transactions(raw_lines, summary=None, region=None, min_amount=None, max_amount=None,
+                            quarantine=None):
+    """
+    Single pass over raw lines that parses, validates and filters,
+    yielding only valid, matching Transaction records. Rows are
+    rejected before any record is built. summary (if given) receives
+    the same counters as validate_and_filter(parse_transactions(...)),
+    plus "rejections" per rule, including the lines dropped by parsing.
+    """
+    if summary is None:
+        summary = {}
+
+    rules = RuleSet(region, min_amount, max_amount)
+    rules.summary(summary)
+    try:
+        yield from rules.iter_lines(raw_lines, quarantine)
+    finally:
+        rules.summary(summary)
+
+
+def clean_columns(columns, summary=None, region=None, min_amount=None, max_amount=None,
+                  quarantine=None):
+    """
+    Validates and filters parsed columns (parse_cache.load_columns
+    output) with vectorized rule checks and returns the matching rows as
+    Transaction records, building records only for those rows. summary
+    is filled like iter_validated's.
+    """
+    if summary is None:
+        summary = {}
+
+    rules = RuleSet(region, min_amount, max_amount)
+    valid_transactions = rules.select_columns(columns, quarantine)
+    rules.summary(summary)
+    return valid_transactions
 
-        transactions.append(transaction)
 
-    return transactions
 def validate_and_filter(transactions, region=None, min_amount=None, max_amount=None):
-    valid_transactions = []
-    invalid_count = 0
-    region_filtered = 0
-    amount_filtered = 0
+    summary = {}
+    valid_transactions = list(
+        iter_validated(transactions, summary, region, min_amount, max_amount)
+    )
 
-    for tx in transactions:
-        try:
-            if tx["Quantity"] <= 0 or tx["UnitPrice"] <= 0:
-                invalid_count += 1
-                continue
+    return valid_transactions, summary["invalid"], summary
 
-            if not (
-                tx["TransactionID"].startswith("T") and
-                tx["ProductID"].startswith("P") and
-                tx["CustomerID"].startswith("C")
-            ):
-                invalid_count += 1
-                continue
+# =========================
+# SINGLE-PASS ACCUMULATOR ENGINE
+# =========================
 
-            amount = tx["Quantity"] * tx["UnitPrice"]
+def _peek(transactions):
+    """
+    Returns (rows, by_key): an iterator over all the transactions and
+    whether they are dicts (read by key) rather than records (read by
+    attribute), judged from the first row. Input must not mix the two.
+    """
+    rows = iter(transactions)
+    first = next(rows, None)
+    if first is None:
+        return rows, False
+    return chain((first,), rows), isinstance(first, dict)
 
-            if region and tx["Region"] != region:
-                region_filtered += 1
-                continue
 
-            if min_amount and amount < min_amount:
-                amount_filtered += 1
-                continue
+def _fields(transactions, *names):
+    """
+    Yields a (field, ...) tuple per transaction, records or dicts.
+    """
+    rows, by_key = _peek(transactions)
+    return map((itemgetter if by_key else attrgetter)(*names), rows)
 
-            if max_amount and amount > max_amount:
-                amount_filtered += 1
-                continue
 
-            valid_transactions.append(tx)
+class Accumulator:
+    """
+    Base class for metric accumulators fed by aggregate_transactions.
+    add() receives each transaction record (read by attribute, see
+    utils.records) together with its precomputed amount. update() feeds
+    a whole sequence (records or dicts) on its own; the accumulators
+    behind the single-metric functions override it with a loop over
+    just the fields they read.
+    """
 
-        except KeyError:
-            invalid_count += 1
+    def add(self, tx, amount):
+        raise NotImplementedError
 
-    summary = {
-        "total_input": len(transactions),
-        "invalid": invalid_count,
-        "filtered_by_region": region_filtered,
-        "filtered_by_amount": amount_filtered,
-        "final_count": len(valid_transactions)
-    }
+    def update(self, transactions):
+        for tx in transactions:
+            if isinstance(tx, dict):
+                tx = Transaction.from_dict(tx)
+            self.add(tx, tx.Quantity * tx.UnitPrice)
+        return self
 
-    return valid_transactions, invalid_count, summary
+    def result(self):
+        raise NotImplementedError
 
-def calculate_total_revenue(transactions):
-    total = 0.0
-    for tx in transactions:
-        total += tx["Quantity"] * tx["UnitPrice"]
-    return round(total, 2)
+    def merge(self, other):
+        """
+        Folds another accumulator of the same type (e.g. from another
+        chunk of the input) into this one.
+        """
+        raise NotImplementedError
 
-def region_wise_sales(transactions):
-    region_data = {}
 
-    total_revenue = sum(tx["Quantity"] * tx["UnitPrice"] for tx in transactions)
+class RevenueAccumulator(Accumulator):
+    def __init__(self):
+        self.total = 0.0
+        self.count = 0
 
-    for tx in transactions:
-        region = tx["Region"].strip()
-        if not region:
-            continue
+    def add(self, tx, amount):
+        self.total += amount
+        self.count += 1
 
-        revenue = tx["Quantity"] * tx["UnitPrice"]
+    def update(self, transactions):
+        # Too little work per row to afford building field tuples
+        total = self.total
+        count = self.count
+        rows, by_key = _peek(transactions)
+        if by_key:
+            for tx in rows:
+                total += tx["Quantity"] * tx["UnitPrice"]
+                count += 1
+        else:
+            for tx in rows:
+                total += tx.Quantity * tx.UnitPrice
+                count += 1
+        self.total = total
+        self.count = count
+        return self
 
-        if region not in region_data:
-            region_data[region] = {
+    def result(self):
+        return round(self.total, 2)
+
+    def merge(self, other):
+        self.total += other.total
+        self.count += other.count
+
+
+class DateRangeAccumulator(Accumulator):
+    def __init__(self):
+        self.first = None
+        self.last = None
+
+    def add(self, tx, amount):
+        date = tx.Date
+        if self.first is None or date < self.first:
+            self.first = date
+        if self.last is None or date > self.last:
+            self.last = date
+
+    def result(self):
+        return self.first, self.last
+
+    def merge(self, other):
+        if other.first is not None and (self.first is None or other.first < self.first):
+            self.first = other.first
+        if other.last is not None and (self.last is None or other.last > self.last):
+            self.last = other.last
+
+
+class RegionAccumulator(Accumulator):
+    def __init__(self):
+        self.regions = {}
+        self.total_revenue = 0.0
+
+    def add(self, tx, amount):
+        self.total_revenue += amount
+
+        region = tx.Region.strip()
+        if not region:
+            return
+
+        if region not in self.regions:
+            self.regions[region] = {
                 "total_sales": 0.0,
                 "transaction_count": 0
             }
 
-        region_data[region]["total_sales"] += revenue
-        region_data[region]["transaction_count"] += 1
+        self.regions[region]["total_sales"] += amount
+        self.regions[region]["transaction_count"] += 1
 
-    for region in region_data:
-        region_data[region]["percentage"] = round(
-            (region_data[region]["total_sales"] / total_revenue) * 100, 2
-        )
+    def update(self, transactions):
+        regions = self.regions
+        total = self.total_revenue
+        for region, quantity, unit_price in _fields(transactions, "Region", "Quantity", "UnitPrice"):
+            amount = quantity * unit_price
+            total += amount
+
+            region = region.strip()
+            if not region:
+                continue
+
+            data = regions.get(region)
+            if data is None:
+                data = regions[region] = {
+                    "total_sales": 0.0,
+                    "transaction_count": 0
+                }
+            data["total_sales"] += amount
+            data["transaction_count"] += 1
+
+        self.total_revenue = total
+        return self
 
-    return dict(
-        sorted(
-            region_data.items(),
-            key=lambda x: x[1]["total_sales"],
-            reverse=True
+    def merge(self, other):
+        self.total_revenue += other.total_revenue
+
+        for region, data in other.regions.items():
+            if region not in self.regions:
+                self.regions[region] = {
+                    "total_sales": 0.0,
+                    "transaction_count": 0
+                }
+            self.regions[region]["total_sales"] += data["total_sales"]
+            self.regions[region]["transaction_count"] += data["transaction_count"]
+
+    def result(self):
+        region_data = {}
+        for region, data in self.regions.items():
+            region_data[region] = {
+                "total_sales": data["total_sales"],
+                "transaction_count": data["transaction_count"],
+                "percentage": round(
+                    (data["total_sales"] / self.total_revenue) * 100, 2
+                )
+            }
+
+        return dict(
+            sorted(
+                region_data.items(),
+                key=lambda x: x[1]["total_sales"],
+                reverse=True
+            )
         )
-    )
 
-def top_selling_products(transactions, n=5):
-    products = {}
 
-    for tx in transactions:
-        name = tx["ProductName"]
-        qty = tx["Quantity"]
-        revenue = qty * tx["UnitPrice"]
+class RegionCustomersAccumulator(Accumulator):
+    """
+    Distinct customers per region, counted with exact sets or
+    HyperLogLog sketches (see DailyAccumulator).
+    """
 
-        if name not in products:
-            products[name] = {"qty": 0, "revenue": 0.0}
+    def __init__(self, distinct="exact", precision=DEFAULT_PRECISION):
+        self.regions = {}
+        self.distinct = distinct
+        self.precision = precision
 
-        products[name]["qty"] += qty
-        products[name]["revenue"] += revenue
+        new_distinct_counter(distinct, precision)
 
-    result = [
-        (name, data["qty"], round(data["revenue"], 2))
-        for name, data in products.items()
-    ]
+    def add(self, tx, amount):
+        region = tx.Region.strip()
+        customer = tx.CustomerID.strip()
+        if not region or not customer:
+            return
 
-    result.sort(key=lambda x: x[1], reverse=True)
-    return result[:n]
+        if region not in self.regions:
+            self.regions[region] = new_distinct_counter(self.distinct, self.precision)
+        self.regions[region].add(customer)
 
+    def merge(self, other):
+        for region, theirs in other.regions.items():
+            if region not in self.regions:
+                self.regions[region] = new_distinct_counter(self.distinct, self.precision)
+            self.regions[region] |= theirs
 
-def customer_analysis(transactions):
-    customers = {}
+    def result(self):
+        counts = {region: len(customers) for region, customers in self.regions.items()}
+        return dict(sorted(counts.items(), key=lambda x: x[1], reverse=True))
 
-    for tx in transactions:
-        customer_id = tx["CustomerID"].strip()
-        if not customer_id:
-            continue
+    def relative_error(self):
+        return distinct_error(self.distinct, self.precision)
+
+
+class ProductAccumulator(Accumulator):
+    """
+    Per-product quantity and revenue; shared by the top and low
+    performing product metrics.
+    """
+
+    def __init__(self):
+        self.products = {}
+
+    def add(self, tx, amount):
+        name = tx.ProductName
+
+        if name not in self.products:
+            self.products[name] = [0, 0.0]
+
+        data = self.products[name]
+        data[0] += tx.Quantity
+        data[1] += amount
+
+    def update(self, transactions):
+        products = self.products
+        for name, quantity, unit_price in _fields(transactions, "ProductName", "Quantity", "UnitPrice"):
+            data = products.get(name)
+            if data is None:
+                data = products[name] = [0, 0.0]
+            data[0] += quantity
+            data[1] += quantity * unit_price
+        return self
+
+    def merge(self, other):
+        for name, (qty, revenue) in other.products.items():
+            if name not in self.products:
+                self.products[name] = [0, 0.0]
+            data = self.products[name]
+            data[0] += qty
+            data[1] += revenue
 
-        amount = tx["Quantity"] * tx["UnitPrice"]
-        product = tx["ProductName"]
+    def result(self):
+        return [
+            (name, qty, round(revenue, 2))
+            for name, (qty, revenue) in self.products.items()
+        ]
 
-        if customer_id not in customers:
-            customers[customer_id] = {
+    def top(self, n=5):
+        # Partial selection; ties keep first-seen order like a stable sort
+        products = self.products
+        return [
+            (name, products[name][0], round(products[name][1], 2))
+            for name in heapq.nlargest(n, products, key=lambda name: products[name][0])
+        ]
+
+    def low(self, threshold=10):
+        low_products = [p for p in self.result() if p[1] < threshold]
+
+        # Sort by total quantity ascending
+        low_products.sort(key=lambda x: x[1])
+        return low_products
+
+
+class CustomerAccumulator(Accumulator):
+    """
+    Per-customer spend and order count. track_products=False skips the
+    per-customer product sets (and products_bought) when only rankings
+    are needed.
+    """
+
+    def __init__(self, track_products=True):
+        self.track_products = track_products
+        self.customers = {}
+
+    def add(self, tx, amount):
+        customer_id = tx.CustomerID.strip()
+        if not customer_id:
+            return
+
+        if customer_id not in self.customers:
+            self.customers[customer_id] = {
                 "total_spent": 0.0,
                 "purchase_count": 0,
                 "products": set()
             }
 
-        customers[customer_id]["total_spent"] += amount
-        customers[customer_id]["purchase_count"] += 1
-        customers[customer_id]["products"].add(product)
+        data = self.customers[customer_id]
+        data["total_spent"] += amount
+        data["purchase_count"] += 1
+        if self.track_products:
+            data["products"].add(tx.ProductName)
+
+    def update(self, transactions):
+        customers = self.customers
+        track = self.track_products
+        for customer_id, product, quantity, unit_price in _fields(
+            transactions, "CustomerID", "ProductName", "Quantity", "UnitPrice"
+        ):
+            customer_id = customer_id.strip()
+            if not customer_id:
+                continue
+
+            data = customers.get(customer_id)
+            if data is None:
+                data = customers[customer_id] = {
+                    "total_spent": 0.0,
+                    "purchase_count": 0,
+                    "products": set()
+                }
+            data["total_spent"] += quantity * unit_price
+            data["purchase_count"] += 1
+            if track:
+                data["products"].add(product)
+        return self
+
+    def merge(self, other):
+        for customer_id, theirs in other.customers.items():
+            if customer_id not in self.customers:
+                self.customers[customer_id] = {
+                    "total_spent": 0.0,
+                    "purchase_count": 0,
+                    "products": set()
+                }
+            data = self.customers[customer_id]
+            data["total_spent"] += theirs["total_spent"]
+            data["purchase_count"] += theirs["purchase_count"]
+            data["products"] |= theirs["products"]
 
-    result = {}
-    for cid, data in customers.items():
-        result[cid] = {
+    def _summary(self, data):
+        summary = {
             "total_spent": round(data["total_spent"], 2),
             "purchase_count": data["purchase_count"],
             "avg_order_value": round(
                 data["total_spent"] / data["purchase_count"], 2
-            ),
-            "products_bought": sorted(list(data["products"]))
+            )
         }
+        if self.track_products:
+            summary["products_bought"] = sorted(list(data["products"]))
+        return summary
 
-    return dict(
-        sorted(result.items(), key=lambda x: x[1]["total_spent"], reverse=True)
-    )
+    def result(self):
+        result = {}
+        for cid, data in self.customers.items():
+            result[cid] = self._summary(data)
 
-def daily_sales_trend(transactions):
-    daily_data = {}
+        return dict(
+            sorted(result.items(), key=lambda x: x[1]["total_spent"], reverse=True)
+        )
+
+    def top(self, n=5):
+        """
+        First n entries of result() as (customer_id, data) pairs, found
+        by partial selection instead of sorting every customer.
+        """
+        customers = self.customers
+        top_ids = heapq.nlargest(n, customers, key=lambda cid: round(customers[cid]["total_spent"], 2))
+        return [(cid, self._summary(customers[cid])) for cid in top_ids]
 
-    for tx in transactions:
-        date = tx["Date"]
-        revenue = tx["Quantity"] * tx["UnitPrice"]
-        customer = tx["CustomerID"].strip()
-
-        if not date:
-            continue
-
-        if date not in daily_data:
-            daily_data[date] = {
-                "revenue": 0.0,
-                "transaction_count": 0,
-                "customers": set()
-            }
 
-        daily_data[date]["revenue"] += revenue
-        daily_data[date]["transaction_count"] += 1
+class ApproxCustomerAccumulator(Accumulator):
+    """
+    Bounded-memory top customers by spend using a Space-Saving summary
+    of capacity counters. Reported spend may be overestimated by at most
+    max_error; purchase_count covers the orders seen since the customer
+    was last admitted to the summary.
+    """
 
-        if customer:
-            daily_data[date]["customers"].add(customer)
+    def __init__(self, capacity=DEFAULT_CAPACITY):
+        self.spend = SpaceSaving(capacity)
+        self.orders = {}
+
+    def add(self, tx, amount):
+        customer_id = tx.CustomerID.strip()
+        if not customer_id:
+            return
 
-    result = {}
-    for date in sorted(daily_data):
-        result[date] = {
-            "revenue": round(daily_data[date]["revenue"], 2),
-            "transaction_count": daily_data[date]["transaction_count"],
-            "unique_customers": len(daily_data[date]["customers"])
+        evicted = self.spend.add(customer_id, amount)
+        if evicted is not None:
+            del self.orders[evicted]
+        self.orders[customer_id] = self.orders.get(customer_id, 0) + 1
+
+    def merge(self, other):
+        self.spend.merge(other.spend)
+        self.orders = {
+            cid: self.orders.get(cid, 0) + other.orders.get(cid, 0)
+            for cid in self.spend.counts
         }
 
-    return result
+    def error_bound(self):
+        """
+        Largest possible overestimate of any reported spend.
+        """
+        return round(max(self.spend.errors.values(), default=0), 2)
 
-def find_peak_sales_day(transactions):
-    daily = {}
+    def top(self, n=5):
+        result = []
+        for cid, spent, error in self.spend.top(n):
+            orders = max(self.orders.get(cid, 0), 1)
+            result.append((cid, {
+                "total_spent": round(spent, 2),
+                "purchase_count": orders,
+                "avg_order_value": round(spent / orders, 2),
+                "max_error": round(error, 2)
+            }))
+        return result
+
+    def result(self):
+        return dict(self.top(len(self.spend.counts)))
+
+
+class DailyAccumulator(Accumulator):
+    """
+    Per-date revenue, transaction count and distinct customers; backs
+    both the daily trend and the peak sales day. distinct=None skips
+    the customers, for peak() only.
+    """
+
+    def __init__(self, distinct="exact", precision=DEFAULT_PRECISION):
+        self.days = {}
+        self.distinct = distinct
+        self.precision = precision
+
+        # Fail fast on an unknown mode rather than on the first row
+        if distinct is not None:
+            new_distinct_counter(distinct, precision)
+
+    def _new_day(self):
+        return {
+            "revenue": 0.0,
+            "transaction_count": 0,
+            "customers": new_distinct_counter(self.distinct, self.precision) if self.distinct else None
+        }
+
+    def relative_error(self):
+        return distinct_error(self.distinct, self.precision)
+
+    def add(self, tx, amount):
+        date = tx.Date
+
+        if date not in self.days:
+            self.days[date] = self._new_day()
+
+        data = self.days[date]
+        data["revenue"] += amount
+        data["transaction_count"] += 1
+
+        if data["customers"] is not None:
+            customer = tx.CustomerID.strip()
+            if customer:
+                data["customers"].add(customer)
+
+    def update(self, transactions):
+        days = self.days
+        if self.distinct is None:
+            # Peak day only: too little work per row for field tuples
+            rows, by_key = _peek(transactions)
+            if by_key:
+                for tx in rows:
+                    data = days.get(tx["Date"])
+                    if data is None:
+                        data = days[tx["Date"]] = self._new_day()
+                    data["revenue"] += tx["Quantity"] * tx["UnitPrice"]
+                    data["transaction_count"] += 1
+            else:
+                for tx in rows:
+                    data = days.get(tx.Date)
+                    if data is None:
+                        data = days[tx.Date] = self._new_day()
+                    data["revenue"] += tx.Quantity * tx.UnitPrice
+                    data["transaction_count"] += 1
+            return self
+
+        for date, customer, quantity, unit_price in _fields(
+            transactions, "Date", "CustomerID", "Quantity", "UnitPrice"
+        ):
+            data = days.get(date)
+            if data is None:
+                data = days[date] = self._new_day()
+            data["revenue"] += quantity * unit_price
+            data["transaction_count"] += 1
+
+            customer = customer.strip()
+            if customer:
+                data["customers"].add(customer)
+        return self
+
+    def merge(self, other):
+        for date, theirs in other.days.items():
+            if date not in self.days:
+                self.days[date] = self._new_day()
+            data = self.days[date]
+            data["revenue"] += theirs["revenue"]
+            data["transaction_count"] += theirs["transaction_count"]
+            if data["customers"] is not None:
+                data["customers"] |= theirs["customers"]
+
+    def result(self):
+        result = {}
+        for date in sorted(self.days):
+            if not date:
+                continue
+
+            result[date] = {
+                "revenue": round(self.days[date]["revenue"], 2),
+                "transaction_count": self.days[date]["transaction_count"],
+                "unique_customers": len(self.days[date]["customers"])
+            }
+
+        return result
+
+    def peak(self):
+        peak_date = max(self.days, key=lambda d: self.days[d]["revenue"])
+
+        return (
+            peak_date,
+            round(self.days[peak_date]["revenue"], 2),
+            self.days[peak_date]["transaction_count"]
+        )
+
+
+def aggregate_transactions(transactions, accumulators):
+    """
+    Feeds every accumulator from a single pass over the transactions,
+    computing each amount once. Plain transaction dicts are converted
+    to Transaction records on the way in. Returns the accumulators dict.
+    """
+    active = list(accumulators.values())
 
     for tx in transactions:
-        date = tx["Date"]
-        revenue = tx["Quantity"] * tx["UnitPrice"]
+        if isinstance(tx, dict):
+            tx = Transaction.from_dict(tx)
 
-        if date not in daily:
-            daily[date] = {"revenue": 0.0, "count": 0}
+        amount = tx.Quantity * tx.UnitPrice
+        for acc in active:
+            acc.add(tx, amount)
 
-        daily[date]["revenue"] += revenue
-        daily[date]["count"] += 1
+    return accumulators
 
-    peak_date = max(daily, key=lambda d: daily[d]["revenue"])
 
-    return (
-        peak_date,
-        round(daily[peak_date]["revenue"], 2),
-        daily[peak_date]["count"]
-    )
+RANKINGS = ("exact", "approx")
+
+
+def default_accumulators(distinct="exact", rankings="exact", precision=DEFAULT_PRECISION):
+    """
+    Returns a fresh set of the accumulators used by the sales report.
+    distinct selects exact sets or HyperLogLog sketches (of the given
+    precision) for the unique-customer counts per day and per region;
+    rankings selects exact customer totals or a bounded Space-Saving
+    summary for the top customers.
+    """
+    if rankings not in RANKINGS:
+        raise ValueError(f"Unknown rankings mode: {rankings}")
+
+    if rankings == "approx":
+        customers = ApproxCustomerAccumulator()
+    else:
+        # The report only ranks customers, so product sets are skipped
+        customers = CustomerAccumulator(track_products=False)
+
+    return {
+        "revenue": RevenueAccumulator(),
+        "dates": DateRangeAccumulator(),
+        "regions": RegionAccumulator(),
+        "region_customers": RegionCustomersAccumulator(distinct, precision),
+        "products": ProductAccumulator(),
+        "customers": customers,
+        "daily": DailyAccumulator(distinct, precision)
+    }
+
+
+def merge_accumulators(target, other):
+    """
+    Merges a dict of accumulators into target, key by key.
+    """
+    for name, acc in other.items():
+        if name in target:
+            target[name].merge(acc)
+        else:
+            target[name] = acc
+    return target
+
+
+def _run(transactions, accumulator):
+    return accumulator.update(transactions)
+
+
+def _precomputed(transactions, method):
+    """
+    Pre-aggregated sources (a SalesCube or one of its filtered views, a
+    TransactionTable, a SalesDatabase, a DateIndex) answer a metric function through
+    the method of that name; returns None for plain transactions.
+    """
+    return getattr(transactions, method, None)
+
+
+# =========================
+# METRIC FUNCTIONS
+# =========================
+
+def calculate_total_revenue(transactions):
+    answer = _precomputed(transactions, "total_revenue")
+    if answer:
+        return answer()
+    return _run(transactions, RevenueAccumulator()).result()
+
+def region_wise_sales(transactions):
+    answer = _precomputed(transactions, "region_wise_sales")
+    if answer:
+        return answer()
+    return _run(transactions, RegionAccumulator()).result()
+
+def top_selling_products(transactions, n=5):
+    answer = _precomputed(transactions, "top_selling_products")
+    if answer:
+        return answer(n)
+    return _run(transactions, ProductAccumulator()).top(n)
+
+
+def customer_analysis(transactions):
+    answer = _precomputed(transactions, "customer_analysis")
+    if answer:
+        return answer()
+    return _run(transactions, CustomerAccumulator()).result()
+
+def top_customers(transactions, n=5, mode="exact", capacity=DEFAULT_CAPACITY):
+    """
+    Returns the n highest-spending customers as (customer_id, data)
+    pairs. mode="approx" uses a Space-Saving summary with capacity
+    counters (bounded memory; data includes max_error). Pre-aggregated
+    sources rank exactly only.
+    """
+    answer = _precomputed(transactions, "top_customers")
+    if answer:
+        if mode != "exact":
+            raise ValueError(f"{type(transactions).__name__} only ranks customers exactly")
+        return answer(n)
+    if mode == "approx":
+        return _run(transactions, ApproxCustomerAccumulator(capacity)).top(n)
+    return _run(transactions, CustomerAccumulator(track_products=False)).top(n)
+
+def daily_sales_trend(transactions, distinct="exact", precision=DEFAULT_PRECISION):
+    """
+    Per-date revenue, transaction count and unique customers.
+    distinct="hll" estimates the unique customers with HyperLogLog
+    sketches (memory per day is 2**precision bytes regardless of the
+    number of customers). Pre-aggregated sources answer the exact
+    counts only.
+    """
+    answer = _precomputed(transactions, "daily_sales_trend")
+    if answer:
+        if distinct != "exact":
+            raise ValueError(f"{type(transactions).__name__} only counts exact unique customers")
+        return answer()
+    return _run(transactions, DailyAccumulator(distinct, precision)).result()
+
+def region_unique_customers(transactions, distinct="exact", precision=DEFAULT_PRECISION):
+    """
+    Returns {region: distinct customer count}, largest first.
+    distinct="hll" estimates the counts; pre-aggregated sources answer
+    the exact counts only.
+    """
+    answer = _precomputed(transactions, "region_unique_customers")
+    if answer:
+        if distinct != "exact":
+            raise ValueError(f"{type(transactions).__name__} only counts exact unique customers")
+        return answer()
+    return _run(transactions, RegionCustomersAccumulator(distinct, precision)).result()
+
+def date_range(transactions):
+    """
+    (first, last) Date string, or (None, None) without transactions.
+    """
+    answer = _precomputed(transactions, "date_range")
+    if answer:
+        return answer()
+    return _run(transactions, DateRangeAccumulator()).result()
+
+def find_peak_sales_day(transactions):
+    answer = _precomputed(transactions, "find_peak_sales_day")
+    if answer:
+        return answer()
+    return _run(transactions, DailyAccumulator(distinct=None)).peak()
 
 def low_performing_products(transactions, threshold=10):
-    product_data = {}
+    answer = _precomputed(transactions, "low_performing_products")
+    if answer:
+        return answer(threshold)
+    return _run(transactions, ProductAccumulator()).low(threshold)
+
+
+# =========================
+# AGGREGATE CACHE
+# =========================
+
+_NOT_CACHED = object()
+
+METRIC_FUNCTIONS = {
+    func.__name__: func for func in (
+        calculate_total_revenue, region_wise_sales, top_selling_products, customer_analysis,
+        top_customers, daily_sales_trend, region_unique_customers, date_range, find_peak_sales_day,
+        low_performing_products
+    )
+}
+
+# metric function -> (accumulator in default_accumulators(), value from it)
+# for answering region-only filters from the per-region partials
+PARTIAL_METRICS = {
+    "calculate_total_revenue": ("revenue", lambda acc: acc.result()),
+    "region_wise_sales": ("regions", lambda acc: acc.result()),
+    "top_selling_products": ("products", lambda acc, n=5: acc.top(n)),
+    "low_performing_products": ("products", lambda acc, threshold=10: acc.low(threshold)),
+    "date_range": ("dates", lambda acc: acc.result()),
+    "find_peak_sales_day": ("daily", lambda acc: acc.peak())
+}
+
+
+# (path, size, mtime_ns) -> content hash, so an unchanged file is only
+# stat'ed on repeat lookups
+_DIGESTS = LRUCache(64)
+
+
+def source_digest(filename):
+    """
+    Content hash of an input file, the source part of cache keys. The
+    file is hashed again only when its size or mtime changes.
+    """
+    st = os.stat(filename)
+    key = (os.path.abspath(filename), st.st_size, st.st_mtime_ns)
+
+    digest = _DIGESTS.get(key)
+    if digest is None:
+        digest = file_digest(filename).hex()
+        _DIGESTS.set(key, digest)
+    return digest
+
+
+class AggregateCache:
+    """
+    Computed aggregates keyed by (source digest, filters, metric,
+    params): an in-memory LRU of max_entries values, plus an optional
+    on-disk tier in directory (pickle files, least recently used ones
+    evicted once they exceed max_disk_bytes). The directory is written
+    only by this class (trusted local data).
+    stats counts memory hits, disk hits, region-partial hits, misses
+    and evictions.
+    """
+
+    def __init__(self, max_entries=128, directory=None, max_disk_bytes=64 * 1024 * 1024):
+        self.memory = LRUCache(max_entries)
+        self.directory = directory
+        self.max_disk_bytes = max_disk_bytes
+        self.stats = {"hits": 0, "disk_hits": 0, "partial_hits": 0, "misses": 0, "disk_evictions": 0}
+
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+    @staticmethod
+    def key(source, filters, metric, params=()):
+        return (source, tuple(filters), metric, tuple(params))
+
+    def _path(self, key):
+        name = hashlib.sha256(repr(key).encode("utf-8")).hexdigest()
+        return os.path.join(self.directory, name + ".pkl")
+
+    def _load(self, key):
+        path = self._path(key)
+        try:
+            with open(path, "rb") as f:
+                stored_key, value = pickle.load(f)
+        except (FileNotFoundError, EOFError, pickle.UnpicklingError, AttributeError, ImportError, ValueError):
+            return _NOT_CACHED
+        if stored_key != key:
+            return _NOT_CACHED
+
+        # The mtime doubles as the last-use time for eviction
+        os.utime(path)
+        return value
+
+    def _store(self, key, value):
+        with atomic_write(self._path(key)) as f:
+            pickle.dump((key, value), f, protocol=pickle.HIGHEST_PROTOCOL)
+        self._evict()
+
+    def _evict(self):
+        entries = []
+        for entry in os.scandir(self.directory):
+            if entry.name.endswith(".pkl"):
+                st = entry.stat()
+                entries.append((st.st_mtime_ns, st.st_size, entry.path))
+
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in sorted(entries):
+            if total <= self.max_disk_bytes:
+                break
+            os.remove(path)
+            total -= size
+            self.stats["disk_evictions"] += 1
+
+    def lookup(self, key):
+        """
+        Returns (value, tier) for key, tier being "memory" or "disk";
+        (None, None) if neither tier has it.
+        """
+        value = self.memory.get(key, _NOT_CACHED)
+        if value is not _NOT_CACHED:
+            self.stats["hits"] += 1
+            return value, "memory"
+
+        if self.directory:
+            value = self._load(key)
+            if value is not _NOT_CACHED:
+                self.stats["disk_hits"] += 1
+                self.memory.set(key, value)
+                return value, "disk"
+
+        self.stats["misses"] += 1
+        return None, None
+
+    def get(self, key):
+        return self.lookup(key)[0]
+
+    def put(self, key, value):
+        self.memory.set(key, value)
+        if self.directory:
+            self._store(key, value)
+
+    def aggregate(self, source, filters, metric, compute, params=()):
+        """
+        Returns the value cached for (source, filters, metric, params),
+        calling compute() and caching its result on a miss.
+        """
+        key = self.key(source, filters, metric, params)
+        value = self.get(key)
+        if value is None:
+            value = compute()
+            self.put(key, value)
+        return value
+
+    def clear(self):
+        self.memory.clear()
+        if self.directory:
+            for entry in os.scandir(self.directory):
+                if entry.name.endswith(".pkl"):
+                    os.remove(entry.path)
+
+
+def _region_partials(transactions, distinct="exact", rankings="exact"):
+    """
+    One pass over unfiltered transactions into a set of report
+    accumulators per (unstripped) Region value, i.e. per region filter.
+    """
+    partials = {}
+    active = {}
 
-    # Aggregate quantity and revenue per product
     for tx in transactions:
-        product = tx["ProductName"]
-        quantity = tx["Quantity"]
-        revenue = tx["Quantity"] * tx["UnitPrice"]
-
-        if product not in product_data:
-            product_data[product] = {
-                "quantity": 0,
-                "revenue": 0.0
-            }
+        region = tx.Region
+        accumulators = active.get(region)
+        if accumulators is None:
+            partials[region] = default_accumulators(distinct, rankings)
+            accumulators = active[region] = list(partials[region].values())
 
-        product_data[product]["quantity"] += quantity
-        product_data[product]["revenue"] += revenue
+        amount = tx.Quantity * tx.UnitPrice
+        for acc in accumulators:
+            acc.add(tx, amount)
 
-    # Filter products with quantity < threshold
-    low_products = []
-    for product, data in product_data.items():
-        if data["quantity"] < threshold:
-            low_products.append(
-                (product, data["quantity"], round(data["revenue"], 2))
-            )
+    return partials
+
+
+def region_partials(cache, filename, source=None, distinct="exact", rankings="exact"):
+    """
+    Per-region report accumulators for the unfiltered contents of
+    filename, computed once per source and cached.
+    """
+    from utils.file_handler import iter_sales_data
+
+    source = source or source_digest(filename)
+    return cache.aggregate(
+        source, (None, None, None), "region_partials",
+        lambda: _region_partials(iter_clean_transactions(iter_sales_data(filename)), distinct, rankings),
+        (distinct, rankings)
+    )
+
+
+def cached_accumulators(cache, filename, transactions, region=None, min_amount=None, max_amount=None,
+                        distinct="exact", rankings="exact", source=None):
+    """
+    Report accumulators for filename under the given filters, from the
+    cache when possible. A region-only filter is answered from the
+    per-region partials instead of aggregating the filtered rows;
+    otherwise transactions (the already filtered rows) are aggregated.
+    Returns (accumulators, origin) with origin "memory", "disk",
+    "region-partial" or "computed". Callers must not modify the result.
+    source is filename's source_digest, if the caller already has it.
+    """
+    source = source or source_digest(filename)
+    filters = (region, min_amount, max_amount)
+    key = cache.key(source, filters, "accumulators", (distinct, rankings))
+
+    accumulators, tier = cache.lookup(key)
+    if accumulators is not None:
+        return accumulators, tier
+
+    if region and not min_amount and not max_amount:
+        partials = region_partials(cache, filename, source, distinct, rankings)
+        accumulators = partials.get(region) or default_accumulators(distinct, rankings)
+        cache.stats["partial_hits"] += 1
+        origin = "region-partial"
+    else:
+        accumulators = aggregate_transactions(transactions, default_accumulators(distinct, rankings))
+        origin = "computed"
+
+    cache.put(key, accumulators)
+    return accumulators, origin
+
+
+def cached_metric(cache, filename, transactions, metric, region=None, min_amount=None, max_amount=None,
+                  source=None, **params):
+    """
+    Value of the metric function named metric (e.g. "region_wise_sales",
+    "top_selling_products" with n=...) for filename under the given
+    filters; transactions are the already filtered rows. Region-only
+    filters of PARTIAL_METRICS are answered from the per-region partials.
+    source is filename's source_digest, if the caller already has it.
+    """
+    source = source or source_digest(filename)
+    filters = (region, min_amount, max_amount)
+
+    if metric not in METRIC_FUNCTIONS:
+        raise ValueError(f"Unknown metric: {metric}")
 
-    # Sort by total quantity ascending
-    low_products.sort(key=lambda x: x[1])
+    def compute():
+        if region and not min_amount and not max_amount and metric in PARTIAL_METRICS:
+            name, value = PARTIAL_METRICS[metric]
+            accumulators = region_partials(cache, filename, source).get(region) or default_accumulators()
+            cache.stats["partial_hits"] += 1
+            return value(accumulators[name], **params)
+        return METRIC_FUNCTIONS[metric](transactions, **params)
 
-    return low_products
+    return cache.aggregate(source, filters, metric, compute, sorted(params.items()))
@@ -0,0 +1,298 @@
+"""
+Date-partitioned index over transactions.
+
+Transactions are bucketed into per-day partials (revenue, transaction
+count and customers, optionally the rows themselves) and each distinct
+"YYYY-MM-DD" string is parsed once into a date ordinal. Range queries,
+rolling windows and weekly/monthly rollups are answered from those
+partials through prefix sums, so repeated dashboard windows never
+rescan the rows.
+"""
+from bisect import bisect_left, bisect_right
+from datetime import date
+
+from utils.data_processor import Accumulator
+from utils.records import as_transaction
+
+
+def _ordinal(value):
+    if isinstance(value, date):
+        return value.toordinal()
+    return date.fromisoformat(value).toordinal()
+
+
+class DateIndex(Accumulator):
+    """
+    Per-day revenue, transaction counts and customers, fed as an
+    accumulator (aggregate_transactions, merge across chunks).
+    keep_rows=True also buckets the transactions by day for
+    transactions(start, end).
+
+    Partials are kept per Date string in first-seen order, so the
+    data_processor metric functions given an index (daily_sales_trend,
+    find_peak_sales_day, date_range) return exactly what a pass over the
+    rows returns. Each distinct string is parsed to a date ordinal once,
+    on the first range query; rows whose Date does not parse are left
+    out of the range queries and counted in unparsed.
+    Query bounds are inclusive and accept date objects or ISO strings.
+    """
+
+    def __init__(self, keep_rows=False):
+        self.keep_rows = keep_rows
+        # Date string -> [revenue, transaction count, customer set]
+        self.dates = {}
+        self.rows = {}
+        self._ordinals = {}
+        self._prefix = None
+
+    # =========================
+    # BUILDING
+    # =========================
+
+    def add(self, tx, amount):
+        data = self.dates.get(tx.Date)
+        if data is None:
+            data = self.dates[tx.Date] = [0.0, 0, set()]
+        data[0] += amount
+        data[1] += 1
+
+        customer = tx.CustomerID.strip()
+        if customer:
+            data[2].add(customer)
+
+        if self.keep_rows:
+            self.rows.setdefault(tx.Date, []).append(tx)
+        self._prefix = None
+
+    def merge(self, other):
+        for text, (revenue, count, customers) in other.dates.items():
+            data = self.dates.get(text)
+            if data is None:
+                data = self.dates[text] = [0.0, 0, type(customers)()]
+            data[0] += revenue
+            data[1] += count
+            if isinstance(customers, set):
+                data[2] |= customers
+            else:
+                # Counts from from_daily() cannot be deduplicated
+                data[2] += customers
+        for text, rows in other.rows.items():
+            self.rows.setdefault(text, []).extend(rows)
+        self._prefix = None
+
+    @classmethod
+    def from_daily(cls, daily):
+        """
+        Builds an index from daily_sales_trend() output (or any
+        {date: {"revenue", "transaction_count"}} mapping) without
+        touching the rows. Unique customers are carried over as counts
+        when present.
+        """
+        index = cls()
+        for text, data in daily.items():
+            index.dates[text] = [data["revenue"], data["transaction_count"], data.get("unique_customers", 0)]
+        return index
+
+    def result(self):
+        return self.daily()
+
+    # =========================
+    # PREFIX SUMS
+    # =========================
+
+    def _sums(self):
+        """
+        (sorted day ordinals, running revenue, running counts, {ordinal:
+        [revenue, count]}, {ordinal: [Date strings]}, unparsed rows),
+        rebuilt only after new rows arrive.
+        """
+        if self._prefix is None:
+            days = {}
+            texts = {}
+            unparsed = 0
+            for text, (revenue, count, _) in self.dates.items():
+                day = self._ordinals.get(text)
+                if day is None:
+                    try:
+                        day = _ordinal(text)
+                    except ValueError:
+                        day = False
+                    self._ordinals[text] = day
+                if day is False:
+                    unparsed += count
+                    continue
+
+                data = days.setdefault(day, [0.0, 0])
+                data[0] += revenue
+                data[1] += count
+                texts.setdefault(day, []).append(text)
+
+            ordinals = sorted(days)
+            running_revenue = [0.0]
+            running_counts = [0]
+            for day in ordinals:
+                running_revenue.append(running_revenue[-1] + days[day][0])
+                running_counts.append(running_counts[-1] + days[day][1])
+            self._prefix = (ordinals, running_revenue, running_counts, days, texts, unparsed)
+        return self._prefix
+
+    @property
+    def unparsed(self):
+        return self._sums()[5]
+
+    def _span(self, start, end):
+        ordinals = self._sums()[0]
+        lo = 0 if start is None else bisect_left(ordinals, _ordinal(start))
+        hi = len(ordinals) if end is None else bisect_right(ordinals, _ordinal(end))
+        return lo, max(lo, hi)
+
+    # =========================
+    # METRIC FUNCTIONS
+    # =========================
+
+    def date_range(self):
+        """
+        First and last Date string, compared as strings like the
+        report's date range.
+        """
+        if not self.dates:
+            return None, None
+        return min(self.dates), max(self.dates)
+
+    def daily_sales_trend(self):
+        result = {}
+        for text in sorted(self.dates):
+            if not text:
+                continue
+
+            revenue, count, customers = self.dates[text]
+            result[text] = {
+                "revenue": round(revenue, 2),
+                "transaction_count": count,
+                "unique_customers": customers if isinstance(customers, int) else len(customers)
+            }
+        return result
+
+    def find_peak_sales_day(self):
+        peak = max(self.dates, key=lambda text: self.dates[text][0])
+        revenue, count, _ = self.dates[peak]
+        return peak, round(revenue, 2), count
+
+    # =========================
+    # QUERIES
+    # =========================
+
+    def range_summary(self, start=None, end=None):
+        """
+        Revenue, transaction count and active days between start and end
+        (inclusive; None leaves that side open).
+        """
+        _, revenue, counts = self._sums()[:3]
+        lo, hi = self._span(start, end)
+        return {
+            "revenue": round(revenue[hi] - revenue[lo], 2),
+            "transaction_count": counts[hi] - counts[lo],
+            "active_days": hi - lo
+        }
+
+    def revenue(self, start=None, end=None):
+        return self.range_summary(start, end)["revenue"]
+
+    def month_to_date(self, as_of):
+        as_of = date.fromordinal(_ordinal(as_of))
+        return self.range_summary(as_of.replace(day=1), as_of)
+
+    def last_days(self, days, as_of):
+        """
+        Summary of the days-long window ending on as_of (inclusive).
+        """
+        end = _ordinal(as_of)
+        return self.range_summary(date.fromordinal(end - days + 1), date.fromordinal(end))
+
+    def daily(self, start=None, end=None):
+        ordinals, _, _, days = self._sums()[:4]
+        lo, hi = self._span(start, end)
+        result = {}
+        for day in ordinals[lo:hi]:
+            revenue, count = days[day]
+            result[date.fromordinal(day).isoformat()] = {
+                "revenue": round(revenue, 2),
+                "transaction_count": count
+            }
+        return result
+
+    def rolling(self, window=7, start=None, end=None):
+        """
+        Trailing window-day revenue and transaction count for every
+        calendar day between start and end (defaults: the indexed range).
+        Days without sales still get a value.
+        """
+        ordinals, revenue, counts = self._sums()[:3]
+        if not ordinals:
+            return {}
+
+        first = ordinals[0] if start is None else _ordinal(start)
+        last = ordinals[-1] if end is None else _ordinal(end)
+
+        result = {}
+        for day in range(first, last + 1):
+            lo = bisect_left(ordinals, day - window + 1)
+            hi = bisect_right(ordinals, day)
+            result[date.fromordinal(day).isoformat()] = {
+                "revenue": round(revenue[hi] - revenue[lo], 2),
+                "transaction_count": counts[hi] - counts[lo]
+            }
+        return result
+
+    def _rollup(self, key):
+        ordinals, _, _, days = self._sums()[:4]
+        result = {}
+        for day in ordinals:
+            revenue, count = days[day]
+            bucket = result.setdefault(key(date.fromordinal(day)), [0.0, 0])
+            bucket[0] += revenue
+            bucket[1] += count
+        return {
+            name: {"revenue": round(revenue, 2), "transaction_count": count}
+            for name, (revenue, count) in result.items()
+        }
+
+    def weekly(self):
+        """
+        ISO-week rollups ("2024-W49") computed from the daily partials.
+        """
+        def week(d):
+            year, number, _ = d.isocalendar()
+            return f"{year}-W{number:02d}"
+        return self._rollup(week)
+
+    def monthly(self):
+        """
+        Calendar-month rollups ("2024-12") computed from the daily partials.
+        """
+        return self._rollup(lambda d: f"{d.year}-{d.month:02d}")
+
+    def transactions(self, start=None, end=None):
+        """
+        Yields the bucketed transactions between start and end, in date
+        order (requires keep_rows=True).
+        """
+        if not self.keep_rows:
+            raise ValueError("DateIndex was built without keep_rows=True")
+
+        ordinals, _, _, _, texts = self._sums()[:5]
+        lo, hi = self._span(start, end)
+        for day in ordinals[lo:hi]:
+            for text in texts[day]:
+                yield from self.rows.get(text, ())
+
+
+def build_date_index(transactions, keep_rows=False):
+    """
+    Builds a DateIndex in one pass over the transactions.
+    """
+    index = DateIndex(keep_rows)
+    for tx in transactions:
+        tx = as_transaction(tx)
+        index.add(tx, tx.Quantity * tx.UnitPrice)
+    return index
@@ -1,30 +1,270 @@
+import codecs
+import mmap
+import os
+import time
+
+from utils.data_processor import iter_transactions, parse_transactions
+from utils.records import TRANSACTION_FIELDS, Transaction
+from utils.parse_cache import PARSE_CACHE_STATS, load_columns, load_parsed, save_parsed
+
+ENCODINGS = ["utf-8", "latin-1", "cp1252"]
+CHUNK_SIZE = 1024 * 1024
+SAMPLE_SIZE = 64 * 1024
+
+
+def detect_encoding(filename, sample_size=SAMPLE_SIZE):
+    """
+    Detects the file encoding once from a leading sample of the file.
+    Returns the first encoding from ENCODINGS that decodes the sample.
+    """
+    with open(filename, "rb") as file:
+        sample = file.read(sample_size)
+
+    for enc in ENCODINGS:
+        try:
+            # Incremental decode so a multi-byte character cut at the
+            # sample boundary is not mistaken for invalid data
+            codecs.getincrementaldecoder(enc)().decode(sample, final=False)
+            return enc
+        except UnicodeDecodeError:
+            continue
+
+    return None
+
+
+def decode_line(raw, encodings):
+    """
+    Decodes one raw line with the first encoding that accepts it.
+    """
+    for enc in encodings:
+        try:
+            return raw.decode(enc)
+        except UnicodeDecodeError:
+            continue
+    return None
+
+
+def iter_sales_data(filename, chunk_size=CHUNK_SIZE):
+    """
+    Lazily yields raw data lines (excluding header and empty lines),
+    reading the file in fixed-size binary chunks so memory stays flat.
+    Lines that do not decode with the detected encoding fall back to
+    the remaining encodings instead of re-reading the whole file.
+    """
+    try:
+        encoding = detect_encoding(filename)
+        file = open(filename, "rb")
+    except FileNotFoundError:
+        print("Error: File not found.")
+        return
+
+    if encoding is None:
+        file.close()
+        print("Error: Unable to read file with supported encodings.")
+        return
+
+    encodings = [encoding] + [enc for enc in ENCODINGS if enc != encoding]
+
+    with file:
+        header_skipped = False
+        pending = b""
+
+        while True:
+            chunk = file.read(chunk_size)
+            if not chunk:
+                break
+
+            # b"\n" never appears inside a multi-byte character for the
+            # supported encodings, so splitting raw bytes is safe
+            raw_lines = (pending + chunk).split(b"\n")
+            pending = raw_lines.pop()
+
+            for raw in raw_lines:
+                if not header_skipped:
+                    header_skipped = True
+                    continue
+
+                line = decode_line(raw, encodings)
+                if line is None:
+                    continue
+
+                line = line.strip()
+                if line:
+                    yield line
+
+        if pending and header_skipped:
+            line = decode_line(pending, encodings)
+            if line:
+                line = line.strip()
+                if line:
+                    yield line
+
+
+def iter_sales_records(filename, chunk_size=CHUNK_SIZE):
+    """
+    Streams parsed Transaction records straight from the file
+    without materializing the raw lines or the parsed list.
+    """
+    return iter_transactions(iter_sales_data(filename, chunk_size))
+
+
+MMAP_BLOCK_SIZE = 1024 * 1024
+
+
+def _mmap_blocks(buf, start, size, block_size):
+    """
+    Yields raw byte blocks of about block_size, each ending on a line
+    boundary.
+    """
+    pos = start
+    while pos < size:
+        end = min(pos + block_size, size)
+        if end < size:
+            newline = buf.find(b"\n", end)
+            end = size if newline == -1 else newline + 1
+        yield buf[pos:end]
+        pos = end
+
+
+def iter_mmap_records(filename, block_size=MMAP_BLOCK_SIZE):
+    """
+    Streams parsed Transaction records from a memory-mapped file.
+    Line-aligned blocks are sliced from the mapping and decoded in one
+    call each (per-line fallback only for blocks that fail to decode),
+    and categorical fields are interned on first sight so every row
+    shares one string object per distinct Date/ProductID/ProductName/
+    CustomerID/Region. Yields the same records as iter_sales_records.
+    """
+    try:
+        encoding = detect_encoding(filename)
+        file = open(filename, "rb")
+    except FileNotFoundError:
+        print("Error: File not found.")
+        return
+
+    encodings = [encoding] + [enc for enc in ENCODINGS if enc != encoding]
+
+    # Categorical value -> shared str, filled on first sight
+    names = {}
+    intern_date = {}.setdefault
+    intern_product_id = {}.setdefault
+    intern_customer = {}.setdefault
+    intern_region = {}.setdefault
+
+    with file:
+        size = os.fstat(file.fileno()).st_size
+        if size == 0:
+            return
+
+        with mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as buf:
+            # Skip header
+            start = buf.find(b"\n") + 1
+            if start == 0:
+                return
+
+            for block in _mmap_blocks(buf, start, size, block_size):
+                try:
+                    lines = block.decode(encoding).split("\n")
+                except UnicodeDecodeError:
+                    lines = [decode_line(raw, encodings) or "" for raw in block.split(b"\n")]
+
+                for line in lines:
+                    parts = line.strip().split("|")
+                    if len(parts) != 8:
+                        continue
+
+                    transaction_id, date, product_id, name, quantity, unit_price, customer, region = parts
+
+                    try:
+                        quantity = int(quantity.replace(",", ""))
+                        unit_price = float(unit_price.replace(",", ""))
+                    except ValueError:
+                        continue
+
+                    cleaned = names.get(name)
+                    if cleaned is None:
+                        cleaned = names[name] = name.replace(",", "")
+
+                    yield Transaction(
+                        transaction_id,
+                        intern_date(date, date),
+                        intern_product_id(product_id, product_id),
+                        cleaned,
+                        quantity,
+                        unit_price,
+                        intern_customer(customer, customer),
+                        intern_region(region, region)
+                    )
+
+
 def read_sales_data(filename):
     """
     Reads sales data from file handling encoding issues.
     Returns list of raw data lines (excluding header and empty lines).
     """
+    return list(iter_sales_data(filename))
 
-    encodings = ["utf-8", "latin-1", "cp1252"]
 
-    for enc in encodings:
+def _parse_and_cache(filename, use_cache, cache_file):
+    raw_lines = read_sales_data(filename)
+    rejections = {}
+    transactions = parse_transactions(raw_lines, rejections)
+
+    if use_cache and os.path.exists(filename):
         try:
-            with open(filename, "r", encoding=enc) as file:
-                lines = file.readlines()
+            save_parsed(filename, transactions, len(raw_lines), cache_file, rejections=rejections)
+        except (OSError, OverflowError) as e:
+            print(f"Warning: could not write parse cache ({e})")
 
-                # Remove header and empty lines
-                data_lines = []
-                for line in lines[1:]:
-                    line = line.strip()
-                    if line:
-                        data_lines.append(line)
+    return transactions, len(raw_lines), rejections
 
-                return data_lines
 
-        except FileNotFoundError:
-            print("Error: File not found.")
-            return []
-        except UnicodeDecodeError:
-            continue
+def read_sales_records(filename, use_cache=True, cache_file=None):
+    """
+    Returns parsed Transaction records for filename, the same list
+    as parse_transactions(read_sales_data(filename)).
+    With use_cache, an up-to-date binary parse cache is loaded instead
+    of re-parsing, and a missing or stale one is rebuilt.
+    PARSE_CACHE_STATS records whether the cache was hit and the lines
+    dropped per parse rule.
+    """
+    start = time.perf_counter()
+    cached = load_parsed(filename, cache_file) if use_cache else None
+
+    if cached is not None:
+        transactions, lines, rejections = cached
+    else:
+        transactions, lines, rejections = _parse_and_cache(filename, use_cache, cache_file)
+
+    PARSE_CACHE_STATS.update({
+        "hit": cached is not None,
+        "lines": lines,
+        "seconds": round(time.perf_counter() - start, 6),
+        "rejections": rejections
+    })
+    return transactions
+
+
+def read_sales_columns(filename, use_cache=True, cache_file=None):
+    """
+    Like read_sales_records, but returns the parsed rows as columns
+    ({field: list}) so data_processor.clean_columns can validate them
+    before any record is built. A cache hit skips building records
+    entirely; a miss parses the file and rebuilds the cache.
+    """
+    start = time.perf_counter()
+    cached = load_columns(filename, cache_file) if use_cache else None
+
+    if cached is not None:
+        columns, lines, rejections = cached
+    else:
+        transactions, lines, rejections = _parse_and_cache(filename, use_cache, cache_file)
+        columns = {name: [getattr(tx, name) for tx in transactions] for name in TRANSACTION_FIELDS}
 
-    print("Error: Unable to read file with supported encodings.")
-    return []
+    PARSE_CACHE_STATS.update({
+        "hit": cached is not None,
+        "lines": lines,
+        "seconds": round(time.perf_counter() - start, 6),
+        "rejections": rejections
+    })
+    return columns
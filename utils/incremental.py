@@ -0,0 +1,212 @@
+"""
+Incremental analytics for append-only sales files.
+
+The report accumulators, validation counters and the byte offset of the
+processed input are persisted between runs. If the file still starts
+with the same bytes, only the appended tail is parsed and folded into
+the saved state; otherwise the state is rebuilt from scratch.
+"""
+import hashlib
+import os
+import pickle
+
+from utils.file_handler import ENCODINGS, detect_encoding, decode_line
+from utils.data_processor import (
+    iter_clean_transactions,
+    aggregate_transactions,
+    default_accumulators
+)
+from utils.output_writer import atomic_write
+from utils.validation import empty_summary, merge_summary
+
+
+STATE_FILE = "data/sales_state.pkl"
+STATE_VERSION = 6
+CHUNK_SIZE = 1024 * 1024
+
+
+def _prefix_digest(filename, end, digest=None, start=0):
+    """
+    Feeds bytes [start, end) of filename into digest (a new SHA-256 by
+    default) and returns it. The fingerprint of the processed prefix
+    [0, offset) is the hex digest of all of it, so an edit anywhere in
+    the prefix is detected; a digest checked against the saved
+    fingerprint is extended over the new tail instead of re-reading
+    the prefix.
+    """
+    if digest is None:
+        digest = hashlib.sha256()
+
+    with open(filename, "rb") as f:
+        f.seek(start)
+        remaining = end - start
+        while remaining > 0:
+            chunk = f.read(min(remaining, CHUNK_SIZE))
+            if not chunk:
+                break
+            digest.update(chunk)
+            remaining -= len(chunk)
+
+    return digest
+
+
+def load_state(state_file=STATE_FILE):
+    """
+    Loads the persisted state, or None if missing or incompatible.
+    The state file is written only by this module (trusted local data).
+    """
+    try:
+        with open(state_file, "rb") as f:
+            state = pickle.load(f)
+    except (FileNotFoundError, EOFError, pickle.UnpicklingError, AttributeError, ImportError):
+        return None
+
+    if not isinstance(state, dict) or state.get("version") != STATE_VERSION:
+        return None
+
+    return state
+
+
+def save_state(state, state_file=STATE_FILE):
+    directory = os.path.dirname(state_file) or "."
+    os.makedirs(directory, exist_ok=True)
+
+    with atomic_write(state_file) as f:
+        pickle.dump(state, f, protocol=pickle.HIGHEST_PROTOCOL)
+
+
+def _iter_tail_lines(filename, offset, end, encodings, progress):
+    """
+    Yields decoded lines starting at offset, stopping at the first line
+    boundary at or past end. Only newline-terminated lines are yielded:
+    progress["offset"] tracks the end of the last complete line, so a
+    row caught mid-append is re-read from its start next time and a
+    concurrently growing file is never double counted.
+    progress["pending"] is set to the unterminated last line (stripped,
+    or None) for callers that count it in the current run only.
+    """
+    progress["pending"] = None
+
+    with open(filename, "rb") as f:
+        f.seek(offset)
+        position = offset
+
+        # First run: skip the header line, once it is complete
+        if offset == 0:
+            header = f.readline()
+            if not header.endswith(b"\n"):
+                return
+            position += len(header)
+            progress["offset"] = position
+
+        while position < end:
+            raw = f.readline()
+            if not raw:
+                break
+            if not raw.endswith(b"\n"):
+                line = decode_line(raw, encodings)
+                if line is not None and line.strip():
+                    progress["pending"] = line.strip()
+                break
+
+            position += len(raw)
+            progress["offset"] = position
+
+            line = decode_line(raw, encodings)
+            if line is None:
+                continue
+
+            line = line.strip()
+            if line:
+                yield line
+
+        progress["offset"] = position
+
+
+def incremental_aggregate(filename, state_file=STATE_FILE, region=None, min_amount=None,
+                          max_amount=None, distinct="exact", rankings="exact", quarantine=None):
+    """
+    Brings the persisted aggregates up to date with filename.
+    Returns (accumulators, summary, info); info["mode"] is "full",
+    "incremental" or "unchanged" and info["new_bytes"] is the size of
+    the tail that was processed.
+    Only newline-terminated lines are saved in the state. An
+    unterminated last line (a row still being written, or a file without
+    a final newline) is counted in the returned results only and is
+    re-read on the next run; info["pending"] says whether there was one.
+    Rejected lines among those parsed go to quarantine, if given.
+    """
+    size = os.path.getsize(filename)
+    filters = (region, min_amount, max_amount)
+
+    state = load_state(state_file)
+    prefix = None
+    if (
+        state is not None
+        and state["source"] == os.path.abspath(filename)
+        and state["filters"] == filters
+        and state["distinct"] == distinct
+        and state["rankings"] == rankings
+        and state["offset"] <= size
+    ):
+        prefix = _prefix_digest(filename, state["offset"])
+    reusable = prefix is not None and prefix.hexdigest() == state["fingerprint"]
+
+    if reusable:
+        accumulators = state["accumulators"]
+        summary = state["summary"]
+        offset = state["offset"]
+        mode = "incremental" if size > offset else "unchanged"
+    else:
+        accumulators = default_accumulators(distinct, rankings)
+        summary = empty_summary()
+        offset = 0
+        mode = "full"
+        prefix = None
+
+    if size > offset or mode == "full":
+        encoding = detect_encoding(filename)
+        encodings = [encoding] + [enc for enc in ENCODINGS if enc != encoding]
+
+        tail_summary = {}
+        progress = {"offset": offset}
+        valid = iter_clean_transactions(
+            _iter_tail_lines(filename, offset, size, encodings, progress),
+            tail_summary, region, min_amount, max_amount, quarantine
+        )
+        aggregate_transactions(valid, accumulators)
+
+        merge_summary(summary, tail_summary)
+        pending = progress["pending"]
+
+        save_state({
+            "version": STATE_VERSION,
+            "source": os.path.abspath(filename),
+            "filters": filters,
+            "distinct": distinct,
+            "rankings": rankings,
+            "offset": progress["offset"],
+            "fingerprint": _prefix_digest(filename, progress["offset"], prefix, offset).hexdigest(),
+            "summary": summary,
+            "accumulators": accumulators
+        }, state_file)
+
+        if pending is not None:
+            # Counted on copies so the saved state stays at the last
+            # complete line
+            accumulators = pickle.loads(pickle.dumps(accumulators, pickle.HIGHEST_PROTOCOL))
+            summary = merge_summary(empty_summary(), summary)
+            pending_summary = {}
+            aggregate_transactions(
+                iter_clean_transactions([pending], pending_summary, region, min_amount, max_amount, quarantine),
+                accumulators
+            )
+            merge_summary(summary, pending_summary)
+    else:
+        pending = None
+
+    return accumulators, summary, {
+        "mode": mode,
+        "new_bytes": max(size - offset, 0),
+        "pending": pending is not None
+    }
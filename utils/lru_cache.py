@@ -0,0 +1,67 @@
+"""
+Small thread-safe LRU cache with optional TTL expiry and hit/miss stats.
+"""
+import threading
+import time
+from collections import OrderedDict
+
+
+_MISSING = object()
+
+
+class LRUCache:
+    """
+    Least-recently-used cache holding at most maxsize entries.
+    Entries older than ttl seconds (if given) are treated as missing.
+    """
+
+    def __init__(self, maxsize=1024, ttl=None):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key, default=None):
+        with self._lock:
+            entry = self._data.get(key, _MISSING)
+
+            if entry is not _MISSING and self.ttl is not None:
+                if time.monotonic() - entry[1] > self.ttl:
+                    del self._data[key]
+                    entry = _MISSING
+
+            if entry is _MISSING:
+                self.misses += 1
+                return default
+
+            self._data.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+
+    def set(self, key, value):
+        with self._lock:
+            self._data[key] = (value, time.monotonic())
+            self._data.move_to_end(key)
+
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def __len__(self):
+        return len(self._data)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+            self.hits = 0
+            self.misses = 0
+
+    def stats(self):
+        total = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "size": len(self._data),
+            "hit_rate": round(self.hits / total, 4) if total else 0.0
+        }
@@ -0,0 +1,140 @@
+"""
+Pipeline instrumentation: per-stage timing, counters and optional
+cProfile / tracemalloc capture, exported as JSON or Prometheus text.
+"""
+import cProfile
+import io
+import json
+import pstats
+import time
+import tracemalloc
+from contextlib import contextmanager
+
+
+PROFILE_TOP = 15
+METRIC_PREFIX = "sales_pipeline"
+
+
+class PipelineMetrics:
+    """
+    Collects per-stage timings and named counters for one run.
+    profile=True captures the top cProfile entries of every stage;
+    trace_memory=True records each stage's tracemalloc peak.
+    """
+
+    def __init__(self, profile=False, trace_memory=False):
+        self.profile = profile
+        self.trace_memory = trace_memory
+        self.stages = {}
+        self.counters = {}
+        self.error = None
+        self._started = time.time()
+
+    @contextmanager
+    def stage(self, name):
+        """
+        Times the enclosed block as stage `name`. A failing stage is
+        recorded with its error before the exception propagates.
+        """
+        stats = {"seconds": None, "status": "ok"}
+        self.stages[name] = stats
+
+        profiler = None
+        if self.profile:
+            profiler = cProfile.Profile()
+
+        tracing = self.trace_memory and not tracemalloc.is_tracing()
+        if tracing:
+            tracemalloc.start()
+        elif self.trace_memory:
+            tracemalloc.reset_peak()
+
+        start = time.perf_counter()
+        if profiler:
+            profiler.enable()
+
+        try:
+            yield stats
+        except BaseException as e:
+            stats["status"] = "error"
+            self.error = {"stage": name, "type": type(e).__name__, "message": str(e)}
+            raise
+        finally:
+            if profiler:
+                profiler.disable()
+            stats["seconds"] = round(time.perf_counter() - start, 6)
+
+            if self.trace_memory:
+                _, peak = tracemalloc.get_traced_memory()
+                stats["peak_kib"] = round(peak / 1024, 1)
+                if tracing:
+                    tracemalloc.stop()
+
+            if profiler:
+                out = io.StringIO()
+                pstats.Stats(profiler, stream=out).sort_stats("cumulative").print_stats(PROFILE_TOP)
+                stats["profile"] = out.getvalue()
+
+    def count(self, name, value=1):
+        self.counters[name] = self.counters.get(name, 0) + value
+
+    def set(self, name, value):
+        self.counters[name] = value
+
+    def counted(self, iterable, name):
+        """
+        Passes items through and sets counter `name` to the number seen
+        once the iteration finishes (re-iterating does not double count).
+        """
+        seen = 0
+        for item in iterable:
+            seen += 1
+            yield item
+        self.counters[name] = seen
+
+    def to_dict(self):
+        return {
+            "started_at": self._started,
+            "total_seconds": round(sum(s["seconds"] or 0 for s in self.stages.values()), 6),
+            "stages": self.stages,
+            "counters": self.counters,
+            "error": self.error
+        }
+
+    def to_prometheus(self):
+        lines = [
+            f"# HELP {METRIC_PREFIX}_stage_seconds Wall-clock seconds spent in each pipeline stage",
+            f"# TYPE {METRIC_PREFIX}_stage_seconds gauge"
+        ]
+        for name, stats in self.stages.items():
+            lines.append(f'{METRIC_PREFIX}_stage_seconds{{stage="{name}"}} {stats["seconds"]}')
+
+        if self.trace_memory:
+            lines.append(f"# HELP {METRIC_PREFIX}_stage_peak_bytes Peak traced allocation per stage")
+            lines.append(f"# TYPE {METRIC_PREFIX}_stage_peak_bytes gauge")
+            for name, stats in self.stages.items():
+                if "peak_kib" in stats:
+                    lines.append(
+                        f'{METRIC_PREFIX}_stage_peak_bytes{{stage="{name}"}} {int(stats["peak_kib"] * 1024)}'
+                    )
+
+        for name, value in self.counters.items():
+            if isinstance(value, bool) or not isinstance(value, (int, float)):
+                continue
+            lines.append(f"# TYPE {METRIC_PREFIX}_{name} gauge")
+            lines.append(f"{METRIC_PREFIX}_{name} {value}")
+
+        lines.append(f"# TYPE {METRIC_PREFIX}_success gauge")
+        lines.append(f"{METRIC_PREFIX}_success {0 if self.error else 1}")
+        return "\n".join(lines) + "\n"
+
+    def export(self, filename):
+        """
+        Writes the metrics to filename: Prometheus text format for
+        .prom files, JSON otherwise.
+        """
+        with open(filename, "w") as f:
+            if filename.endswith(".prom"):
+                f.write(self.to_prometheus())
+            else:
+                json.dump(self.to_dict(), f, indent=2)
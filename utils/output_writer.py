@@ -0,0 +1,198 @@
+"""
+Streaming, buffered writers for row-oriented output files.
+
+Rows are consumed from any iterable (a list or a lazy generator), turned
+into text in batches and written with one call per batch. Supported
+formats are pipe-delimited text, CSV, JSON Lines and a JSON array,
+optionally gzip or zstd compressed, written to a temp file and renamed
+into place.
+"""
+import csv
+import gzip
+import io
+import json
+import os
+import stat
+from contextlib import contextmanager
+from itertools import islice
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+
+FORMATS = ("pipe", "csv", "jsonl", "json")
+COMPRESSIONS = ("gzip", "zstd")
+BATCH_SIZE = 8192
+
+_FORMAT_EXTENSIONS = {".txt": "pipe", ".psv": "pipe", ".csv": "csv", ".jsonl": "jsonl", ".json": "json"}
+_COMPRESSION_EXTENSIONS = {".gz": "gzip", ".zst": "zstd"}
+
+
+def _create_temp(directory):
+    """
+    Creates an empty temp file in directory. Opened with mode 0o666 like
+    any new file, so it gets the umask default (mkstemp's are 0600)
+    without querying the process-wide umask.
+    """
+    flags = os.O_WRONLY | os.O_CREAT | os.O_EXCL | getattr(os, "O_BINARY", 0)
+    while True:
+        path = os.path.join(directory, f"tmp{os.urandom(6).hex()}.tmp")
+        try:
+            return os.open(path, flags, 0o666), path
+        except FileExistsError:
+            continue
+
+
+@contextmanager
+def atomic_write(filename, mode="wb", encoding=None):
+    """
+    Opens a temp file in filename's directory for writing and renames it
+    over filename once the block completes, so readers never see a
+    half-written file; on error the temp file is removed and filename is
+    left as it was. The result keeps filename's permissions (a new file
+    gets the umask default, not mkstemp's 0600).
+    """
+    directory = os.path.dirname(filename) or "."
+    fd, tmp_path = _create_temp(directory)
+    try:
+        with os.fdopen(fd, mode, encoding=encoding) as f:
+            yield f
+        try:
+            os.chmod(tmp_path, stat.S_IMODE(os.stat(filename).st_mode))
+        except FileNotFoundError:
+            pass
+        os.replace(tmp_path, filename)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+
+def detect_format(filename):
+    """
+    Infers (format, compression) from the file extension, e.g.
+    "out.csv.gz" -> ("csv", "gzip"). Unknown extensions are pipe text.
+    """
+    root, ext = os.path.splitext(filename.lower())
+    compression = _COMPRESSION_EXTENSIONS.get(ext)
+    if compression:
+        ext = os.path.splitext(root)[1]
+    return _FORMAT_EXTENSIONS.get(ext, "pipe"), compression
+
+
+def _open_binary(raw, compression):
+    if compression == "gzip":
+        return gzip.GzipFile(fileobj=raw, mode="wb", compresslevel=6)
+    if compression == "zstd":
+        if zstandard is None:
+            raise ImportError("zstd output requires zstandard (pip install zstandard)")
+        return zstandard.ZstdCompressor().stream_writer(raw, closefd=False)
+    return raw
+
+
+def _pipe_header(headers):
+    return "|".join(headers) + "\n"
+
+
+def _row_values(row, headers):
+    """
+    Field values of row in header order. Records whose FIELDS match the
+    headers (utils.records) hand them over in one call.
+    """
+    if getattr(row, "FIELDS", None) == headers:
+        return row.values()
+    return map(row.get, headers)
+
+
+def _pipe_batch(rows, headers):
+    return "".join([
+        "|".join(["" if value is None else str(value) for value in _row_values(row, headers)]) + "\n"
+        for row in rows
+    ])
+
+
+def _jsonl_header(headers):
+    return ""
+
+
+def _jsonl_batch(rows, headers, _encode=json.JSONEncoder(ensure_ascii=False).encode):
+    return "".join([_encode(dict(zip(headers, _row_values(row, headers)))) + "\n" for row in rows])
+
+
+def _json_header(headers):
+    return "[\n"
+
+
+def _json_batch(rows, headers, _encode=json.JSONEncoder(ensure_ascii=False).encode):
+    return ",\n".join([_encode(dict(zip(headers, _row_values(row, headers)))) for row in rows])
+
+
+def _csv_text(records):
+    buffer = io.StringIO()
+    csv.writer(buffer, lineterminator="\n").writerows(records)
+    return buffer.getvalue()
+
+
+def _csv_header(headers):
+    return _csv_text([headers])
+
+
+def _csv_batch(rows, headers):
+    return _csv_text(["" if value is None else value for value in _row_values(row, headers)] for row in rows)
+
+
+# format -> (header text, text for one batch of rows)
+_FORMATTERS = {
+    "pipe": (_pipe_header, _pipe_batch),
+    "csv": (_csv_header, _csv_batch),
+    "jsonl": (_jsonl_header, _jsonl_batch),
+    "json": (_json_header, _json_batch)
+}
+
+# format -> (text between batches, text after the last row)
+_FRAMING = {"json": (",\n", "\n]\n")}
+
+
+def write_rows(rows, headers, filename, fmt=None, compression=None, atomic=True, batch_size=BATCH_SIZE):
+    """
+    Streams dict rows to filename, one column per header (missing and
+    None values become empty fields, or null in JSON Lines and JSON).
+    fmt / compression default to what the extension implies.
+    With atomic=True the file is written to a temp file in the same
+    directory and renamed over filename only after a complete write.
+    Returns the number of data rows written.
+    """
+    detected_fmt, detected_compression = detect_format(filename)
+    fmt = fmt or detected_fmt
+    compression = compression or detected_compression
+
+    if fmt not in FORMATS:
+        raise ValueError(f"Unknown output format '{fmt}' (expected one of {', '.join(FORMATS)})")
+    if compression is not None and compression not in COMPRESSIONS:
+        raise ValueError(f"Unknown compression '{compression}' (expected one of {', '.join(COMPRESSIONS)})")
+
+    header, format_batch = _FORMATTERS[fmt]
+    separator, footer = _FRAMING.get(fmt, ("", ""))
+    headers = tuple(headers)
+    rows = iter(rows)
+    count = 0
+
+    with atomic_write(filename) if atomic else open(filename, "wb") as raw:
+        stream = _open_binary(raw, compression)
+        with io.TextIOWrapper(stream, encoding="utf-8", newline="") as out:
+            out.write(header(headers))
+            while True:
+                batch = list(islice(rows, batch_size))
+                if not batch:
+                    break
+                if count:
+                    out.write(separator)
+                out.write(format_batch(batch, headers))
+                count += len(batch)
+            out.write(footer)
+        # For compressed output, closing the wrapper finished the
+        # compressor stream (trailer included); raw closes here
+
+    return count
@@ -0,0 +1,146 @@
+"""
+Multi-core parsing, validation and aggregation of large sales files.
+
+The file is split into byte ranges aligned on newline boundaries; each
+worker process parses and validates its range and returns only partial
+accumulators plus validation counters, which are merged in file order.
+Rejected lines are quarantined per range and copied over in file order.
+"""
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+from utils.file_handler import ENCODINGS, detect_encoding, decode_line
+from utils.data_processor import (
+    iter_clean_transactions,
+    aggregate_transactions,
+    default_accumulators,
+    merge_accumulators
+)
+from utils.validation import QuarantineWriter, empty_summary, merge_summary
+
+
+def split_file(filename, n_chunks):
+    """
+    Splits the file (after its header line) into up to n_chunks byte
+    ranges, each starting at the beginning of a line.
+    Returns: list of (start, end) offsets
+    """
+    size = os.path.getsize(filename)
+
+    with open(filename, "rb") as f:
+        f.readline()
+        data_start = f.tell()
+
+        bounds = [data_start]
+        step = max((size - data_start) // max(n_chunks, 1), 1)
+
+        for i in range(1, n_chunks):
+            target = data_start + i * step
+            if target <= bounds[-1] or target >= size:
+                continue
+            f.seek(target - 1)
+            f.readline()
+            boundary = f.tell()
+            if bounds[-1] < boundary < size:
+                bounds.append(boundary)
+
+    bounds.append(size)
+    return [(bounds[i], bounds[i + 1]) for i in range(len(bounds) - 1) if bounds[i] < bounds[i + 1]]
+
+
+def _iter_range_lines(filename, start, end, encodings):
+    with open(filename, "rb") as f:
+        f.seek(start)
+        position = start
+
+        while position < end:
+            raw = f.readline()
+            if not raw:
+                break
+            position += len(raw)
+
+            line = decode_line(raw, encodings)
+            if line is None:
+                continue
+
+            line = line.strip()
+            if line:
+                yield line
+
+
+def _process_chunk(filename, start, end, encodings, region, min_amount, max_amount, rankings, distinct,
+                   quarantine_path=None):
+    summary = {}
+    quarantine = QuarantineWriter(quarantine_path) if quarantine_path else None
+    try:
+        valid = iter_clean_transactions(
+            _iter_range_lines(filename, start, end, encodings),
+            summary, region, min_amount, max_amount, quarantine
+        )
+        accumulators = aggregate_transactions(valid, default_accumulators(distinct, rankings))
+    finally:
+        if quarantine is not None:
+            quarantine.close()
+    return accumulators, summary
+
+
+def _copy_quarantine(path, quarantine):
+    with open(path, encoding="utf-8") as f:
+        for entry in f:
+            rule, line = entry.rstrip("\n").split("\t", 1)
+            quarantine.write(rule, line)
+    os.remove(path)
+
+
+def parallel_aggregate(filename, workers=None, region=None, min_amount=None, max_amount=None,
+                       rankings="exact", distinct="exact", quarantine=None):
+    """
+    Parses, validates and aggregates the file across worker processes.
+    Returns (accumulators, summary) where accumulators matches
+    default_accumulators(distinct, rankings) and summary matches
+    validate_and_filter. HyperLogLog sketches from the workers merge
+    losslessly. Rejected lines go to quarantine (a QuarantineWriter),
+    if given, in file order.
+
+    Float totals are summed per chunk and then merged, so they can differ
+    from a sequential run in the last bits (not after rounding in practice).
+    """
+    workers = workers or os.cpu_count() or 1
+
+    encoding = detect_encoding(filename)
+    encodings = [encoding] + [enc for enc in ENCODINGS if enc != encoding]
+
+    # A few chunks per worker keeps cores busy when row costs are uneven
+    ranges = split_file(filename, workers * 4)
+
+    accumulators = default_accumulators(distinct, rankings)
+    summary = empty_summary()
+
+    parts = [
+        f"{quarantine.path}.{i}.part" if quarantine is not None else None
+        for i in range(len(ranges))
+    ]
+
+    try:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            futures = [
+                pool.submit(
+                    _process_chunk, filename, start, end, encodings,
+                    region, min_amount, max_amount, rankings, distinct, part
+                )
+                for (start, end), part in zip(ranges, parts)
+            ]
+
+            # Merge in file order so first-appearance ordering is preserved
+            for future, part in zip(futures, parts):
+                partial, partial_summary = future.result()
+                merge_accumulators(accumulators, partial)
+                merge_summary(summary, partial_summary)
+                if part is not None:
+                    _copy_quarantine(part, quarantine)
+    finally:
+        for part in parts:
+            if part is not None and os.path.exists(part):
+                os.remove(part)
+
+    return accumulators, summary
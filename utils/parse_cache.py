@@ -0,0 +1,279 @@
+"""
+Binary columnar cache of parsed transactions.
+
+parse_transactions() output is stored next to the source file, keyed on
+the source's size, mtime and SHA-256, so unchanged inputs load typed
+columns instead of being re-parsed. Uses an Arrow IPC file when pyarrow
+is installed, otherwise a native format: a struct header followed by
+dictionary-encoded string columns (length-prefixed categories) and
+array('q'/'d') numeric columns.
+"""
+import hashlib
+import os
+import struct
+import sys
+from array import array
+from itertools import accumulate
+
+from utils.output_writer import atomic_write
+from utils.records import Transaction, paused_gc
+from utils.validation import PARSE_RULES
+
+try:
+    import pyarrow as pa
+except ImportError:
+    pa = None
+
+
+PARSE_CACHE_SUFFIX = ".parsed"
+CACHE_VERSION = 3
+
+NATIVE_MAGIC = b"SALESCOL"
+ARROW_MAGIC = b"ARROW1"
+# magic, version, rows, source lines, source size, source mtime_ns, sha256,
+# then the lines dropped by each parse rule (PARSE_RULES order)
+HEADER = struct.Struct("<8sHQQQq32sQQ")
+LENGTH = struct.Struct("<Q")
+
+STRING_COLUMNS = ["TransactionID", "Date", "ProductID", "ProductName", "CustomerID", "Region"]
+COLUMNS = ["TransactionID", "Date", "ProductID", "ProductName", "Quantity", "UnitPrice", "CustomerID", "Region"]
+
+# Outcome of the last file_handler.read_sales_records() call
+PARSE_CACHE_STATS = {"hit": False, "lines": 0, "seconds": 0.0, "rejections": {}}
+
+
+def cache_path(filename):
+    return filename + PARSE_CACHE_SUFFIX
+
+
+def file_digest(filename, chunk_size=1024 * 1024):
+    digest = hashlib.sha256()
+    with open(filename, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            digest.update(chunk)
+    return digest.digest()
+
+
+def _source_key(filename):
+    st = os.stat(filename)
+    return st.st_size, st.st_mtime_ns
+
+
+def _is_current(filename, size, mtime_ns, digest):
+    """
+    Size and mtime decide in the common case; a touched but unchanged
+    file (same size, new mtime) falls back to comparing the hash.
+    """
+    current_size, current_mtime = _source_key(filename)
+    if current_size != size:
+        return False
+    if current_mtime == mtime_ns:
+        return True
+    return file_digest(filename) == digest
+
+
+def _little_endian(arr):
+    if sys.byteorder == "big":
+        arr.byteswap()
+    return arr
+
+
+# =========================
+# NATIVE FORMAT
+# =========================
+
+def _write_native(f, columns, rows, lines, key, rejections):
+    f.write(HEADER.pack(
+        NATIVE_MAGIC, CACHE_VERSION, rows, lines, *key,
+        *(rejections.get(rule, 0) for rule in PARSE_RULES)
+    ))
+
+    for name in STRING_COLUMNS:
+        lookup = {}
+        codes = array("I")
+        for value in columns[name]:
+            code = lookup.get(value)
+            if code is None:
+                code = lookup[value] = len(lookup)
+            codes.append(code)
+
+        # Category lengths in characters, then the categories back to back
+        lengths = array("Q", map(len, lookup))
+        blob = "".join(lookup).encode("utf-8")
+        f.write(LENGTH.pack(len(lookup)))
+        f.write(LENGTH.pack(len(blob)))
+        f.write(_little_endian(lengths).tobytes())
+        f.write(blob)
+        f.write(_little_endian(codes).tobytes())
+
+    f.write(_little_endian(array("q", columns["Quantity"])).tobytes())
+    f.write(_little_endian(array("d", columns["UnitPrice"])).tobytes())
+
+
+def _read_native_header(data):
+    _, version, rows, lines, size, mtime_ns, digest, *rejected = HEADER.unpack_from(data)
+    return version, rows, lines, (size, mtime_ns, digest), dict(zip(PARSE_RULES, rejected))
+
+
+def _read_native_columns(data, rows):
+    pos = HEADER.size
+    columns = {}
+
+    for name in STRING_COLUMNS:
+        count, = LENGTH.unpack_from(data, pos)
+        blob_len, = LENGTH.unpack_from(data, pos + LENGTH.size)
+        pos += 2 * LENGTH.size
+
+        lengths = array("Q")
+        lengths.frombytes(data[pos:pos + count * lengths.itemsize])
+        pos += count * lengths.itemsize
+        text = data[pos:pos + blob_len].decode("utf-8")
+        pos += blob_len
+        ends = list(accumulate(_little_endian(lengths)))
+        categories = list(map(text.__getitem__, map(slice, [0] + ends, ends)))
+
+        codes = array("I")
+        codes.frombytes(data[pos:pos + rows * codes.itemsize])
+        pos += rows * codes.itemsize
+        columns[name] = list(map(categories.__getitem__, _little_endian(codes)))
+
+    for name, typecode in (("Quantity", "q"), ("UnitPrice", "d")):
+        values = array(typecode)
+        values.frombytes(data[pos:pos + rows * values.itemsize])
+        pos += rows * values.itemsize
+        columns[name] = _little_endian(values).tolist()
+
+    return columns
+
+
+# =========================
+# ARROW FORMAT
+# =========================
+
+def _write_arrow(f, columns, lines, key, rejections):
+    size, mtime_ns, digest = key
+    table = pa.table({
+        name: columns[name] if name in ("Quantity", "UnitPrice") else pa.array(columns[name]).dictionary_encode()
+        for name in COLUMNS
+    })
+    table = table.replace_schema_metadata({
+        "version": str(CACHE_VERSION),
+        "lines": str(lines),
+        "source_size": str(size),
+        "source_mtime_ns": str(mtime_ns),
+        "source_sha256": digest.hex(),
+        **{"rejected_" + rule: str(rejections.get(rule, 0)) for rule in PARSE_RULES}
+    })
+
+    with pa.ipc.new_file(f, table.schema) as writer:
+        writer.write_table(table)
+
+
+def _read_arrow_header(reader):
+    meta = {k.decode(): v.decode() for k, v in (reader.schema.metadata or {}).items()}
+    key = (int(meta["source_size"]), int(meta["source_mtime_ns"]), bytes.fromhex(meta["source_sha256"]))
+    rejections = {rule: int(meta["rejected_" + rule]) for rule in PARSE_RULES}
+    return int(meta["version"]), int(meta["lines"]), key, rejections
+
+
+def _read_arrow_columns(reader):
+    table = reader.read_all().combine_chunks()
+    columns = {}
+    for name in COLUMNS:
+        column = table.column(name).chunk(0) if table.num_rows else None
+        if column is None:
+            columns[name] = []
+        elif name in STRING_COLUMNS:
+            # Decode each distinct value once, then expand by index
+            categories = column.dictionary.to_pylist()
+            columns[name] = list(map(categories.__getitem__, column.indices.to_pylist()))
+        else:
+            columns[name] = column.to_pylist()
+    return columns
+
+
+# =========================
+# PUBLIC API
+# =========================
+
+def save_parsed(filename, transactions, lines, cache_file=None, backend=None, rejections=None):
+    """
+    Writes parsed transactions for filename to the cache (temp file +
+    rename). lines is the raw data line count the rows came from and
+    rejections the lines dropped per parse rule, as counted by
+    parse_transactions. backend is "arrow" or "native"; the default is arrow when pyarrow
+    is installed. Quantities outside the int64 range raise OverflowError
+    (nothing is written).
+    """
+    if backend is None:
+        backend = "arrow" if pa is not None else "native"
+    if backend == "arrow" and pa is None:
+        raise ImportError("The arrow parse cache requires pyarrow (pip install pyarrow)")
+
+    cache_file = cache_file or cache_path(filename)
+    key = _source_key(filename) + (file_digest(filename),)
+    columns = {name: [tx[name] for tx in transactions] for name in COLUMNS}
+
+    with atomic_write(cache_file) as f:
+        if backend == "arrow":
+            _write_arrow(f, columns, lines, key, rejections or {})
+        else:
+            _write_native(f, columns, len(transactions), lines, key, rejections or {})
+
+    return cache_file
+
+
+def load_columns(filename, cache_file=None):
+    """
+    Loads the cached columns for filename as {column name: list}, typed
+    like parse_transactions() output, without building any dicts.
+    Returns (columns, lines, rejections), where rejections counts the
+    lines dropped per parse rule, or None if the cache is missing,
+    unreadable or was built from a different version of the file.
+    """
+    cache_file = cache_file or cache_path(filename)
+
+    # The source key is checked from the header before any column is
+    # decoded. Corrupt Arrow files raise ArrowInvalid (a ValueError).
+    try:
+        with open(cache_file, "rb") as f:
+            magic = f.read(len(NATIVE_MAGIC))
+
+            if magic == NATIVE_MAGIC:
+                f.seek(0)
+                data = f.read()
+                version, rows, lines, key, rejections = _read_native_header(data)
+                if version != CACHE_VERSION or not _is_current(filename, *key):
+                    return None
+                columns = _read_native_columns(data, rows)
+
+            elif magic.startswith(ARROW_MAGIC) and pa is not None:
+                with pa.memory_map(cache_file) as source:
+                    reader = pa.ipc.open_file(source)
+                    version, lines, key, rejections = _read_arrow_header(reader)
+                    if version != CACHE_VERSION or not _is_current(filename, *key):
+                        return None
+                    columns = _read_arrow_columns(reader)
+
+            else:
+                return None
+    except (OSError, ValueError, KeyError, IndexError, struct.error):
+        return None
+
+    return columns, lines, rejections
+
+
+def load_parsed(filename, cache_file=None):
+    """
+    Loads cached transactions for filename as parse_transactions()
+    Transaction records. Returns (transactions, lines, rejections) or
+    None like load_columns.
+    """
+    loaded = load_columns(filename, cache_file)
+    if loaded is None:
+        return None
+
+    columns, lines, rejections = loaded
+    with paused_gc():
+        transactions = list(map(Transaction, *(columns[name] for name in COLUMNS)))
+    return transactions, lines, rejections
@@ -0,0 +1,188 @@
+"""
+Compact record types for transactions.
+
+Transaction keeps the eight parsed fields in __slots__ (about a third of
+the memory of an 8-key dict), and EnrichedTransaction references its
+Transaction and the matched catalog product instead of copying fields.
+Both read like the old dicts (tx["Region"], tx.get(...), keys(),
+items(), dict(tx), == against a dict), so existing callers keep working;
+hot loops use attribute access (tx.Region).
+"""
+import gc
+from contextlib import contextmanager
+from operator import attrgetter
+
+
+TRANSACTION_FIELDS = (
+    "TransactionID", "Date", "ProductID", "ProductName",
+    "Quantity", "UnitPrice", "CustomerID", "Region"
+)
+ENRICHMENT_FIELDS = ("API_Category", "API_Brand", "API_Rating", "API_Match")
+
+
+class _RecordMapping:
+    """
+    Read-only mapping protocol over the names in FIELDS.
+    """
+
+    __slots__ = ()
+    FIELDS = ()
+
+    def __getitem__(self, key):
+        if key not in self._field_set:
+            raise KeyError(key)
+        return getattr(self, key)
+
+    def get(self, key, default=None):
+        if key not in self._field_set:
+            return default
+        return getattr(self, key)
+
+    def __contains__(self, key):
+        return key in self._field_set
+
+    def __iter__(self):
+        return iter(self.FIELDS)
+
+    def __len__(self):
+        return len(self.FIELDS)
+
+    def keys(self):
+        return list(self.FIELDS)
+
+    def values(self):
+        return [getattr(self, name) for name in self.FIELDS]
+
+    def items(self):
+        return [(name, getattr(self, name)) for name in self.FIELDS]
+
+    def to_dict(self):
+        return dict(self.items())
+
+    def copy(self):
+        return self.to_dict()
+
+    def __eq__(self, other):
+        if isinstance(other, (_RecordMapping, dict)):
+            return self.to_dict() == dict(other.items())
+        return NotImplemented
+
+    __hash__ = None
+
+    def __repr__(self):
+        return f"{type(self).__name__}({self.to_dict()!r})"
+
+
+class Transaction(_RecordMapping):
+    """
+    One parsed sales row.
+    """
+
+    __slots__ = TRANSACTION_FIELDS
+    FIELDS = TRANSACTION_FIELDS
+    _field_set = frozenset(TRANSACTION_FIELDS)
+
+    def __init__(self, TransactionID, Date, ProductID, ProductName, Quantity, UnitPrice, CustomerID, Region):
+        self.TransactionID = TransactionID
+        self.Date = Date
+        self.ProductID = ProductID
+        self.ProductName = ProductName
+        self.Quantity = Quantity
+        self.UnitPrice = UnitPrice
+        self.CustomerID = CustomerID
+        self.Region = Region
+
+    def __setitem__(self, key, value):
+        if key not in self._field_set:
+            raise KeyError(key)
+        setattr(self, key, value)
+
+    def __reduce__(self):
+        return Transaction, tuple(getattr(self, name) for name in TRANSACTION_FIELDS)
+
+    @classmethod
+    def from_dict(cls, data):
+        """
+        Builds a Transaction from a transaction dict (KeyError if a
+        field is missing).
+        """
+        return cls(*[data[name] for name in TRANSACTION_FIELDS])
+
+
+class EnrichedTransaction(_RecordMapping):
+    """
+    A Transaction plus its catalog match. Transaction fields are read
+    through to the wrapped record and API_Category / API_Brand come from
+    the shared product dict, so nothing is copied per row.
+    """
+
+    __slots__ = ("transaction", "product", "API_Rating")
+    FIELDS = TRANSACTION_FIELDS + ENRICHMENT_FIELDS
+    _field_set = frozenset(TRANSACTION_FIELDS + ENRICHMENT_FIELDS)
+
+    def __init__(self, transaction, product=None, rating=None):
+        self.transaction = transaction
+        self.product = product or None
+        self.API_Rating = rating
+
+    @property
+    def API_Category(self):
+        return self.product.get("category") if self.product else None
+
+    @property
+    def API_Brand(self):
+        return self.product.get("brand") if self.product else None
+
+    @property
+    def API_Match(self):
+        return self.product is not None
+
+    def values(self):
+        # Spelled out: this is the per-row hot path of the output writer
+        tx = self.transaction
+        product = self.product
+        if product:
+            category, brand = product.get("category"), product.get("brand")
+        else:
+            category = brand = None
+        return [
+            tx.TransactionID, tx.Date, tx.ProductID, tx.ProductName,
+            tx.Quantity, tx.UnitPrice, tx.CustomerID, tx.Region,
+            category, brand, self.API_Rating, product is not None
+        ]
+
+    def __reduce__(self):
+        return EnrichedTransaction, (self.transaction, self.product, self.API_Rating)
+
+
+# Transaction fields read through to the wrapped record
+for _name in TRANSACTION_FIELDS:
+    setattr(EnrichedTransaction, _name, property(attrgetter(f"transaction.{_name}")))
+del _name
+
+
+def as_transaction(tx):
+    """
+    Returns tx unchanged if it already has attribute access, otherwise
+    converts a transaction dict into a Transaction.
+    """
+    if isinstance(tx, dict):
+        return Transaction.from_dict(tx)
+    return tx
+
+
+@contextmanager
+def paused_gc():
+    """
+    Pauses the cyclic garbage collector while many records are built.
+    Unlike dicts of plain values, slotted records are always tracked by
+    the collector, and its repeated passes over a growing list cost more
+    than building the records; they form no cycles, so nothing leaks.
+    """
+    enabled = gc.isenabled()
+    gc.disable()
+    try:
+        yield
+    finally:
+        if enabled:
+            gc.enable()
@@ -0,0 +1,549 @@
+"""
+Lazy, sectioned sales report.
+
+Sections are registered with the metrics they need and are only
+computed when requested: a ReportBuilder memoizes every metric for its
+transaction set, and on the python engine one pass feeds just the
+accumulators the requested sections use (no customer ranking for a
+region-only request). Renderers produce the fixed-width text layout,
+JSON, CSV and HTML.
+"""
+import csv
+import html
+import io
+import json
+import os
+from datetime import datetime
+
+from utils.data_processor import aggregate_transactions, default_accumulators, ApproxCustomerAccumulator
+from utils.sketches import DEFAULT_PRECISION
+
+
+ENGINES = ("python", "numpy", "sqlite", "cube")
+FORMATS = ("text", "json", "csv", "html")
+
+_FORMAT_EXTENSIONS = {".json": "json", ".csv": "csv", ".html": "html", ".htm": "html"}
+
+
+# =========================
+# METRICS
+# =========================
+
+def _customers_error(acc):
+    return acc.error_bound() if isinstance(acc, ApproxCustomerAccumulator) else None
+
+
+def _distinct_error(acc):
+    return acc.relative_error() if acc.distinct != "exact" else None
+
+
+# metric -> (accumulator in default_accumulators(), value from it)
+ACCUMULATOR_METRICS = {
+    "total_records": ("revenue", lambda acc: acc.count),
+    "total_revenue": ("revenue", lambda acc: acc.result()),
+    "date_range": ("dates", lambda acc: acc.result()),
+    "region_stats": ("regions", lambda acc: acc.result()),
+    "region_customers": ("region_customers", lambda acc: acc.result()),
+    "region_customers_error": ("region_customers", _distinct_error),
+    "distinct_error": ("daily", _distinct_error),
+    "top_products": ("products", lambda acc: acc.top(5)),
+    "top_customers": ("customers", lambda acc: acc.top(5)),
+    "top_customers_error": ("customers", _customers_error),
+    "daily": ("daily", lambda acc: acc.result()),
+    "best_day": ("daily", lambda acc: acc.peak()),
+    "low_products": ("products", lambda acc: acc.low())
+}
+
+# metric -> value from a TransactionTable or SalesDatabase (always exact)
+TABLE_METRICS = {
+    "total_records": len,
+    "total_revenue": lambda table: table.total_revenue(),
+    "date_range": lambda table: table.date_range(),
+    "region_stats": lambda table: table.region_wise_sales(),
+    "region_customers": lambda table: table.region_unique_customers(),
+    "region_customers_error": lambda table: None,
+    "distinct_error": lambda table: None,
+    "top_products": lambda table: table.top_selling_products(5),
+    "top_customers": lambda table: table.top_customers(5),
+    "top_customers_error": lambda table: None,
+    "daily": lambda table: table.daily_sales_trend(),
+    "best_day": lambda table: table.find_peak_sales_day(),
+    "low_products": lambda table: table.low_performing_products()
+}
+
+# TABLE_METRICS a SalesCube answers; the cube has no CustomerID, so the
+# cube engine feeds accumulators for the rest
+CUBE_METRICS = ("total_records", "total_revenue", "date_range", "region_stats",
+                "top_products", "best_day", "low_products")
+
+METRICS = list(ACCUMULATOR_METRICS)
+
+
+def enrichment_summary(enriched_transactions):
+    """
+    Match counts and the sorted names of products without a catalog match.
+    """
+    enriched = 0
+    total = 0
+    failed = set()
+    for tx in enriched_transactions:
+        total += 1
+        if tx.get("API_Match"):
+            enriched += 1
+        else:
+            failed.add(tx["ProductName"])
+
+    return {
+        "enriched": enriched,
+        "total": total,
+        "success_rate": (enriched / total) * 100 if total else 0,
+        "failed_products": sorted(failed)
+    }
+
+
+# =========================
+# SECTIONS
+# =========================
+
+class Section:
+    """
+    One report section: the metrics it needs, its text block and its
+    (columns, rows) table for the CSV and HTML renderers.
+    """
+
+    def __init__(self, name, title, metrics, text, table):
+        self.name = name
+        self.title = title
+        self.metrics = metrics
+        self.text = text
+        self.table = table
+
+
+# name -> Section, in report order
+SECTIONS = {}
+
+
+def register_section(name, title, metrics, table):
+    """
+    Decorator registering a text renderer as section name. metrics
+    lists the metric names it reads ("enrichment" for the API summary);
+    table(values) returns (columns, rows).
+    """
+    def decorator(text):
+        SECTIONS[name] = Section(name, title, tuple(metrics), text, table)
+        return text
+    return decorator
+
+
+def _rule():
+    return "-" * 45 + "\n"
+
+
+@register_section(
+    "header", "SALES ANALYTICS REPORT", ["total_records"],
+    lambda v: (["Field", "Value"], [["Generated", v["generated"]], ["Records Processed", v["total_records"]]])
+)
+def _header_text(v):
+    return (
+        "=" * 45 + "\n"
+        "SALES ANALYTICS REPORT\n"
+        f"Generated: {v['generated']}\n"
+        f"Records Processed: {v['total_records']}\n"
+        + "=" * 45 + "\n\n"
+    )
+
+
+def _avg_order_value(v):
+    return v["total_revenue"] / v["total_records"] if v["total_records"] else 0
+
+
+@register_section(
+    "summary", "OVERALL SUMMARY", ["total_revenue", "total_records", "date_range"],
+    lambda v: (["Field", "Value"], [
+        ["Total Revenue", v["total_revenue"]],
+        ["Total Transactions", v["total_records"]],
+        ["Average Order Value", round(_avg_order_value(v), 2)],
+        ["First Date", v["date_range"][0]],
+        ["Last Date", v["date_range"][1]]
+    ])
+)
+def _summary_text(v):
+    first_date, last_date = v["date_range"]
+    return (
+        "OVERALL SUMMARY\n" + _rule()
+        + f"Total Revenue: ₹{v['total_revenue']:,.2f}\n"
+        f"Total Transactions: {v['total_records']}\n"
+        f"Average Order Value: ₹{_avg_order_value(v):,.2f}\n"
+        f"Date Range: {first_date} to {last_date}\n\n"
+    )
+
+
+def _distinct_note(error):
+    return (
+        f"Note: customer counts are HyperLogLog estimates "
+        f"(standard error ±{error:.1%}, ~95% within ±{2 * error:.1%})\n\n"
+    )
+
+
+@register_section(
+    "regions", "REGION-WISE PERFORMANCE", ["region_stats", "region_customers", "region_customers_error"],
+    lambda v: (["Region", "Sales", "Percentage", "Transactions", "Customers"], [
+        [region, round(data["total_sales"], 2), data["percentage"], data["transaction_count"],
+         v["region_customers"].get(region, 0)]
+        for region, data in v["region_stats"].items()
+    ])
+)
+def _regions_text(v):
+    lines = [
+        "REGION-WISE PERFORMANCE\n", _rule(),
+        f"{'Region':<10}{'Sales':>12}{'% of Total':>15}{'Transactions':>15}{'Customers':>12}\n"
+    ]
+    for region, data in v["region_stats"].items():
+        lines.append(
+            f"{region:<10}₹{data['total_sales']:>10,.0f}"
+            f"{data['percentage']:>14.2f}%"
+            f"{data['transaction_count']:>15}"
+            f"{v['region_customers'].get(region, 0):>12}\n"
+        )
+    lines.append("\n")
+    if v["region_customers_error"] is not None:
+        lines.append(_distinct_note(v["region_customers_error"]))
+    return "".join(lines)
+
+
+@register_section(
+    "top_products", "TOP 5 PRODUCTS", ["top_products"],
+    lambda v: (["Rank", "Product", "Quantity", "Revenue"], [
+        [i, name, qty, rev] for i, (name, qty, rev) in enumerate(v["top_products"], 1)
+    ])
+)
+def _top_products_text(v):
+    lines = ["TOP 5 PRODUCTS\n", _rule(), f"{'Rank':<6}{'Product':<20}{'Qty':>6}{'Revenue':>12}\n"]
+    for i, (name, qty, rev) in enumerate(v["top_products"], 1):
+        lines.append(f"{i:<6}{name:<20}{qty:>6}₹{rev:>10,.0f}\n")
+    lines.append("\n")
+    return "".join(lines)
+
+
+@register_section(
+    "top_customers", "TOP 5 CUSTOMERS", ["top_customers", "top_customers_error"],
+    lambda v: (["Rank", "Customer", "Spent", "Orders"], [
+        [i, cid, data["total_spent"], data["purchase_count"]]
+        for i, (cid, data) in enumerate(v["top_customers"], 1)
+    ])
+)
+def _top_customers_text(v):
+    lines = ["TOP 5 CUSTOMERS\n", _rule(), f"{'Rank':<6}{'Customer':<12}{'Spent':>12}{'Orders':>10}\n"]
+    for i, (cid, data) in enumerate(v["top_customers"], 1):
+        lines.append(
+            f"{i:<6}{cid:<12}₹{data['total_spent']:>10,.0f}"
+            f"{data['purchase_count']:>10}\n"
+        )
+    if v["top_customers_error"] is not None:
+        lines.append(
+            f"(approximate: spend overestimated by at most "
+            f"₹{v['top_customers_error']:,.0f})\n"
+        )
+    lines.append("\n")
+    return "".join(lines)
+
+
+@register_section(
+    "daily", "DAILY SALES TREND", ["daily", "distinct_error"],
+    lambda v: (["Date", "Revenue", "Transactions", "Customers"], [
+        [date, d["revenue"], d["transaction_count"], d["unique_customers"]]
+        for date, d in v["daily"].items()
+    ])
+)
+def _daily_text(v):
+    lines = ["DAILY SALES TREND\n", _rule(), f"{'Date':<12}{'Revenue':>12}{'Txns':>8}{'Customers':>12}\n"]
+    for date, d in v["daily"].items():
+        lines.append(
+            f"{date:<12}₹{d['revenue']:>10,.0f}"
+            f"{d['transaction_count']:>8}"
+            f"{d['unique_customers']:>12}\n"
+        )
+    lines.append("\n")
+
+    if v["distinct_error"] is not None:
+        lines.append(_distinct_note(v["distinct_error"]))
+    return "".join(lines)
+
+
+@register_section(
+    "product_performance", "PRODUCT PERFORMANCE ANALYSIS", ["best_day", "low_products"],
+    lambda v: (["Item", "Name", "Quantity", "Revenue"], [
+        ["Best Selling Day", v["best_day"][0], "", v["best_day"][1]]
+    ] + [
+        ["Low Performing Product", name, qty, rev] for name, qty, rev in v["low_products"]
+    ])
+)
+def _product_performance_text(v):
+    best_day = v["best_day"]
+    lines = [
+        "PRODUCT PERFORMANCE ANALYSIS\n", _rule(),
+        f"Best Selling Day: {best_day[0]} | Revenue: ₹{best_day[1]:,.0f}\n"
+    ]
+    if v["low_products"]:
+        lines.append("Low Performing Products:\n")
+        for p in v["low_products"]:
+            lines.append(f"- {p[0]} (Qty: {p[1]}, Revenue: ₹{p[2]:,.0f})\n")
+    else:
+        lines.append("No low performing products found.\n")
+    lines.append("\n")
+    return "".join(lines)
+
+
+@register_section(
+    "enrichment", "API ENRICHMENT SUMMARY", ["enrichment"],
+    lambda v: (["Field", "Value"], [
+        ["Total products enriched", v["enrichment"]["enriched"]],
+        ["Success rate", round(v["enrichment"]["success_rate"], 2)]
+    ] + [["Not enriched", name] for name in v["enrichment"]["failed_products"]])
+)
+def _enrichment_text(v):
+    summary = v["enrichment"]
+    lines = [
+        "API ENRICHMENT SUMMARY\n", _rule(),
+        f"Total products enriched: {summary['enriched']}\n",
+        f"Success rate: {summary['success_rate']:.2f}%\n"
+    ]
+    if summary["failed_products"]:
+        lines.append("Products not enriched:\n")
+        for p in summary["failed_products"]:
+            lines.append(f"- {p}\n")
+    else:
+        lines.append("All products successfully enriched.\n")
+    return "".join(lines)
+
+
+# =========================
+# RENDERERS
+# =========================
+
+def _render_text(builder, names):
+    return "".join(SECTIONS[name].text(builder.section(name)) for name in names)
+
+
+def _render_json(builder, names):
+    return json.dumps({name: builder.section(name) for name in names}, indent=2, ensure_ascii=False) + "\n"
+
+
+def _render_csv(builder, names):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer, lineterminator="\n")
+    for name in names:
+        columns, rows = SECTIONS[name].table(builder.section(name))
+        writer.writerow([SECTIONS[name].title])
+        writer.writerow(columns)
+        writer.writerows(["" if value is None else value for value in row] for row in rows)
+        writer.writerow([])
+    return buffer.getvalue()
+
+
+def _render_html(builder, names):
+    parts = [
+        "<!DOCTYPE html>\n<html>\n<head>\n<meta charset=\"utf-8\">\n",
+        "<title>Sales Analytics Report</title>\n</head>\n<body>\n"
+    ]
+    for name in names:
+        columns, rows = SECTIONS[name].table(builder.section(name))
+        parts.append(f"<h2>{html.escape(SECTIONS[name].title)}</h2>\n<table>\n<tr>")
+        parts.extend(f"<th>{html.escape(str(column))}</th>" for column in columns)
+        parts.append("</tr>\n")
+        for row in rows:
+            parts.append("<tr>")
+            parts.extend(f"<td>{html.escape('' if value is None else str(value))}</td>" for value in row)
+            parts.append("</tr>\n")
+        parts.append("</table>\n")
+    parts.append("</body>\n</html>\n")
+    return "".join(parts)
+
+
+RENDERERS = {
+    "text": _render_text,
+    "json": _render_json,
+    "csv": _render_csv,
+    "html": _render_html
+}
+
+
+def detect_report_format(filename):
+    """
+    Report format implied by the file extension; anything else is text.
+    """
+    return _FORMAT_EXTENSIONS.get(os.path.splitext(filename.lower())[1], "text")
+
+
+# =========================
+# BUILDER
+# =========================
+
+class ReportBuilder:
+    """
+    Computes report sections on demand for one transaction set.
+
+    Metrics are memoized, so repeated requests (a dashboard polling one
+    section) cost nothing after the first. On the python engine each
+    batch of missing metrics is computed in one pass that feeds only the
+    accumulators those metrics need; transactions must be re-iterable if
+    sections are requested in several batches. Pre-populated
+    accumulators (e.g. from parallel_aggregate) skip the pass entirely.
+    engine="numpy" / "sqlite" query a TransactionTable / SalesDatabase
+    (transactions may already be one), one method per metric.
+    engine="cube" answers the CUBE_METRICS from a SalesCube built over
+    the transactions and the customer metrics from accumulators.
+    """
+
+    def __init__(self, transactions, enriched_transactions=None, engine="python", accumulators=None,
+                 rankings="exact", distinct="exact", precision=DEFAULT_PRECISION):
+        if engine not in ENGINES:
+            raise ValueError(f"Unknown engine: {engine}")
+
+        self.transactions = transactions
+        self.enriched_transactions = enriched_transactions
+        self.engine = engine
+        self.rankings = rankings
+        self.distinct = distinct
+        self.precision = precision
+        self.generated = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+
+        self._accumulators = dict(accumulators) if accumulators is not None else {}
+        self._complete = accumulators is not None
+        self._table = None
+        self._values = {}
+
+    # =========================
+    # METRICS
+    # =========================
+
+    def _table_source(self):
+        if self._table is None:
+            if self.engine == "numpy":
+                from utils.columnar import TransactionTable
+
+                table = self.transactions
+                if not isinstance(table, TransactionTable):
+                    table = TransactionTable.from_transactions(self.transactions)
+            elif self.engine == "cube":
+                from utils.cube import SalesCube
+
+                table = self.transactions
+                if not isinstance(table, SalesCube):
+                    table = SalesCube.build(self.transactions)
+            else:
+                from utils.sqlite_store import SalesDatabase
+
+                table = self.transactions
+                if not isinstance(table, SalesDatabase):
+                    table = SalesDatabase(":memory:")
+                    table.insert(self.transactions)
+            self._table = table
+        return self._table
+
+    def _fill_accumulators(self, names):
+        needed = {ACCUMULATOR_METRICS[name][0] for name in names} - set(self._accumulators)
+        if not needed or self._complete:
+            return
+
+        accumulators = default_accumulators(self.distinct, self.rankings, self.precision)
+        accumulators = {key: acc for key, acc in accumulators.items() if key in needed}
+        self._accumulators.update(aggregate_transactions(self.transactions, accumulators))
+
+    def compute(self, names):
+        """
+        Returns {name: value} for the given metric names, computing the
+        ones not memoized yet ("enrichment" summarizes
+        enriched_transactions).
+        """
+        missing = [name for name in dict.fromkeys(names) if name not in self._values]
+
+        if "enrichment" in missing:
+            if self.enriched_transactions is None:
+                raise ValueError("The enrichment section needs enriched_transactions")
+            self._values["enrichment"] = enrichment_summary(self.enriched_transactions)
+            missing.remove("enrichment")
+
+        for name in missing:
+            if name not in ACCUMULATOR_METRICS:
+                raise ValueError(f"Unknown metric: {name}")
+
+        if missing and self.engine != "python" and not self._complete:
+            table = self._table_source()
+            for name in missing:
+                # A cube passed in directly has no rows to fall back on
+                if self.engine != "cube" or name in CUBE_METRICS or table is self.transactions:
+                    self._values[name] = TABLE_METRICS[name](table)
+            missing = [name for name in missing if name not in self._values]
+
+        if missing:
+            self._fill_accumulators(missing)
+            for name in missing:
+                key, value = ACCUMULATOR_METRICS[name]
+                self._values[name] = value(self._accumulators[key])
+
+        return {name: self._values[name] for name in names}
+
+    def metric(self, name):
+        return self.compute([name])[name]
+
+    def metrics(self):
+        """
+        Every report metric except the enrichment summary, in one pass.
+        """
+        return self.compute(METRICS)
+
+    def invalidate(self):
+        """
+        Drops memoized values, e.g. after the transaction set changed.
+        """
+        self._values = {}
+        if not self._complete:
+            self._accumulators = {}
+        self._table = None
+
+    # =========================
+    # SECTIONS
+    # =========================
+
+    def _names(self, sections):
+        if sections is None:
+            # Every section this builder has data for
+            return [name for name in SECTIONS if name != "enrichment" or self.enriched_transactions is not None]
+
+        names = list(sections)
+        for name in names:
+            if name not in SECTIONS:
+                raise ValueError(f"Unknown report section '{name}' (expected one of {', '.join(SECTIONS)})")
+        return names
+
+    def section(self, name):
+        """
+        The values section name renders from, as a dict.
+        """
+        values = self.compute(SECTIONS[self._names([name])[0]].metrics)
+        if name == "header":
+            values["generated"] = self.generated
+        return values
+
+    def render(self, fmt="text", sections=None):
+        """
+        Renders the given sections (default: all, in report order; the
+        enrichment summary only when enriched_transactions were given).
+        Their metrics are computed together before rendering.
+        """
+        if fmt not in RENDERERS:
+            raise ValueError(f"Unknown report format '{fmt}' (expected one of {', '.join(FORMATS)})")
+
+        names = self._names(sections)
+        self.compute([metric for name in names for metric in SECTIONS[name].metrics])
+        return RENDERERS[fmt](self, names)
+
+    def write(self, filename, fmt=None, sections=None):
+        """
+        Renders to filename; fmt defaults to what the extension implies.
+        """
+        text = self.render(fmt or detect_report_format(filename), sections)
+        with open(filename, "w", encoding="utf-8") as f:
+            f.write(text)
+        return filename
@@ -0,0 +1,223 @@
+"""
+Approximate sketches with bounded memory.
+
+HyperLogLog behaves like a set for the operations the accumulators use
+(add, len, |=), so it can stand in for an exact set of customer IDs.
+Hashes come from blake2b rather than hash(), so sketches built in
+different processes or runs can be merged.
+
+SpaceSaving tracks the heaviest keys of a weighted stream in a fixed
+number of counters, with a per-key bound on the overestimate.
+"""
+import heapq
+import math
+from hashlib import blake2b
+
+
+DEFAULT_PRECISION = 12
+DEFAULT_CAPACITY = 1000
+
+
+def _hash64(value):
+    return int.from_bytes(blake2b(str(value).encode("utf-8"), digest_size=8).digest(), "big")
+
+
+class HyperLogLog:
+    """
+    HyperLogLog distinct counter with 2**precision registers.
+    Standard error is about 1.04 / sqrt(2**precision).
+    """
+
+    def __init__(self, precision=DEFAULT_PRECISION):
+        if not 4 <= precision <= 18:
+            raise ValueError("precision must be between 4 and 18")
+
+        self.precision = precision
+        self.registers = bytearray(1 << precision)
+
+    def add(self, value):
+        h = _hash64(value)
+        index = h >> (64 - self.precision)
+        rest = h & ((1 << (64 - self.precision)) - 1)
+        rank = (64 - self.precision) - rest.bit_length() + 1
+
+        if rank > self.registers[index]:
+            self.registers[index] = rank
+
+    def count(self):
+        m = len(self.registers)
+        alpha = 0.7213 / (1 + 1.079 / m)
+        estimate = alpha * m * m / sum(2.0 ** -r for r in self.registers)
+
+        # Small-range correction (linear counting)
+        zeros = self.registers.count(0)
+        if estimate <= 2.5 * m and zeros:
+            estimate = m * math.log(m / zeros)
+
+        return estimate
+
+    def relative_error(self):
+        return 1.04 / math.sqrt(len(self.registers))
+
+    def merge(self, other):
+        if other.precision != self.precision:
+            raise ValueError("Cannot merge sketches with different precision")
+
+        self.registers = bytearray(map(max, self.registers, other.registers))
+        return self
+
+    def __ior__(self, other):
+        return self.merge(other)
+
+    def __len__(self):
+        return int(round(self.count()))
+
+    def to_bytes(self):
+        """
+        Serializes the sketch (precision byte + registers) for storage
+        or for shipping between processes.
+        """
+        return bytes([self.precision]) + bytes(self.registers)
+
+    @classmethod
+    def from_bytes(cls, data):
+        sketch = cls(data[0])
+        if len(data) - 1 != len(sketch.registers):
+            raise ValueError("Corrupt HyperLogLog data")
+        sketch.registers = bytearray(data[1:])
+        return sketch
+
+
+DISTINCT_MODES = ("exact", "hll")
+
+
+def distinct_error(mode="exact", precision=DEFAULT_PRECISION):
+    """
+    Relative standard error of counts from new_distinct_counter(mode,
+    precision); 0.0 for exact sets.
+    """
+    if mode == "hll":
+        return 1.04 / math.sqrt(1 << precision)
+    return 0.0
+
+
+def new_distinct_counter(mode="exact", precision=DEFAULT_PRECISION):
+    """
+    Returns an empty distinct counter: a set for mode="exact" or a
+    HyperLogLog for mode="hll".
+    """
+    if mode == "exact":
+        return set()
+    if mode == "hll":
+        return HyperLogLog(precision)
+    raise ValueError(f"Unknown distinct-count mode: {mode}")
+
+
+class SpaceSaving:
+    """
+    Space-Saving heavy hitters over weighted items, keeping at most
+    capacity counters. A newcomer evicts the smallest counter and
+    inherits its count as error, so for every monitored item
+    count - error <= true weight <= count, and any item whose weight
+    exceeds total / capacity is guaranteed to be monitored.
+    """
+
+    def __init__(self, capacity=DEFAULT_CAPACITY):
+        if capacity < 1:
+            raise ValueError("capacity must be at least 1")
+
+        self.capacity = capacity
+        self.counts = {}
+        self.errors = {}
+        self.total = 0
+        # Lazy min-heap of (count, item); entries whose count no longer
+        # matches self.counts are stale and skipped when popped
+        self._heap = []
+
+    def add(self, item, weight=1):
+        """
+        Adds weight to item. Returns the item evicted to make room, or
+        None.
+        """
+        self.total += weight
+        evicted = None
+        counts = self.counts
+
+        if item in counts:
+            counts[item] += weight
+        elif len(counts) < self.capacity:
+            counts[item] = weight
+            self.errors[item] = 0
+        else:
+            evicted, floor = self._pop_min()
+            del counts[evicted]
+            del self.errors[evicted]
+            counts[item] = floor + weight
+            self.errors[item] = floor
+
+        heapq.heappush(self._heap, (counts[item], item))
+        if len(self._heap) > 4 * self.capacity:
+            self._rebuild_heap()
+
+        return evicted
+
+    def _pop_min(self):
+        while True:
+            count, item = heapq.heappop(self._heap)
+            if self.counts.get(item) == count:
+                return item, count
+
+    def _rebuild_heap(self):
+        self._heap = [(count, item) for item, count in self.counts.items()]
+        heapq.heapify(self._heap)
+
+    def min_count(self):
+        """
+        Largest weight an unmonitored item can have.
+        """
+        if len(self.counts) < self.capacity:
+            return 0
+        return min(self.counts.values())
+
+    def top(self, n):
+        """
+        Returns up to n (item, count, error) tuples, heaviest first.
+        """
+        counts = self.counts
+        return [
+            (item, counts[item], self.errors[item])
+            for item in heapq.nlargest(n, counts, key=counts.__getitem__)
+        ]
+
+    def merge(self, other):
+        """
+        Merges another summary: counts and errors are summed, and an
+        item missing from a full summary is charged that summary's
+        min_count (the most it could have had there) before trimming
+        back to capacity.
+        """
+        floor_self = self.min_count()
+        floor_other = other.min_count()
+
+        counts = {}
+        errors = {}
+        for item in self.counts.keys() | other.counts.keys():
+            if item in self.counts:
+                count, error = self.counts[item], self.errors[item]
+            else:
+                count, error = floor_self, floor_self
+            if item in other.counts:
+                count += other.counts[item]
+                error += other.errors[item]
+            else:
+                count += floor_other
+                error += floor_other
+            counts[item] = count
+            errors[item] = error
+
+        keep = heapq.nlargest(self.capacity, counts, key=counts.__getitem__)
+        self.counts = {item: counts[item] for item in keep}
+        self.errors = {item: errors[item] for item in keep}
+        self.total += other.total
+        self._rebuild_heap()
+        return self
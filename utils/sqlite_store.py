@@ -0,0 +1,378 @@
+"""
+Persistent SQLite backend for validated transactions.
+
+Rows are bulk-loaded with executemany in large batches into a WAL-mode
+database indexed on Date, Region, ProductID and CustomerID. Loading is
+incremental per source file (only appended lines are parsed, like
+utils.incremental), and the report aggregates run as SQL while
+returning the same structures as the in-memory functions in
+utils.data_processor.
+"""
+import heapq
+import os
+import sqlite3
+from itertools import islice
+
+from utils.file_handler import ENCODINGS, detect_encoding
+from utils.data_processor import iter_clean_transactions
+from utils.incremental import _iter_tail_lines, _prefix_digest
+from utils.records import as_transaction
+from utils.validation import SUMMARY_KEYS
+
+
+DB_PATH = "data/sales.db"
+BATCH_SIZE = 50000
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS sources (
+    id INTEGER PRIMARY KEY,
+    path TEXT UNIQUE NOT NULL,
+    offset INTEGER NOT NULL,
+    fingerprint TEXT NOT NULL,
+    total_input INTEGER NOT NULL,
+    invalid INTEGER NOT NULL,
+    pending_from INTEGER
+);
+CREATE TABLE IF NOT EXISTS transactions (
+    id INTEGER PRIMARY KEY,
+    source INTEGER REFERENCES sources(id),
+    TransactionID TEXT,
+    Date TEXT,
+    ProductID TEXT,
+    ProductName TEXT,
+    Quantity INTEGER,
+    UnitPrice REAL,
+    CustomerID TEXT,
+    Region TEXT,
+    amount REAL,
+    region_key TEXT,
+    customer_key TEXT
+);
+"""
+
+# Built after bulk loads rather than maintained row by row
+INDEXES = {
+    "idx_transactions_date": "Date",
+    "idx_transactions_region": "Region",
+    "idx_transactions_product": "ProductID",
+    "idx_transactions_customer": "CustomerID",
+    "idx_transactions_source": "source"
+}
+
+# Blank keys are skipped like the stripped-key checks in data_processor
+HAS_REGION = "region_key != ''"
+HAS_CUSTOMER = "customer_key != ''"
+HAS_DATE = "Date != ''"
+
+INSERT = (
+    "INSERT INTO transactions (source, TransactionID, Date, ProductID, ProductName, Quantity, "
+    "UnitPrice, CustomerID, Region, amount, region_key, customer_key) "
+    "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)"
+)
+
+
+def _row(tx, source):
+    tx = as_transaction(tx)
+    return (
+        source, tx.TransactionID, tx.Date, tx.ProductID, tx.ProductName, tx.Quantity,
+        tx.UnitPrice, tx.CustomerID, tx.Region, tx.Quantity * tx.UnitPrice,
+        tx.Region.strip(), tx.CustomerID.strip()
+    )
+
+
+class SalesDatabase:
+    """
+    Validated transactions in SQLite, queried like a TransactionTable.
+    region / min_amount / max_amount restrict every query the same way
+    validate_and_filter() restricts the in-memory rows, and source (a
+    path passed to load_file) limits them to that file's rows.
+    Ties are broken by first appearance (lowest row id), matching the
+    dict-based functions.
+    """
+
+    def __init__(self, path=DB_PATH, region=None, min_amount=None, max_amount=None, source=None):
+        if path != ":memory:":
+            os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+
+        self.path = path
+        self.conn = sqlite3.connect(path)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.execute("PRAGMA temp_store=MEMORY")
+        self.conn.executescript(SCHEMA)
+
+        # Databases created before pending rows were tracked
+        columns = [row[1] for row in self.conn.execute("PRAGMA table_info(sources)")]
+        if "pending_from" not in columns:
+            self.conn.execute("ALTER TABLE sources ADD COLUMN pending_from INTEGER")
+
+        conditions = []
+        self._params = []
+        if source:
+            conditions.append("source = (SELECT id FROM sources WHERE path = ?)")
+            self._params.append(os.path.abspath(source))
+        if region:
+            conditions.append("Region = ?")
+            self._params.append(region)
+        if min_amount:
+            conditions.append("amount >= ?")
+            self._params.append(min_amount)
+        if max_amount:
+            conditions.append("amount <= ?")
+            self._params.append(max_amount)
+        self._conditions = conditions
+
+    def close(self):
+        self.conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    # =========================
+    # LOADING
+    # =========================
+
+    def _ensure_indexes(self):
+        for name, column in INDEXES.items():
+            self.conn.execute(f"CREATE INDEX IF NOT EXISTS {name} ON transactions ({column})")
+
+    def insert(self, transactions, source=None, batch_size=BATCH_SIZE):
+        """
+        Appends validated transactions (records or dicts) with
+        executemany, batch_size rows at a time. Returns the row count.
+        """
+        with self.conn:
+            return self._insert(transactions, source, batch_size)
+
+    def _insert(self, transactions, source, batch_size):
+        # Runs inside the caller's transaction
+        rows = (_row(tx, source) for tx in transactions)
+        count = 0
+
+        while True:
+            batch = list(islice(rows, batch_size))
+            if not batch:
+                break
+            self.conn.executemany(INSERT, batch)
+            count += len(batch)
+
+        self._ensure_indexes()
+        return count
+
+    def load_file(self, filename, batch_size=BATCH_SIZE):
+        """
+        Brings the rows loaded from filename up to date. If the file
+        still starts with the bytes loaded last time only the appended
+        tail is parsed; otherwise its rows are replaced.
+        The stored offset only moves past newline-terminated lines. Rows
+        from an unterminated last line (still being written, or a file
+        without a final newline) are inserted as pending: the next load
+        deletes them and parses the line again from its start.
+        Returns {"mode": "full" | "incremental" | "unchanged",
+        "new_rows", "new_bytes", "summary"} where summary holds the
+        cumulative parse / validation counters for the file.
+        """
+        path = os.path.abspath(filename)
+        size = os.path.getsize(filename)
+
+        state = self.conn.execute(
+            "SELECT id, offset, fingerprint, total_input, invalid, pending_from FROM sources WHERE path = ?",
+            (path,)
+        ).fetchone()
+
+        prefix = _prefix_digest(filename, state[1]) if state is not None and state[1] <= size else None
+        reusable = prefix is not None and prefix.hexdigest() == state[2]
+
+        with self.conn:
+            if reusable:
+                source, offset, _, total_input, invalid, pending_from = state
+                mode = "incremental" if size > offset else "unchanged"
+                if pending_from is not None:
+                    self.conn.execute(
+                        "DELETE FROM transactions WHERE source = ? AND id >= ?", (source, pending_from)
+                    )
+                    self.conn.execute("UPDATE sources SET pending_from = NULL WHERE id = ?", (source,))
+            else:
+                offset = total_input = invalid = 0
+                mode = "full"
+                prefix = None
+                if state is None:
+                    source = self.conn.execute(
+                        "INSERT INTO sources (path, offset, fingerprint, total_input, invalid) "
+                        "VALUES (?, 0, '', 0, 0)", (path,)
+                    ).lastrowid
+                else:
+                    source = state[0]
+                    self.conn.execute("DELETE FROM transactions WHERE source = ?", (source,))
+
+            new_rows = 0
+            pending_summary = {key: 0 for key in SUMMARY_KEYS}
+            if size > offset or mode == "full":
+                encoding = detect_encoding(filename)
+                encodings = [encoding] + [enc for enc in ENCODINGS if enc != encoding]
+
+                tail_summary = {}
+                progress = {"offset": offset}
+                valid = iter_clean_transactions(
+                    _iter_tail_lines(filename, offset, size, encodings, progress), tail_summary
+                )
+                new_rows = self._insert(valid, source, batch_size)
+
+                total_input += tail_summary["total_input"]
+                invalid += tail_summary["invalid"]
+                self.conn.execute(
+                    "UPDATE sources SET offset = ?, fingerprint = ?, total_input = ?, invalid = ? WHERE id = ?",
+                    (
+                        progress["offset"], _prefix_digest(filename, progress["offset"], prefix, offset).hexdigest(),
+                        total_input, invalid, source
+                    )
+                )
+
+                if progress["pending"] is not None:
+                    pending_from = self.conn.execute("SELECT COALESCE(MAX(id), 0) + 1 FROM transactions").fetchone()[0]
+                    valid = iter_clean_transactions([progress["pending"]], pending_summary)
+                    if self._insert(valid, source, batch_size):
+                        self.conn.execute(
+                            "UPDATE sources SET pending_from = ? WHERE id = ?", (pending_from, source)
+                        )
+
+        total_input += pending_summary["total_input"]
+        invalid += pending_summary["invalid"]
+        summary = {key: 0 for key in SUMMARY_KEYS}
+        summary.update({"total_input": total_input, "invalid": invalid, "final_count": total_input - invalid})
+
+        return {"mode": mode, "new_rows": new_rows, "new_bytes": max(size - offset, 0), "summary": summary}
+
+    # =========================
+    # QUERY HELPERS
+    # =========================
+
+    def _where(self, *extra):
+        conditions = self._conditions + list(extra)
+        return (" WHERE " + " AND ".join(conditions)) if conditions else ""
+
+    def _query(self, sql, *params):
+        return self.conn.execute(sql, self._params + list(params)).fetchall()
+
+    # =========================
+    # AGGREGATES
+    # =========================
+
+    def __len__(self):
+        return self._query(f"SELECT COUNT(*) FROM transactions{self._where()}")[0][0]
+
+    def total_revenue(self):
+        total = self._query(f"SELECT SUM(amount) FROM transactions{self._where()}")[0][0]
+        return round(total or 0.0, 2)
+
+    def date_range(self):
+        first, last = self._query(f"SELECT MIN(Date), MAX(Date) FROM transactions{self._where()}")[0]
+        return first, last
+
+    def region_wise_sales(self):
+        total_revenue = self._query(f"SELECT SUM(amount) FROM transactions{self._where()}")[0][0]
+        rows = self._query(
+            f"SELECT region_key, SUM(amount), COUNT(*) FROM transactions"
+            f"{self._where(HAS_REGION)}"
+            f" GROUP BY region_key ORDER BY SUM(amount) DESC, MIN(id)"
+        )
+
+        return {
+            region: {
+                "total_sales": sales,
+                "transaction_count": count,
+                "percentage": round((sales / total_revenue) * 100, 2)
+            }
+            for region, sales, count in rows
+        }
+
+    def _product_rows(self, having="", order="SUM(Quantity) DESC", limit="", params=()):
+        return self._query(
+            f"SELECT ProductName, SUM(Quantity), SUM(amount) FROM transactions{self._where()}"
+            f" GROUP BY ProductName{having} ORDER BY {order}, MIN(id){limit}",
+            *params
+        )
+
+    def top_selling_products(self, n=5):
+        rows = self._product_rows(limit=" LIMIT ?", params=(n,))
+        return [(name, qty, round(revenue, 2)) for name, qty, revenue in rows]
+
+    def low_performing_products(self, threshold=10):
+        rows = self._product_rows(having=" HAVING SUM(Quantity) < ?", order="SUM(Quantity)", params=(threshold,))
+        return [(name, qty, round(revenue, 2)) for name, qty, revenue in rows]
+
+    def _customer_totals(self):
+        # (customer, spent, orders) in first-seen order
+        return self._query(
+            f"SELECT customer_key, SUM(amount), COUNT(*) FROM transactions{self._where(HAS_CUSTOMER)}"
+            f" GROUP BY customer_key ORDER BY MIN(id)"
+        )
+
+    @staticmethod
+    def _customer_summary(spent, orders):
+        return {
+            "total_spent": round(spent, 2),
+            "purchase_count": orders,
+            "avg_order_value": round(spent / orders, 2)
+        }
+
+    def customer_analysis(self):
+        bought = {}
+        for customer, product in self._query(
+            f"SELECT DISTINCT customer_key, ProductName FROM transactions"
+            f"{self._where(HAS_CUSTOMER)} ORDER BY customer_key, ProductName"
+        ):
+            bought.setdefault(customer, []).append(product)
+
+        result = {}
+        for customer, spent, orders in self._customer_totals():
+            result[customer] = self._customer_summary(spent, orders)
+            result[customer]["products_bought"] = bought[customer]
+
+        # Rounded spend, stable: ties keep first-seen order
+        return dict(sorted(result.items(), key=lambda x: x[1]["total_spent"], reverse=True))
+
+    def top_customers(self, n=5):
+        """
+        First n entries of customer_analysis() without building the
+        per-customer product lists.
+        """
+        top = heapq.nlargest(n, self._customer_totals(), key=lambda row: round(row[1], 2))
+        return [(customer, self._customer_summary(spent, orders)) for customer, spent, orders in top]
+
+    def region_unique_customers(self):
+        rows = self._query(
+            f"SELECT region_key, COUNT(DISTINCT customer_key) FROM transactions"
+            f"{self._where(HAS_REGION, HAS_CUSTOMER)}"
+            f" GROUP BY region_key ORDER BY COUNT(DISTINCT customer_key) DESC, MIN(id)"
+        )
+        return dict(rows)
+
+    def daily_sales_trend(self):
+        rows = self._query(
+            f"SELECT Date, SUM(amount), COUNT(*),"
+            f" COUNT(DISTINCT CASE WHEN customer_key != '' THEN customer_key END)"
+            f" FROM transactions{self._where(HAS_DATE)} GROUP BY Date ORDER BY Date"
+        )
+        return {
+            date: {
+                "revenue": round(revenue, 2),
+                "transaction_count": count,
+                "unique_customers": customers
+            }
+            for date, revenue, count, customers in rows
+        }
+
+    def find_peak_sales_day(self):
+        rows = self._query(
+            f"SELECT Date, SUM(amount), COUNT(*) FROM transactions{self._where()}"
+            f" GROUP BY Date ORDER BY SUM(amount) DESC, MIN(id) LIMIT 1"
+        )
+        if not rows:
+            raise ValueError("max() arg is an empty sequence")
+
+        date, revenue, count = rows[0]
+        return date, round(revenue, 2), count
@@ -0,0 +1,353 @@
+"""
+Rule-based validation of sales rows with per-rule rejection counts.
+
+A RuleSet resolves the business rules and filters for one run once, up
+front, into a single check function. Each rejected row is charged to the
+first rule it fails, in RULES order, so the counts explain every dropped
+row without a second pass. Raw lines go through one loop that parses and
+checks (RuleSet.iter_lines); parsed columns are checked a rule at a time
+with NumPy masks (RuleSet.check_columns). Rejected rows can be streamed
+to a quarantine file as they are found.
+"""
+from itertools import compress
+
+from utils.records import TRANSACTION_FIELDS, Transaction, paused_gc
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+
+# Rows dropped before they count as input (see SUMMARY_KEYS["total_input"])
+PARSE_RULES = ("field_count", "numeric_parse")
+# Rows counted as "invalid"
+RECORD_RULES = (
+    "missing_field",
+    "quantity_positive",
+    "unit_price_positive",
+    "transaction_id_prefix",
+    "product_id_prefix",
+    "customer_id_prefix"
+)
+FILTER_RULES = ("region", "min_amount", "max_amount")
+RULES = PARSE_RULES + RECORD_RULES + FILTER_RULES
+
+# (rule, field, required prefix), checked in this order
+ID_PREFIXES = (
+    ("transaction_id_prefix", "TransactionID", "T"),
+    ("product_id_prefix", "ProductID", "P"),
+    ("customer_id_prefix", "CustomerID", "C")
+)
+
+# Counters reported by validate_and_filter, in report order
+SUMMARY_KEYS = ["total_input", "invalid", "filtered_by_region", "filtered_by_amount", "final_count"]
+
+# Summary counter each rejection rule rolls up into
+SUMMARY_RULES = {
+    "invalid": RECORD_RULES,
+    "filtered_by_region": ("region",),
+    "filtered_by_amount": ("min_amount", "max_amount")
+}
+
+BATCH_SIZE = 10000
+
+
+def empty_summary():
+    summary = {key: 0 for key in SUMMARY_KEYS}
+    summary["rejections"] = dict.fromkeys(RULES, 0)
+    return summary
+
+
+def merge_summary(target, other):
+    """
+    Adds other's counters (and per-rule rejections, if any) into target.
+    """
+    for key in SUMMARY_KEYS:
+        target[key] += other[key]
+
+    rejections = target.setdefault("rejections", dict.fromkeys(RULES, 0))
+    for rule, count in other.get("rejections", {}).items():
+        rejections[rule] = rejections.get(rule, 0) + count
+    return target
+
+
+def _format_row(values):
+    return "|".join(str(value) for value in values)
+
+
+class QuarantineWriter:
+    """
+    Streams rejected rows to a text file, one "<rule>\\t<row>" line each,
+    where row is the raw line when there is one and otherwise the parsed
+    fields joined with "|" (commas already stripped). Lines are buffered
+    and written every batch_size rows; use as a context manager or call
+    close().
+    """
+
+    def __init__(self, path, batch_size=BATCH_SIZE, encoding="utf-8"):
+        self.path = path
+        self.batch_size = batch_size
+        self.rows = 0
+        self._buffer = []
+        self._file = open(path, "w", encoding=encoding)
+
+    def write(self, rule, line):
+        self._buffer.append(rule + "\t" + line.rstrip("\n") + "\n")
+        self.rows += 1
+        if len(self._buffer) >= self.batch_size:
+            self.flush()
+
+    def flush(self):
+        if self._buffer:
+            self._file.writelines(self._buffer)
+            self._buffer = []
+
+    def close(self):
+        if not self._file.closed:
+            self.flush()
+            self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class RuleSet:
+    """
+    The validation rules and filters for one run. Filters that are
+    falsy are off, as in validate_and_filter. counts holds the rows
+    rejected per rule across every call; checked and passed count the
+    rows that reached the record rules and the rows that passed all.
+    """
+
+    def __init__(self, region=None, min_amount=None, max_amount=None):
+        self.region = region or None
+        self.min_amount = min_amount or None
+        self.max_amount = max_amount or None
+        self.check = self._compile()
+        self.reset()
+
+    def reset(self):
+        self.counts = dict.fromkeys(RULES, 0)
+        self.checked = 0
+        self.passed = 0
+
+    def _compile(self):
+        """
+        Builds check(transaction_id, product_id, customer_id, quantity,
+        unit_price, region) -> first failing rule or None, with the
+        filters bound as constants and the amount computed once, only
+        when an amount filter is on.
+        """
+        region, min_amount, max_amount = self.region, self.min_amount, self.max_amount
+        amount_filtered = bool(min_amount or max_amount)
+
+        def check(transaction_id, product_id, customer_id, quantity, unit_price, tx_region):
+            if quantity <= 0:
+                return "quantity_positive"
+            if unit_price <= 0:
+                return "unit_price_positive"
+            if not transaction_id.startswith("T"):
+                return "transaction_id_prefix"
+            if not product_id.startswith("P"):
+                return "product_id_prefix"
+            if not customer_id.startswith("C"):
+                return "customer_id_prefix"
+
+            if region and tx_region != region:
+                return "region"
+
+            if amount_filtered:
+                amount = quantity * unit_price
+                if min_amount and amount < min_amount:
+                    return "min_amount"
+                if max_amount and amount > max_amount:
+                    return "max_amount"
+            return None
+
+        return check
+
+    def summary(self, summary=None):
+        """
+        Fills summary (reset in place) with the validate_and_filter
+        counters plus "rejections": {rule: rows}.
+        """
+        if summary is None:
+            summary = {}
+
+        summary.clear()
+        summary["total_input"] = self.checked
+        for key, rules in SUMMARY_RULES.items():
+            summary[key] = sum(self.counts[rule] for rule in rules)
+        summary["final_count"] = self.passed
+        summary["rejections"] = dict(self.counts)
+        return summary
+
+    # =========================
+    # ROW PATHS
+    # =========================
+
+    def iter_lines(self, raw_lines, quarantine=None):
+        """
+        Parses, validates and filters raw lines in one loop, yielding
+        the Transaction records that pass. Lines with the wrong field
+        count or unparseable numbers are charged to the parse rules.
+        Counters are updated when the generator finishes or is closed.
+        """
+        check = self.check
+        counts = self.counts
+        checked = passed = 0
+
+        try:
+            for line in raw_lines:
+                parts = line.split("|")
+
+                if len(parts) != 8:
+                    rule = "field_count"
+                else:
+                    transaction_id, date, product_id, product_name, quantity, unit_price, customer_id, region = parts
+                    try:
+                        quantity = int(quantity.replace(",", ""))
+                        unit_price = float(unit_price.replace(",", ""))
+                    except ValueError:
+                        rule = "numeric_parse"
+                    else:
+                        checked += 1
+                        rule = check(transaction_id, product_id, customer_id, quantity, unit_price, region)
+                        if rule is None:
+                            passed += 1
+                            yield Transaction(
+                                transaction_id, date, product_id, product_name.replace(",", ""),
+                                quantity, unit_price, customer_id, region
+                            )
+                            continue
+
+                counts[rule] += 1
+                if quarantine is not None:
+                    quarantine.write(rule, line)
+
+        finally:
+            self.checked += checked
+            self.passed += passed
+
+    def iter_records(self, transactions, quarantine=None):
+        """
+        Validates and filters parsed transactions (records or dicts),
+        yielding the ones that pass as Transaction records. A dict
+        missing a field is charged to missing_field.
+        """
+        check = self.check
+        counts = self.counts
+        checked = passed = 0
+
+        try:
+            for tx in transactions:
+                checked += 1
+                try:
+                    if isinstance(tx, dict):
+                        tx = Transaction.from_dict(tx)
+                except KeyError:
+                    rule = "missing_field"
+                else:
+                    rule = check(tx.TransactionID, tx.ProductID, tx.CustomerID, tx.Quantity, tx.UnitPrice, tx.Region)
+                    if rule is None:
+                        passed += 1
+                        yield tx
+                        continue
+
+                counts[rule] += 1
+                if quarantine is not None:
+                    quarantine.write(rule, _format_row(tx.values()))
+
+        finally:
+            self.checked += checked
+            self.passed += passed
+
+    # =========================
+    # COLUMNAR PATH
+    # =========================
+
+    def _column_tests(self, columns, quantity, unit_price):
+        """
+        Yields (rule, bool array of rows that pass it) in RULES order.
+        Numeric tests negate the row path's rejection test, so NaN
+        passes here exactly as it does there. ID prefixes compare a
+        one-character array of each column; the region test maps the
+        filter's bound __eq__ over the column.
+        """
+        size = len(quantity)
+
+        yield "quantity_positive", ~(quantity <= 0)
+        yield "unit_price_positive", ~(unit_price <= 0)
+        for rule, field, prefix in ID_PREFIXES:
+            yield rule, np.array(columns[field], dtype="U1") == prefix
+
+        if self.region:
+            yield "region", np.fromiter(map(self.region.__eq__, columns["Region"]), dtype=bool, count=size)
+
+        if self.min_amount or self.max_amount:
+            amount = quantity * unit_price
+            if self.min_amount:
+                yield "min_amount", ~(amount < self.min_amount)
+            if self.max_amount:
+                yield "max_amount", ~(amount > self.max_amount)
+
+    def check_columns(self, columns, quarantine=None):
+        """
+        Vectorized check of parsed columns ({field: sequence}, as from
+        parse_cache.load_columns). Returns a NumPy bool array of the rows
+        that pass; rejections are charged to the first failing rule,
+        exactly as the row paths would.
+        """
+        if np is None:
+            raise ImportError("Vectorized validation requires numpy (pip install numpy)")
+
+        quantity = np.asarray(columns["Quantity"], dtype=np.int64)
+        unit_price = np.asarray(columns["UnitPrice"], dtype=np.float64)
+        keep = np.ones(len(quantity), dtype=bool)
+        # 1-based position in `applied` of each rejected row's rule
+        reasons = np.zeros(len(quantity), dtype=np.int8) if quarantine is not None else None
+        applied = []
+
+        for rule, passes in self._column_tests(columns, quantity, unit_price):
+            failed = keep & ~passes
+            rejected = int(np.count_nonzero(failed))
+            if rejected:
+                self.counts[rule] += rejected
+                keep &= passes
+                if reasons is not None:
+                    applied.append(rule)
+                    reasons[failed] = len(applied)
+
+        if reasons is not None:
+            # Written in row order, like the row paths
+            for i in np.flatnonzero(reasons).tolist():
+                row = (columns[field][i] for field in TRANSACTION_FIELDS)
+                quarantine.write(applied[reasons[i] - 1], _format_row(row))
+
+        self.checked += len(keep)
+        self.passed += int(np.count_nonzero(keep))
+        return keep
+
+    def select_columns(self, columns, quarantine=None):
+        """
+        Returns the Transaction records of the column rows that pass,
+        built only for those rows. Falls back to the row path when numpy
+        is not installed.
+        """
+        if np is None:
+            records = map(Transaction, *(columns[field] for field in TRANSACTION_FIELDS))
+            return list(self.iter_records(records, quarantine))
+
+        keep = self.check_columns(columns, quarantine)
+        if keep.all():
+            selected = [columns[field] for field in TRANSACTION_FIELDS]
+        else:
+            keep = keep.tolist()
+            selected = [compress(columns[field], keep) for field in TRANSACTION_FIELDS]
+
+        with paused_gc():
+            return list(map(Transaction, *selected))